@@ -0,0 +1,397 @@
+"""Persistence and serialisation micro-benchmarks.
+
+Point the usual POSTGRES_* settings at a scratch database: the ``run``
+command fills ``calendar_events`` with synthetic data, and refuses to touch a
+non-empty table unless ``--reset`` allows it to truncate it first::
+
+    python -m benchmarks.run run --events 100000 --reset --output base.json
+    # ... change code ...
+    python -m benchmarks.run run --events 100000 --reset --output new.json
+    python -m benchmarks.run compare base.json new.json --threshold 0.10
+
+With ``--calendars N`` the rows are spread over N calendars and the cases
+work on the ``default`` one, which shows how per-calendar queries scale with
+the size of the whole table.
+
+``compare`` exits with status 1 when any case got slower than the threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.application.services.calendar_service import CalendarService
+from src.domain.entities.event import Event
+from src.domain.entities.task import TaskCreate
+from src.infrastructure.database.batching import BatchingEventRepository
+from src.infrastructure.database.pool import close_pool, connection
+from src.infrastructure.database.postgres import PostgresEventRepository
+from src.infrastructure.database.schema import create_schema
+from src.infrastructure.export.arrow import arrow_stream, parquet_stream
+from src.interfaces.api.schemas.models import EventResponse
+
+from .synthetic import generate_events, load_events, reset_events
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(func: Callable) -> Callable:
+        CASES[name] = func
+        return func
+
+    return register
+
+
+def measure(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+    items: int = 1,
+) -> dict:
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    ordered = sorted(timings)
+    mean = statistics.fmean(timings)
+    return {
+        "runs": repeat,
+        "items": items,
+        "mean_ms": mean * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "items_per_sec": items / mean if mean else 0.0,
+    }
+
+
+class Context:
+    def __init__(
+        self,
+        repository: PostgresEventRepository,
+        events: int,
+        repeat: int,
+        calendars: int = 1,
+    ):
+        self.repository = repository
+        self.service = CalendarService(repository)
+        self.calendar_id = "default"
+        self.calendars = calendars
+        # Rows are dealt round-robin, the default calendar getting every
+        # calendars-th one starting with id 1
+        self.events = (events + calendars - 1) // calendars
+        self.repeat = repeat
+        self.loop = asyncio.new_event_loop()
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def sample_event(self) -> Event:
+        start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        return Event(
+            event_name="Benchmark event",
+            event_description="Created by benchmarks.run",
+            event_start_date_time=start,
+            event_end_date_time=start + timedelta(hours=3),
+            event_location="Room A",
+            calendar_id=self.calendar_id,
+        )
+
+
+@case("repository.get_by_id")
+def bench_get_by_id(ctx: Context) -> dict:
+    ids = iter(range(1, ctx.repeat * 10 + 1))
+    return measure(
+        lambda: ctx.run(
+            ctx.repository.get_by_id(
+                ctx.calendar_id, next(ids) % ctx.events * ctx.calendars + 1
+            )
+        ),
+        ctx.repeat * 10,
+    )
+
+
+@case("repository.get_all")
+def bench_get_all(ctx: Context) -> dict:
+    return measure(
+        lambda: ctx.run(ctx.repository.get_all(ctx.calendar_id)),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+# Tasks cost one more query for the whole listing, not one per event
+@case("repository.get_all_with_tasks")
+def bench_get_all_with_tasks(ctx: Context) -> dict:
+    return measure(
+        lambda: ctx.run(ctx.repository.get_all(ctx.calendar_id, include_tasks=True)),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+@case("serialize.event_response_list")
+def bench_serialize(ctx: Context) -> dict:
+    events = ctx.run(ctx.repository.get_all(ctx.calendar_id))
+    adapter = TypeAdapter(List[EventResponse])
+
+    # Mirrors FastAPI's response_model path: dump, validate, encode, dumps
+    def serialize() -> bytes:
+        validated = adapter.validate_python([e.model_dump() for e in events])
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    return measure(serialize, ctx.repeat, items=len(events))
+
+
+# GET /events end to end for each EVENT_LIST_RENDERING mode; run at
+# --events 1000 and --events 100000 to see where the fast paths pay off
+@case("listing.model")
+def bench_listing_model(ctx: Context) -> dict:
+    adapter = TypeAdapter(List[EventResponse])
+
+    def render() -> bytes:
+        events = ctx.run(ctx.repository.get_all(ctx.calendar_id))
+        validated = adapter.validate_python([e.model_dump() for e in events])
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    return measure(render, ctx.repeat, items=ctx.events)
+
+
+@case("listing.orjson")
+def bench_listing_orjson(ctx: Context) -> dict:
+    def render() -> bytes:
+        events = ctx.run(ctx.repository.get_all(ctx.calendar_id))
+        return orjson.dumps([e.model_dump(exclude={"tasks"}) for e in events])
+
+    return measure(render, ctx.repeat, items=ctx.events)
+
+
+@case("listing.database")
+def bench_listing_database(ctx: Context) -> dict:
+    return measure(
+        lambda: ctx.run(ctx.repository.get_all_json(ctx.calendar_id)),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+@case("listing.database_with_tasks")
+def bench_listing_database_with_tasks(ctx: Context) -> dict:
+    return measure(
+        lambda: ctx.run(
+            ctx.repository.get_all_json(ctx.calendar_id, include_tasks=True)
+        ),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+@case("export.arrow_stream")
+def bench_export_arrow(ctx: Context) -> dict:
+    return measure(
+        lambda: sum(
+            map(len, arrow_stream(ctx.repository.iter_row_batches(ctx.calendar_id)))
+        ),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+@case("export.parquet_stream")
+def bench_export_parquet(ctx: Context) -> dict:
+    return measure(
+        lambda: sum(
+            map(len, parquet_stream(ctx.repository.iter_row_batches(ctx.calendar_id)))
+        ),
+        ctx.repeat,
+        items=ctx.events,
+    )
+
+
+@case("repository.create")
+def bench_create(ctx: Context) -> dict:
+    event = ctx.sample_event()
+    return measure(lambda: ctx.run(ctx.repository.create(event)), ctx.repeat * 10)
+
+
+# Concurrent POST /events calls in one burst, as one worker sees them
+INSERT_BURST = 100
+
+
+def bench_insert_burst(ctx: Context, repository) -> dict:
+    event = ctx.sample_event()
+
+    async def burst():
+        await asyncio.gather(*(repository.create(event) for _ in range(INSERT_BURST)))
+
+    return measure(lambda: ctx.run(burst()), ctx.repeat, items=INSERT_BURST)
+
+
+@case("repository.create_burst")
+def bench_create_burst(ctx: Context) -> dict:
+    return bench_insert_burst(ctx, ctx.repository)
+
+
+@case("repository.create_burst_batched")
+def bench_create_burst_batched(ctx: Context) -> dict:
+    batching = BatchingEventRepository(ctx.repository, window=0.002, max_size=100)
+    return bench_insert_burst(ctx, batching)
+
+
+@case("repository.delete")
+def bench_delete(ctx: Context) -> dict:
+    ids: List[int] = []
+    event = ctx.sample_event()
+    return measure(
+        lambda: ctx.run(ctx.repository.delete(ctx.calendar_id, ids.pop())),
+        ctx.repeat * 10,
+        setup=lambda: ids.append(ctx.run(ctx.repository.create(event)).id),
+    )
+
+
+@case("service.split_event")
+def bench_split_event(ctx: Context) -> dict:
+    ids: List[int] = []
+    event = ctx.sample_event()
+    tasks = [
+        TaskCreate(
+            task_name=f"Part {i + 1}",
+            task_start_date_time=event.event_start_date_time + timedelta(hours=i),
+            task_end_date_time=event.event_start_date_time + timedelta(hours=i + 1),
+        )
+        for i in range(3)
+    ]
+    return measure(
+        lambda: ctx.run(ctx.service.split_event(ctx.calendar_id, ids.pop(), tasks)),
+        ctx.repeat * 10,
+        setup=lambda: ids.append(ctx.run(ctx.repository.create(event)).id),
+    )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> dict:
+    with connection() as conn:
+        create_schema(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM calendar_events)")
+            has_rows = cur.fetchone()[0]
+        if has_rows and not args.reset:
+            sys.exit("calendar_events is not empty; use a scratch database or --reset")
+        reset_events(conn)
+        load_events(
+            conn,
+            generate_events(args.events, weeks=args.weeks, calendars=args.calendars),
+        )
+
+    ctx = Context(PostgresEventRepository(), args.events, args.repeat, args.calendars)
+    selected = args.cases.split(",") if args.cases else list(CASES)
+    results = {}
+    for name in selected:
+        results[name] = CASES[name](ctx)
+        print(
+            f"{name:<34}{results[name]['mean_ms']:>10.3f} ms"
+            f"{results[name]['p95_ms']:>10.3f} ms p95"
+            f"{results[name]['items_per_sec']:>14.0f} items/s"
+        )
+    ctx.loop.close()
+    close_pool()
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "events": args.events,
+            "calendars": args.calendars,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"{'case':<34}{'base ms':>10}{'new ms':>10}{'change':>9}")
+    for name, new_result in new["results"].items():
+        base_result = base["results"].get(name)
+        if base_result is None:
+            print(f"{name:<34}{'-':>10}{new_result['mean_ms']:>10.3f}{'new':>9}")
+            continue
+        change = new_result["mean_ms"] / base_result["mean_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:<34}{base_result['mean_ms']:>10.3f}"
+            f"{new_result['mean_ms']:>10.3f}{change * 100:>+8.1f}%{flag}"
+        )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--events", type=int, default=10_000)
+    run_parser.add_argument("--weeks", type=int, default=52)
+    run_parser.add_argument("--calendars", type=int, default=1)
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument(
+        "--cases", help=f"comma-separated subset of: {', '.join(CASES)}"
+    )
+    run_parser.add_argument(
+        "--reset", action="store_true", help="truncate calendar_events first"
+    )
+    run_parser.add_argument("--output", help="write results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown of the mean that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    sys.exit(1 if compare(base, new, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
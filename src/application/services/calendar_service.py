@@ -1,34 +1,241 @@
-from typing import List
-from ...domain.entities.event import Event
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from ...domain.entities.event import Event, EventPatch
+from ...domain.entities.summary import WeekSummary
 from ...domain.entities.task import TaskCreate
-from ...domain.interfaces.repositories import EventRepository
+from ...domain.exceptions import EventsPartiallyCreated
+from ...domain.interfaces.repositories import (
+    ChangeFeed,
+    EventIndex,
+    EventRepository,
+    WeekSummaryRepository,
+)
+from ...core.logger import setup_logger
+from ...core.metrics import observe_service
+
+logger = setup_logger(__name__)
+
+
+def _event_payload(event: Event) -> dict:
+    # Tasks only when loaded: a delta without them leaves a client's copy alone
+    return event.model_dump(
+        mode="json", exclude={"tasks"} if event.tasks is None else None
+    )
+
+
+def _event_days(events: Iterable[Event]) -> Set[date]:
+    """Every day the events overlap; an event ending at midnight stops the day before."""
+    days = set()
+    for event in events:
+        day = event.event_start_date_time.date()
+        last = (event.event_end_date_time - timedelta(microseconds=1)).date()
+        days.add(day)
+        while day < last:
+            day += timedelta(days=1)
+            days.add(day)
+    return days
+
+
+def week_start(iso_week: str) -> date:
+    """Monday of an ISO week written like 2024-W07; ValueError otherwise."""
+    try:
+        monday = datetime.strptime(f"{iso_week}-1", "%G-W%V-%u").date()
+    except ValueError:
+        monday = None
+    # strptime rolls weeks over: 2023-W53, which does not exist, is 2024-W01
+    if monday is None or monday.strftime("%G-W%V") != iso_week:
+        raise ValueError(f"invalid ISO week {iso_week!r}, expected e.g. 2024-W07")
+    return monday
 
 
 class CalendarService:
-    def __init__(self, event_repository: EventRepository):
+    def __init__(
+        self,
+        event_repository: EventRepository,
+        change_feed: Optional[ChangeFeed] = None,
+        event_index: Optional[EventIndex] = None,
+        week_summaries: Optional[WeekSummaryRepository] = None,
+    ):
         self.event_repository = event_repository
+        self.change_feed = change_feed
+        self.event_index = event_index
+        self.week_summaries = week_summaries
+
+    async def _publish(
+        self,
+        change_type: str,
+        calendar_id: str,
+        upserted: Sequence[Event] = (),
+        deleted: Sequence[int] = (),
+    ) -> None:
+        if self.change_feed is None:
+            return
+        try:
+            await self.change_feed.publish(
+                {
+                    "type": change_type,
+                    "calendar_id": calendar_id,
+                    "upserted": [_event_payload(event) for event in upserted],
+                    "deleted": list(deleted),
+                }
+            )
+        except Exception as e:
+            # The write is already committed: only the live update is lost
+            logger.error(f"Failed to publish {change_type} change: {str(e)}")
+
+    async def _refresh_summaries(
+        self, calendar_id: str, events: Iterable[Event]
+    ) -> None:
+        if self.week_summaries is None:
+            return
+        days = _event_days(events)
+        if not days:
+            return
+        try:
+            await self.week_summaries.refresh(calendar_id, days)
+        except Exception as e:
+            # Same as a lost delta: the write stands, the summary lags until
+            # the next write to those days
+            logger.error(f"Failed to refresh week summary: {str(e)}")
 
+    @observe_service("calendar_service")
     async def create_event(self, event: Event) -> Event:
-        return await self.event_repository.create(event)
+        created = await self.event_repository.create(event)
+        await self._refresh_summaries(created.calendar_id, [created])
+        await self._publish("created", created.calendar_id, upserted=[created])
+        return created
 
-    async def get_all_events(self) -> List[Event]:
-        return await self.event_repository.get_all()
+    @observe_service("calendar_service")
+    async def create_events(self, events: List[Event]) -> List[Event]:
+        """Insert many events at once, of any calendars; results in input order."""
+        try:
+            created = await self.event_repository.create_many(events)
+        except EventsPartiallyCreated as e:
+            # The shards that committed are live: announce them, then fail
+            await self._created([event for event in e.created if event is not None])
+            raise
+        await self._created(created)
+        return created
 
-    async def delete_event(self, event_id: int) -> bool:
-        return await self.event_repository.delete(event_id)
+    async def _created(self, events: List[Event]) -> None:
+        by_calendar: Dict[str, List[Event]] = {}
+        for event in events:
+            by_calendar.setdefault(event.calendar_id, []).append(event)
+        for calendar_id, calendar_events in by_calendar.items():
+            await self._refresh_summaries(calendar_id, calendar_events)
+            await self._publish("created", calendar_id, upserted=calendar_events)
 
-    async def split_event(self, event_id: int, tasks: List[TaskCreate]) -> bool:
-        event = await self.event_repository.get_by_id(event_id)
-        if not event:
-            return False
-        await self.event_repository.delete(event_id)
-        for task in tasks:
-            new_event = Event(
-                event_name=task.task_name,
-                event_description=event.event_description,
-                event_start_date_time=task.task_start_date_time,
-                event_end_date_time=task.task_end_date_time,
-                event_location=event.event_location,
+    @observe_service("calendar_service")
+    async def get_all_events(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> List[Event]:
+        return await self.event_repository.get_all(
+            calendar_id, start, end, include_tasks
+        )
+
+    @observe_service("calendar_service")
+    async def get_events_json(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> bytes:
+        return await self.event_repository.get_all_json(
+            calendar_id, start, end, include_tasks
+        )
+
+    @observe_service("calendar_service")
+    async def search_events(
+        self,
+        calendar_id: str,
+        query: str,
+        around: Optional[datetime] = None,
+        k: int = 10,
+    ) -> List[Event]:
+        # Stored times are naive, like the dates ChatService parses
+        if around is not None:
+            around = around.replace(tzinfo=None)
+        return self.event_index.search(calendar_id, query, around, k)
+
+    @observe_service("calendar_service")
+    async def get_events_version(self, calendar_id: str) -> int:
+        return await self.event_repository.get_version(calendar_id)
+
+    def export_event_rows(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[List[Tuple]]:
+        return self.event_repository.iter_row_batches(calendar_id, start, end)
+
+    @observe_service("calendar_service")
+    async def update_events(
+        self, calendar_id: str, patches: List[EventPatch]
+    ) -> List[Event]:
+        # Moving an event also changes the days it leaves
+        moved_ids = [
+            patch.id
+            for patch in patches
+            if "event_start_date_time" in patch.changes
+            or "event_end_date_time" in patch.changes
+        ]
+        moved_from: List[Event] = []
+        if moved_ids and self.week_summaries is not None:
+            moved_from = await self.event_repository.get_by_ids(calendar_id, moved_ids)
+        updated = await self.event_repository.update_many(calendar_id, patches)
+        if moved_ids:
+            moved_ids = set(moved_ids)
+            await self._refresh_summaries(
+                calendar_id,
+                moved_from + [event for event in updated if event.id in moved_ids],
             )
-            await self.event_repository.create(new_event)
+        await self._publish("updated", calendar_id, upserted=updated)
+        return updated
+
+    @observe_service("calendar_service")
+    async def delete_event(self, calendar_id: str, event_id: int) -> bool:
+        event = None
+        if self.week_summaries is not None:
+            event = await self.event_repository.get_by_id(calendar_id, event_id)
+        deleted = await self.event_repository.delete(calendar_id, event_id)
+        if deleted:
+            if event is not None:
+                await self._refresh_summaries(calendar_id, [event])
+            await self._publish("deleted", calendar_id, deleted=[event_id])
+        return deleted
+
+    @observe_service("calendar_service")
+    async def split_event(
+        self, calendar_id: str, event_id: int, tasks: List[TaskCreate]
+    ) -> bool:
+        # The event keeps its ID and slot; its tasks are stored under it,
+        # replacing those of an earlier split
+        event = await self.event_repository.set_tasks(calendar_id, event_id, tasks)
+        if event is None:
+            return False
+        await self._publish("split", calendar_id, upserted=[event])
         return True
+
+    @observe_service("calendar_service")
+    async def get_week_summary(self, calendar_id: str, iso_week: str) -> WeekSummary:
+        monday = week_start(iso_week)
+        days = await self.week_summaries.get_days(calendar_id, monday, 7)
+        year, week, _ = monday.isocalendar()
+        return WeekSummary(
+            calendar_id=calendar_id,
+            iso_week=f"{year}-W{week:02d}",
+            days=days,
+            event_count=sum(day.event_count for day in days),
+            busy_minutes=sum(day.busy_minutes for day in days),
+            free_minutes=sum(
+                int((block.end - block.start).total_seconds() // 60)
+                for day in days
+                for block in day.free_blocks
+            ),
+        )
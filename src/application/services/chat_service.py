@@ -1,16 +1,87 @@
-from typing import List, Dict
-from ...domain.interfaces.repositories import LLMRepository
+from datetime import datetime
+from typing import List, Dict, Optional
+from ...domain.entities.event import Event
+from ...domain.interfaces.repositories import EventIndex, LLMRepository
 from ...core.logger import setup_logger
+from ...core.metrics import observe_service
 
 logger = setup_logger(__name__)
 
 
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None) if value else None
+    except ValueError:
+        return None
+
+
+def _describe(event: Event) -> str:
+    line = (
+        f"- #{event.id} {event.event_name}: "
+        f"{event.event_start_date_time:%Y-%m-%d %H:%M} to "
+        f"{event.event_end_date_time:%Y-%m-%d %H:%M}"
+    )
+    if event.event_location:
+        line += f" at {event.event_location}"
+    return line
+
+
 class ChatService:
-    def __init__(self, llm_repository: LLMRepository):
+    def __init__(
+        self,
+        llm_repository: LLMRepository,
+        event_index: Optional[EventIndex] = None,
+        top_k: int = 0,
+    ):
         self.llm_repository = llm_repository
+        self.event_index = event_index
+        self.top_k = top_k
 
-    async def process_chat(self, messages: List[Dict], functions: List[Dict]) -> Dict:
+    @observe_service("chat_service")
+    async def process_chat(
+        self,
+        messages: List[Dict],
+        functions: List[Dict],
+        selected_date: Optional[str] = None,
+        calendar_id: str = "default",
+    ) -> Dict:
+        if self.event_index is not None and self.top_k > 0:
+            messages = self._with_relevant_events(
+                messages, calendar_id, _parse_date(selected_date)
+            )
         return await self.llm_repository.chat(messages, functions)
 
+    @observe_service("chat_service")
     async def generate_calendar_ics(self, messages: List[Dict]) -> str:
         return await self.llm_repository.generate_ics(messages)
+
+    def _with_relevant_events(
+        self, messages: List[Dict], calendar_id: str, around: Optional[datetime]
+    ) -> List[Dict]:
+        """Add the events relevant to the latest user turn, for this call only.
+
+        The context is rebuilt on every request instead of living in the
+        conversation, so it is never resent and stays top_k events long
+        however large the calendar grows.
+        """
+        query = next(
+            (
+                message.get("content") or ""
+                for message in reversed(messages)
+                if message.get("role") == "user"
+            ),
+            "",
+        )
+        events = self.event_index.search(calendar_id, query, around, self.top_k)
+        if not events:
+            return messages
+        context = {
+            "role": "system",
+            "content": "Existing calendar events relevant to this request:\n"
+            + "\n".join(_describe(event) for event in events),
+        }
+        # After the leading system prompt, so the instructions still come first
+        split = 0
+        while split < len(messages) and messages[split].get("role") == "system":
+            split += 1
+        return messages[:split] + [context] + messages[split:]
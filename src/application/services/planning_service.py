@@ -0,0 +1,144 @@
+import asyncio
+from typing import Callable, List, Optional, Set
+
+from ...core.context import Priority, client_id_var, endpoint_var, priority_var
+from ...core.logger import setup_logger
+from ...core.metrics import PLANNING_JOBS, observe_service
+from ...core.tracing import start_trace
+from ...domain.entities.job import PlanningJob
+from ...domain.interfaces.repositories import JobRepository
+from .chat_service import ChatService
+
+logger = setup_logger(__name__)
+
+
+class PlanningService:
+    """Runs planning requests as background jobs.
+
+    Requests are queued in a JobRepository and answered with a job ID at
+    once; a bounded pool of asyncio workers in each API process claims and
+    runs them, so a long LLM run no longer holds an HTTP connection.
+    """
+
+    def __init__(
+        self,
+        job_repository: JobRepository,
+        chat_service: Callable[[], ChatService],
+        workers: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+    ):
+        self.job_repository = job_repository
+        # A factory, so processes that never run a job skip the LLM stack
+        self.chat_service = chat_service
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self._wakeup = asyncio.Event()
+
+    @observe_service("planning_service")
+    async def submit(self, request: dict, client_id: str) -> PlanningJob:
+        job = await self.job_repository.enqueue(request, client_id)
+        self._wakeup.set()
+        return job
+
+    @observe_service("planning_service")
+    async def get_job(self, job_id: str) -> Optional[PlanningJob]:
+        return await self.job_repository.get(job_id)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    async def start(self) -> None:
+        if self.workers <= 0:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"planning-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._renew(), name="planning-lease"))
+        logger.info(f"Started {self.workers} planning workers")
+
+    async def close(self) -> None:
+        """Stop the workers; jobs they were running go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        # Each worker is its own task, so this only labels the calls it makes
+        endpoint_var.set("planning_job")
+        while True:
+            # Cleared before claiming, so a submit during the claim is not missed
+            self._wakeup.clear()
+            try:
+                job = await self.job_repository.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim a planning job: {str(e)}")
+                job = None
+            if job is not None:
+                try:
+                    await self._run(job)
+                except Exception as e:
+                    # Recording the outcome failed: the job's lease lapses
+                    # and requeue_stale hands it out again
+                    logger.error(f"Failed to record planning job {job.id}: {str(e)}")
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: PlanningJob) -> None:
+        self._running.add(job.id)
+        client_token = client_id_var.set(job.client_id)
+        # Queued work yields to interactive chat in the LLM scheduler
+        priority_token = priority_var.set(Priority.BATCH)
+        try:
+            with start_trace("planning_job") as root:
+                root.set("job_id", job.id)
+                root.set("attempt", job.attempts)
+                result = await self.chat_service().process_chat(
+                    job.request["messages"],
+                    job.request.get("functions") or [],
+                    job.request.get("selected_date"),
+                    job.request.get("calendar_id", "default"),
+                )
+        except asyncio.CancelledError:
+            try:
+                await self.job_repository.release(job.id)
+                logger.info(f"Planning job {job.id} returned to the queue")
+            except Exception as e:
+                # Still stopping: the lease lapses and the job is requeued
+                logger.error(f"Failed to release planning job {job.id}: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Planning job {job.id} failed: {str(e)}")
+            PLANNING_JOBS.inc("failed")
+            await self.job_repository.fail(job.id, str(e) or type(e).__name__)
+        else:
+            PLANNING_JOBS.inc("succeeded")
+            await self.job_repository.complete(job.id, result)
+        finally:
+            priority_var.reset(priority_token)
+            client_id_var.reset(client_token)
+            self._running.discard(job.id)
+
+    async def _renew(self) -> None:
+        """Heartbeat our jobs and recover those of workers that died."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if self._running:
+                    await self.job_repository.heartbeat(list(self._running))
+                await self.job_repository.requeue_stale(
+                    self.lease_seconds, self.max_attempts
+                )
+            except Exception as e:
+                logger.error(f"Failed to renew planning job leases: {str(e)}")
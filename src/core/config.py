@@ -14,6 +14,78 @@ class Settings(BaseModel):
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "mysecretpassword")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    # Seconds a thread (export streams) waits for a connection when all are
+    # in use; the event loop never waits, one connection is kept back for it
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    # Seconds to open a connection, unless a DSN sets its own connect_timeout
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+
+    # Read/write splitting: POSTGRES_PRIMARY_DSN overrides the POSTGRES_*
+    # settings above; reads that tolerate lag go to POSTGRES_REPLICA_DSNS
+    # (comma-separated), skipping replicas more than the max lag behind
+    POSTGRES_PRIMARY_DSN: str = os.getenv("POSTGRES_PRIMARY_DSN", "")
+    POSTGRES_REPLICA_DSNS: str = os.getenv("POSTGRES_REPLICA_DSNS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(
+        os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5")
+    )
+    DB_REPLICA_CHECK_INTERVAL: float = float(
+        os.getenv("DB_REPLICA_CHECK_INTERVAL", "2")
+    )
+    DB_READ_YOUR_WRITES_SECONDS: float = float(
+        os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5")
+    )
+
+    # Calendar events hash-sharded by calendar ID over these DSNs
+    # (comma-separated; "options=-csearch_path=..." selects a schema).
+    # Empty keeps every calendar on the primary
+    SHARD_DSNS: str = os.getenv("SHARD_DSNS", "")
+
+    # Group commit for POST /events: concurrent inserts within the window
+    # share one statement and one commit
+    EVENT_INSERT_BATCHING: bool = os.getenv("EVENT_INSERT_BATCHING", "false") == "true"
+    EVENT_INSERT_BATCH_WINDOW_MS: float = float(
+        os.getenv("EVENT_INSERT_BATCH_WINDOW_MS", "2")
+    )
+    EVENT_INSERT_BATCH_MAX_SIZE: int = int(
+        os.getenv("EVENT_INSERT_BATCH_MAX_SIZE", "100")
+    )
+
+    # Rendering of GET /events: "model" (response_model), or opt in to
+    # "database" (Postgres builds the JSON) or "orjson" (plain dicts
+    # serialised by orjson), which skip response validation
+    EVENT_LIST_RENDERING: str = os.getenv("EVENT_LIST_RENDERING", "model")
+
+    # Live change feed: "postgres" (LISTEN/NOTIFY across workers) or "memory"
+    CHANGE_FEED: str = os.getenv("CHANGE_FEED", "postgres")
+
+    # Events retrieved into chat prompts (RETRIEVAL_TOP_K=0 disables)
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "20"))
+    RETRIEVAL_TIME_WEIGHT: float = float(os.getenv("RETRIEVAL_TIME_WEIGHT", "1.0"))
+    RETRIEVAL_TIME_SCALE_DAYS: float = float(
+        os.getenv("RETRIEVAL_TIME_SCALE_DAYS", "7")
+    )
+
+    # Day summaries behind GET /weeks/{iso_week}/summary: free blocks are
+    # gaps of at least WEEK_SUMMARY_MIN_FREE_MINUTES within these hours
+    WEEK_SUMMARY_DAY_START_HOUR: int = int(
+        os.getenv("WEEK_SUMMARY_DAY_START_HOUR", "8")
+    )
+    WEEK_SUMMARY_DAY_END_HOUR: int = int(os.getenv("WEEK_SUMMARY_DAY_END_HOUR", "18"))
+    WEEK_SUMMARY_MIN_FREE_MINUTES: int = int(
+        os.getenv("WEEK_SUMMARY_MIN_FREE_MINUTES", "30")
+    )
+
+    # Planning job queue (JOB_WORKERS=0: this process only enqueues)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # Server settings (used by run.py --prod)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
 
     # LLM settings
     LLM_API_URL: str = os.getenv(
@@ -21,6 +93,47 @@ class Settings(BaseModel):
     )
     MODEL_ID: str = os.getenv("MODEL_ID", "gpt-3.5-turbo")
     LLM_API_KEY: str = os.getenv("LLM_API_KEY", "")
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+
+    # Admission control (0 disables a limit): per-client token bucket,
+    # in-flight cap with slots reserved for GET /events and /weeks, and a
+    # bounded queue in front of the LLM-backed routes
+    RATE_LIMIT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "40"))
+    HTTP_MAX_IN_FLIGHT: int = int(os.getenv("HTTP_MAX_IN_FLIGHT", "64"))
+    HTTP_RESERVED_READS: int = int(os.getenv("HTTP_RESERVED_READS", "16"))
+    CHAT_MAX_IN_FLIGHT: int = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+    CHAT_QUEUE_SIZE: int = int(os.getenv("CHAT_QUEUE_SIZE", "16"))
+    CHAT_QUEUE_TARGET_MS: float = float(os.getenv("CHAT_QUEUE_TARGET_MS", "2000"))
+
+    # LLM scheduler settings
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_CONCURRENCY_PER_CLIENT: int = int(
+        os.getenv("LLM_MAX_CONCURRENCY_PER_CLIENT", "2")
+    )
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_MAX_BACKOFF: float = float(os.getenv("LLM_MAX_BACKOFF", "30"))
+    LLM_REQUEST_DEADLINE: float = float(os.getenv("LLM_REQUEST_DEADLINE", "300"))
+
+    # LLM call profiling: one JSON line per call in this file (empty disables)
+    LLM_PROFILE_PATH: str = os.getenv("LLM_PROFILE_PATH", "")
+
+    # LLM router settings (JSON list of OpenAI-compatible backends)
+    LLM_BACKENDS: str = os.getenv("LLM_BACKENDS", "")
+    LLM_HEDGE_AFTER_MS: str = os.getenv("LLM_HEDGE_AFTER_MS", "")
+    LLM_ROUTER_WINDOW: int = int(os.getenv("LLM_ROUTER_WINDOW", "200"))
+
+    # Logging settings (format: json or text; LOG_LEVELS: logger=LEVEL,...)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_MAX_MESSAGE_LENGTH: int = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", "2000"))
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+    # Tracing settings (exporter: none, console or jsonl)
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
 
     class Config:
         env_file = ".env"
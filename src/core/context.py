@@ -0,0 +1,19 @@
+from contextvars import ContextVar
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 10
+
+
+# Identity of the caller the current request is made on behalf of
+client_id_var: ContextVar[str] = ContextVar("client_id", default="anonymous")
+
+# What the current work is serving ("POST /chat", "planning_job", ...)
+endpoint_var: ContextVar[str] = ContextVar("endpoint", default="-")
+
+# Scheduling priority of the LLM calls made by the current request
+priority_var: ContextVar[Priority] = ContextVar(
+    "priority", default=Priority.INTERACTIVE
+)
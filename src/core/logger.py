@@ -1,18 +1,128 @@
+"""Central logging setup.
+
+Loggers only enqueue records; a single QueueListener thread formats them as
+JSON (or text) and writes to stdout, so slow terminals or log shippers never
+block the event loop. Messages are truncated to ``LOG_MAX_MESSAGE_LENGTH`` and
+DEBUG records can be sampled with ``LOG_DEBUG_SAMPLE_RATE``, so logging a
+large LLM payload costs a bounded amount of I/O.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
 
+from .config import get_settings
+from .context import client_id_var
+from .tracing import current_trace_id
 
-def setup_logger(name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("trace_id", "client_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Capture request context and bound the record before it leaves the thread."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_length: int, sample: float):
+        super().__init__(log_queue)
+        self.max_length = max_length
+        self.sample = sample
+        self.exception_formatter = logging.Formatter()
 
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.DEBUG)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_length:
+            message = (
+                f"{message[:self.max_length]}... "
+                f"[truncated {len(message) - self.max_length} chars]"
+            )
+        record.msg, record.args = message, None
+        if record.exc_info:
+            record.exc_text = self.exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        # Context variables are per task, so they must be read here, not in
+        # the listener thread
+        record.trace_id = current_trace_id()
+        record.client_id = client_id_var.get()
+        return record
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < logging.INFO and random.random() >= self.sample:
+            return
+        super().emit(record)
+
+
+def parse_levels(raw: str) -> Dict[str, str]:
+    """Parse ``LOG_LEVELS`` such as ``src.infrastructure.llm=DEBUG,httpx=WARNING``."""
+    levels = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger; later calls are no-ops."""
+    global _listener
+    if _listener is not None:
+        return
+    settings = get_settings()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
     )
-    handler.setFormatter(formatter)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
-    logger.addHandler(handler)
-    return logger
+    root = logging.getLogger()
+    root.handlers = [
+        _QueueHandler(
+            log_queue, settings.LOG_MAX_MESSAGE_LENGTH, settings.LOG_DEBUG_SAMPLE_RATE
+        )
+    ]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,297 @@
+"""Minimal Prometheus-style metrics.
+
+Updates are plain dict and list operations without locks: instrumented code
+runs on the event loop thread and each update is a single step under the GIL,
+so recording a sample costs little more than a dict lookup. Gauges that
+mirror existing state (queue depth, pool usage) are read through callbacks at
+scrape time instead of being updated on the hot path.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import span
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self._values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_callback(self, callback: Callable[[], Dict[Labels, float]]) -> None:
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        lines = self.header()
+        for labels, value in values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count in +Inf], sum
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] = self._sums.get(labels, 0.0) + value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, counts in list(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(
+                f"{self.name}_sum{label_text} {_format_value(self._sums[labels])}"
+            )
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registering returns the existing metric so module reloads are safe
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+SERVICE_CALL_SECONDS = histogram(
+    "service_call_duration_seconds",
+    "Application service method latency",
+    ("service", "method"),
+)
+DB_QUERY_SECONDS = histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency",
+    ("statement",),
+)
+DB_INSERT_BATCH_SIZE = histogram(
+    "db_insert_batch_size",
+    "Events written per group-committed insert",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_duration_seconds",
+    "LLM provider call latency",
+    ("model", "operation", "status"),
+)
+LLM_TOKENS = counter(
+    "llm_tokens_total",
+    "Tokens reported in LLM response usage",
+    ("model", "kind"),
+)
+DB_CONNECTIONS = gauge(
+    "db_connections_open", "Pooled PostgreSQL connections", ("pool", "state")
+)
+DB_REPLICA_LAG_SECONDS = gauge(
+    "db_replica_lag_seconds", "Replication lag last measured per replica", ("replica",)
+)
+LLM_QUEUE_WAIT_SECONDS = histogram(
+    "llm_scheduler_wait_seconds",
+    "Time LLM calls spent queued before admission",
+    ("priority",),
+)
+LLM_QUEUE_DEPTH = gauge("llm_scheduler_queue_depth", "LLM calls waiting for a slot")
+LLM_IN_FLIGHT = gauge("llm_scheduler_in_flight", "LLM calls currently admitted")
+PLANNING_JOBS = counter(
+    "planning_jobs_total", "Planning jobs run by this process", ("outcome",)
+)
+PLANNING_JOBS_RUNNING = gauge(
+    "planning_jobs_running", "Planning jobs currently run by this process"
+)
+HTTP_REJECTED = counter(
+    "http_requests_rejected_total",
+    "Requests shed by admission control",
+    ("class", "reason"),
+)
+HTTP_IN_FLIGHT = gauge(
+    "http_requests_in_flight", "Requests holding an admission slot", ("class",)
+)
+HTTP_QUEUE_WAIT_SECONDS = histogram(
+    "http_admission_wait_seconds", "Time LLM-backed requests spent queued"
+)
+HTTP_QUEUE_DEPTH = gauge(
+    "http_admission_queue_depth", "LLM-backed requests waiting for a slot"
+)
+
+
+def observe_service(service: str) -> Callable:
+    """Record the latency of an async service method, inside a trace span."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(f"{service}.{func.__name__}"), SERVICE_CALL_SECONDS.time(
+                service, func.__name__
+            ):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,219 @@
+"""Lightweight span-based request tracing.
+
+A trace starts in the HTTP middleware (continuing a W3C ``traceparent``
+header when the caller sends one) and follows the request through services,
+SQL statements and LLM calls via a context variable. Finished spans of
+sampled traces are handed to a background thread that writes them as JSON
+lines, so one request's critical path can be rebuilt offline with
+``python -m tools.trace_view``.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional
+
+from .config import get_settings
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "sampled",
+        "attributes",
+        "started_at",
+        "_started",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        sampled: bool = True,
+    ):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.sampled = sampled
+        self.attributes: Dict[str, object] = {}
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, key: str, value: object) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if not self.sampled:
+            return
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": (time.perf_counter() - self._started) * 1000,
+            "status": "error" if error is not None else "ok",
+            "attributes": self.attributes,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        _exporter().export(record)
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _Exporter:
+    def __init__(self, kind: str, path: str, name: str = "trace-exporter"):
+        self.kind = kind
+        self.path = path
+        self.name = name
+        self.queue: "queue.SimpleQueue[Optional[dict]]" = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+
+    def export(self, record: dict) -> None:
+        if self.kind == "none":
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self.thread.start()
+        self.queue.put(record)
+
+    def _run(self) -> None:
+        out = open(self.path, "a") if self.kind == "jsonl" else sys.stdout
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            out.write("".join(json.dumps(r, default=str) + "\n" for r in batch if r))
+            out.flush()
+            if stop:
+                if out is not sys.stdout:
+                    out.close()
+                return
+
+    def shutdown(self) -> None:
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+            self.thread = None
+
+
+_EXPORTER: Optional[_Exporter] = None
+
+
+def _exporter() -> _Exporter:
+    global _EXPORTER
+    if _EXPORTER is None:
+        settings = get_settings()
+        _EXPORTER = _Exporter(settings.TRACE_EXPORTER, settings.TRACE_EXPORT_PATH)
+    return _EXPORTER
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still queued for export."""
+    if _EXPORTER is not None:
+        _EXPORTER.shutdown()
+
+
+def _parse_traceparent(header: Optional[str]):
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None) -> Iterator[Span]:
+    """Open the root span of a request, continuing the caller's trace if any."""
+    parent = _parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, forced = parent
+    else:
+        trace_id, parent_id, forced = os.urandom(16).hex(), None, False
+    # Decided from the trace ID so every request of a multi-request trace
+    # (one Streamlit interaction) is kept or dropped together
+    sampled = (
+        forced or int(trace_id[-8:], 16) < get_settings().TRACE_SAMPLE_RATE * 2**32
+    )
+    if get_settings().TRACE_EXPORTER == "none":
+        sampled = False
+    root = Span(name, trace_id, parent_id, sampled)
+    token = current_span.set(root)
+    error = None
+    try:
+        yield root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        current_span.reset(token)
+        root.finish(error)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Open a child of the current span; a no-op outside sampled traces."""
+    parent = current_span.get()
+    if parent is None or not parent.sampled:
+        yield parent
+        return
+    child = Span(name, parent.trace_id, parent.span_id)
+    child.attributes.update(attributes)
+    token = current_span.set(child)
+    error = None
+    try:
+        yield child
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        current_span.reset(token)
+        child.finish(error)
+
+
+def traced(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers that carry the current trace to a downstream HTTP service."""
+    current = current_span.get()
+    return {"traceparent": current.traceparent} if current is not None else {}
+
+
+def current_trace_id() -> Optional[str]:
+    current = current_span.get()
+    return current.trace_id if current is not None else None
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from pydantic import BaseModel
-from .task import TaskCreate
+from .task import Task
 
 
 class Event(BaseModel):
@@ -11,4 +11,15 @@ class Event(BaseModel):
     event_start_date_time: datetime
     event_end_date_time: datetime
     event_location: Optional[str] = None
-    tasks: Optional[List[TaskCreate]] = None
+    version: Optional[int] = None
+    calendar_id: str = "default"
+    # Only loaded when asked for: None means not loaded, [] means none
+    tasks: Optional[List[Task]] = None
+
+
+class EventPatch(BaseModel):
+    """Partial update of one event; applied only at expected_version if set."""
+
+    id: int
+    changes: Dict[str, Any]
+    expected_version: Optional[int] = None
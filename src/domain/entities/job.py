@@ -0,0 +1,30 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class PlanningJob(BaseModel):
+    id: str
+    status: JobStatus
+    request: dict
+    client_id: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    # Jobs queued ahead of this one, while it is queued
+    position: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
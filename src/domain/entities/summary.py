@@ -0,0 +1,30 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class FreeBlock(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class DaySummary(BaseModel):
+    """How busy one day of a calendar is; events are clipped to the day."""
+
+    day: date
+    event_count: int = 0
+    # Time covered by at least one event: overlapping events count once
+    busy_minutes: int = 0
+    first_start: Optional[datetime] = None
+    last_end: Optional[datetime] = None
+    # Gaps of the working day long enough to plan something in
+    free_blocks: List[FreeBlock] = []
+
+
+class WeekSummary(BaseModel):
+    calendar_id: str
+    iso_week: str
+    days: List[DaySummary]
+    event_count: int
+    busy_minutes: int
+    free_minutes: int
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -6,3 +7,13 @@ class TaskCreate(BaseModel):
     task_name: str
     task_start_date_time: datetime
     task_end_date_time: datetime
+
+
+class Task(BaseModel):
+    """A sub-task stored under its parent event."""
+
+    # Fields in the order of the listings (id first), hence not a TaskCreate
+    id: Optional[int] = None
+    task_name: str
+    task_start_date_time: datetime
+    task_end_date_time: datetime
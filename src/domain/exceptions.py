@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from .entities.event import Event
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMProviderError(LLMError):
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: Optional[bool] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = (
+            retryable
+            if retryable is not None
+            else status_code in RETRYABLE_STATUS_CODES
+        )
+
+
+class LLMDeadlineExceeded(LLMError):
+    pass
+
+
+class EventNotFound(Exception):
+    def __init__(self, event_id: int):
+        super().__init__(f"Event {event_id} not found")
+        self.event_id = event_id
+
+
+class EventVersionConflict(Exception):
+    """The event changed since the client read it (optimistic concurrency)."""
+
+    def __init__(self, event_id: int, expected_version: int, current_version: int):
+        super().__init__(
+            f"Event {event_id} is at version {current_version}, "
+            f"not {expected_version}"
+        )
+        self.event_id = event_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class EventTimeRangeInvalid(Exception):
+    """A patch would leave an event ending at or before its start."""
+
+    def __init__(self, event_id: int):
+        super().__init__(f"Event {event_id} would not end after it starts")
+        self.event_id = event_id
+
+
+class EventsPartiallyCreated(Exception):
+    """create_many committed the events of some shards, then another failed.
+
+    ``created`` is in input order, with None for each event not inserted.
+    """
+
+    def __init__(self, created: List[Optional[Event]], error: Exception):
+        inserted = sum(event is not None for event in created)
+        super().__init__(f"{inserted} of {len(created)} events created: {error}")
+        self.created = created
@@ -1,7 +1,11 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from ..entities.event import Event
-from ..entities.task import TaskCreate  # Add this import if needed
+from datetime import date, datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+from ..entities.event import Event, EventPatch
+from ..entities.job import PlanningJob
+from ..entities.summary import DaySummary
+from ..entities.task import TaskCreate
 
 
 class EventRepository(ABC):
@@ -10,15 +14,90 @@ class EventRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_all(self) -> List[Event]:
+    async def create_many(self, events: List[Event]) -> List[Event]:
+        """Insert the events; results are in input order.
+
+        Events of one shard (all of them, unsharded) go in one transaction.
+        If a shard fails after others committed, raises EventsPartiallyCreated
+        with the events that were inserted.
+        """
+        pass
+
+    @abstractmethod
+    async def get_all(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> List[Event]:
+        """With include_tasks, each event's tasks are loaded in one more query."""
+        pass
+
+    @abstractmethod
+    async def get_all_json(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> bytes:
+        """A calendar's events overlapping [start, end) as a JSON array."""
+        pass
+
+    @abstractmethod
+    async def set_tasks(
+        self, calendar_id: str, event_id: int, tasks: List[TaskCreate]
+    ) -> Optional[Event]:
+        """Replace an event's tasks; returns the event with them, or None if not found."""
         pass
 
     @abstractmethod
-    async def delete(self, event_id: int) -> bool:
+    async def update_many(
+        self, calendar_id: str, patches: List[EventPatch]
+    ) -> List[Event]:
+        """Apply all patches in one transaction, or none of them.
+
+        Raises EventNotFound, EventVersionConflict or EventTimeRangeInvalid
+        (the patched event would not end after it starts) for the first
+        patch that cannot be applied; events of other calendars count as not
+        found.
+        """
+        pass
+
+    @abstractmethod
+    async def get_version(self, calendar_id: str) -> int:
+        """A number that changes whenever any of the calendar's events is written.
+
+        It may also change on writes to other calendars stored alongside.
+        """
         pass
 
     @abstractmethod
-    async def get_by_id(self, event_id: int) -> Optional[Event]:
+    async def delete(self, calendar_id: str, event_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, calendar_id: str, event_id: int) -> Optional[Event]:
+        pass
+
+    @abstractmethod
+    async def get_by_ids(self, calendar_id: str, event_ids: List[int]) -> List[Event]:
+        """The calendar's events among event_ids, in no particular order."""
+        pass
+
+    @abstractmethod
+    def iter_row_batches(
+        self,
+        calendar_id: Optional[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Tuple]]:
+        """Yield raw event rows overlapping [start, end) in batches, for exports.
+
+        With calendar_id None, rows of every calendar are yielded.
+        """
         pass
 
 
@@ -30,3 +109,102 @@ class LLMRepository(ABC):
     @abstractmethod
     async def generate_ics(self, messages: List[dict]) -> str:
         pass
+
+
+class JobRepository(ABC):
+    """Durable queue of planning jobs shared by every worker process."""
+
+    @abstractmethod
+    async def enqueue(self, request: dict, client_id: str) -> PlanningJob:
+        pass
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[PlanningJob]:
+        pass
+
+    @abstractmethod
+    async def claim(self) -> Optional[PlanningJob]:
+        """Mark the oldest queued job running and return it, if there is one.
+
+        Concurrent callers never receive the same job.
+        """
+        pass
+
+    @abstractmethod
+    async def heartbeat(self, job_ids: List[str]) -> None:
+        """Extend the lease of running jobs."""
+        pass
+
+    @abstractmethod
+    async def complete(self, job_id: str, result: dict) -> None:
+        pass
+
+    @abstractmethod
+    async def fail(self, job_id: str, error: str) -> None:
+        pass
+
+    @abstractmethod
+    async def release(self, job_id: str) -> None:
+        """Put a running job back in the queue, e.g. on shutdown."""
+        pass
+
+    @abstractmethod
+    async def requeue_stale(self, lease_seconds: float, max_attempts: int) -> int:
+        """Requeue running jobs whose lease expired, or fail those out of attempts.
+
+        Returns how many jobs were requeued or failed.
+        """
+        pass
+
+
+class WeekSummaryRepository(ABC):
+    """Per-day busyness of each calendar, precomputed from its events."""
+
+    @abstractmethod
+    async def refresh(self, calendar_id: str, days: Iterable[date]) -> List[DaySummary]:
+        """Recompute and store the summaries of days whose events changed."""
+        pass
+
+    @abstractmethod
+    async def get_days(
+        self, calendar_id: str, start: date, count: int
+    ) -> List[DaySummary]:
+        """Summaries of count days from start, computing any never stored."""
+        pass
+
+
+class EventIndex(ABC):
+    """Relevance search over events, kept in step with writes."""
+
+    @abstractmethod
+    def search(
+        self,
+        calendar_id: str,
+        query: str,
+        around: Optional[datetime] = None,
+        k: int = 10,
+    ) -> List[Event]:
+        """The calendar's k events most relevant to query, favouring those near around."""
+        pass
+
+
+class ChangeFeed(ABC):
+    """Fan-out of event changes to live subscribers.
+
+    A change is a compact delta: ``{"type": ..., "calendar_id": ...,
+    "upserted": [event, ...], "deleted": [id, ...]}``, or ``{"type": "resync"}`` when a subscriber may
+    have missed deltas and should reload; a resync with a ``calendar_id``
+    concerns that calendar only.
+    """
+
+    @abstractmethod
+    async def publish(self, change: dict) -> None:
+        pass
+
+    @abstractmethod
+    def subscribe(self) -> "asyncio.Queue[dict]":
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, queue: "asyncio.Queue[dict]") -> None:
+        pass
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Set
+
+from ...core.logger import setup_logger
+from ...domain.interfaces.repositories import ChangeFeed
+
+logger = setup_logger(__name__)
+
+RESYNC = {"type": "resync"}
+
+
+def resync(calendar_id: str) -> dict:
+    """Reload one calendar only; RESYNC reloads every calendar."""
+    return {"type": "resync", "calendar_id": calendar_id}
+
+
+class InMemoryChangeFeed(ChangeFeed):
+    """Delivers changes to the subscribers of this process only."""
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+    async def publish(self, change: dict) -> None:
+        self._deliver(change)
+
+    def subscribe(self) -> "asyncio.Queue[dict]":
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[dict]") -> None:
+        self._subscribers.discard(queue)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _deliver(self, change: dict) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # A subscriber that cannot keep up reloads the calendars whose
+                # deltas it drops instead of holding back the feed for everyone
+                logger.warning("Change feed subscriber lagging, asking it to resync")
+                calendar_ids = {change.get("calendar_id")}
+                while not queue.empty():
+                    calendar_ids.add(queue.get_nowait().get("calendar_id"))
+                if None in calendar_ids or len(calendar_ids) > self.max_queue:
+                    queue.put_nowait(RESYNC)
+                else:
+                    for calendar_id in calendar_ids:
+                        queue.put_nowait(resync(calendar_id))
+            else:
+                queue.put_nowait(change)
@@ -0,0 +1,151 @@
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, make_dsn, parse_dsn
+
+from ...core.config import get_settings
+from ...core.logger import setup_logger
+from ..database.pool import connection, primary_dsn
+from .memory import RESYNC, InMemoryChangeFeed, resync
+
+logger = setup_logger(__name__)
+
+CHANNEL = "calendar_changes"
+# NOTIFY payloads are limited to 8000 bytes: larger changes are split into
+# several deltas, and only a single event too large for one becomes a resync
+# of its calendar
+MAX_PAYLOAD = 7900
+
+
+def _encode(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _payloads(change: dict) -> List[str]:
+    """The change as NOTIFY payloads of at most MAX_PAYLOAD bytes each."""
+    payload = _encode(change)
+    if len(payload.encode()) <= MAX_PAYLOAD:
+        return [payload]
+    oversized = [
+        _encode(resync(change["calendar_id"]) if "calendar_id" in change else RESYNC)
+    ]
+    # Deltas of the same type, each with a share of the upserts and deletes
+    budget = MAX_PAYLOAD - len(
+        _encode({**change, "upserted": [], "deleted": []}).encode()
+    )
+    chunks: List[Dict[str, list]] = [{"upserted": [], "deleted": []}]
+    used = 0
+    for key in ("upserted", "deleted"):
+        for item in change.get(key, []):
+            size = len(_encode(item).encode()) + 1
+            if size > budget:
+                return oversized
+            if used + size > budget:
+                chunks.append({"upserted": [], "deleted": []})
+                used = 0
+            chunks[-1][key].append(item)
+            used += size
+    if len(chunks) == 1:
+        # Large for another reason than its events
+        return oversized
+    return [_encode({**change, **chunk}) for chunk in chunks]
+
+
+def _open_listener():
+    dsn = primary_dsn()
+    if "connect_timeout" not in parse_dsn(dsn):
+        dsn = make_dsn(dsn, connect_timeout=get_settings().DB_CONNECT_TIMEOUT)
+    conn = psycopg2.connect(dsn)
+    try:
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+class PostgresChangeFeed(InMemoryChangeFeed):
+    """Fans changes out to every worker through LISTEN/NOTIFY.
+
+    Publishing only sends a NOTIFY; each worker, including the publisher,
+    receives it on its listening connection and hands it to its local
+    subscribers, so all workers see changes in the same order. That is the
+    order they were published in, not the order of the writes: a change is
+    published in its own transaction once its write has committed.
+    """
+
+    def __init__(self, max_queue: int = 1000, reconnect_delay: float = 1.0):
+        super().__init__(max_queue)
+        self.reconnect_delay = reconnect_delay
+        self._conn = None
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self._listen()
+
+    async def close(self) -> None:
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+            await asyncio.gather(self._reconnect, return_exceptions=True)
+            self._reconnect = None
+        self._disconnect()
+        self._loop = None
+        await super().close()
+
+    async def publish(self, change: dict) -> None:
+        # One transaction: the deltas of a split change arrive together
+        with connection() as conn, conn.cursor() as cur:
+            for payload in _payloads(change):
+                cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+            conn.commit()
+
+    async def _listen(self, delay: float = 0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            # Off the loop: connecting to an unreachable primary takes up to
+            # DB_CONNECT_TIMEOUT seconds
+            conn = await self._loop.run_in_executor(None, _open_listener)
+        except psycopg2.Error as e:
+            logger.error(f"Change feed cannot listen: {str(e)}")
+            self._schedule_reconnect()
+            return
+        self._conn, self._fd = conn, conn.fileno()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self) -> None:
+        try:
+            self._conn.poll()
+        except psycopg2.Error as e:
+            logger.error(f"Change feed connection lost: {str(e)}")
+            self._disconnect()
+            # Deltas may have been missed while the connection was down
+            self._deliver(RESYNC)
+            self._schedule_reconnect()
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                self._deliver(json.loads(notify.payload))
+            except ValueError:
+                logger.warning(f"Ignoring malformed change: {notify.payload[:200]}")
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._fd)
+            self._conn.close()
+            self._conn, self._fd = None, None
+
+    def _schedule_reconnect(self) -> None:
+        if self._loop is not None:
+            self._reconnect = self._loop.create_task(
+                self._listen(self.reconnect_delay), name="change-feed-reconnect"
+            )
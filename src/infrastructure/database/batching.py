@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from ...core.logger import setup_logger
+from ...core.metrics import DB_INSERT_BATCH_SIZE
+from ...domain.entities.event import Event, EventPatch
+from ...domain.entities.task import TaskCreate
+from ...domain.exceptions import EventsPartiallyCreated
+from ...domain.interfaces.repositories import EventRepository
+
+logger = setup_logger(__name__)
+
+
+class BatchingEventRepository(EventRepository):
+    """Group commit for event inserts, in front of another EventRepository.
+
+    create() calls arriving within ``window`` seconds of the first pending
+    one are written together with create_many(): one multi-row INSERT and
+    one commit instead of one per request. A batch is flushed early once it
+    reaches ``max_size``. Every caller still gets its own event back; if the
+    batch fails, the events it did not insert (with shards, those committed
+    on other shards are kept) are retried one by one so only the offending
+    caller sees the error. Other operations pass straight through.
+    """
+
+    def __init__(self, repository: EventRepository, window: float, max_size: int):
+        self.repository = repository
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[Event, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def create(self, event: Event) -> Event:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((event, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._write(batch))
+
+    async def _write(self, batch: List[Tuple[Event, asyncio.Future]]) -> None:
+        DB_INSERT_BATCH_SIZE.observe(len(batch))
+        try:
+            created = await self.repository.create_many([event for event, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                _settle(batch[0][1], error=e)
+                return
+            created = e.created if isinstance(e, EventsPartiallyCreated) else []
+            for (_, future), event in zip(batch, created):
+                if event is not None:
+                    _settle(future, event)
+            failed = [(event, future) for event, future in batch if not future.done()]
+            logger.warning(
+                f"Batched insert of {len(batch)} events failed, "
+                f"retrying {len(failed)} one by one: {str(e)}"
+            )
+            for event, future in failed:
+                try:
+                    _settle(future, await self.repository.create(event))
+                except Exception as row_error:
+                    _settle(future, error=row_error)
+            return
+        for (_, future), event in zip(batch, created):
+            _settle(future, event)
+
+    async def create_many(self, events: List[Event]) -> List[Event]:
+        return await self.repository.create_many(events)
+
+    async def get_all(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> List[Event]:
+        return await self.repository.get_all(calendar_id, start, end, include_tasks)
+
+    async def get_all_json(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> bytes:
+        return await self.repository.get_all_json(
+            calendar_id, start, end, include_tasks
+        )
+
+    async def set_tasks(
+        self, calendar_id: str, event_id: int, tasks: List[TaskCreate]
+    ) -> Optional[Event]:
+        return await self.repository.set_tasks(calendar_id, event_id, tasks)
+
+    async def update_many(
+        self, calendar_id: str, patches: List[EventPatch]
+    ) -> List[Event]:
+        return await self.repository.update_many(calendar_id, patches)
+
+    async def get_version(self, calendar_id: str) -> int:
+        return await self.repository.get_version(calendar_id)
+
+    async def delete(self, calendar_id: str, event_id: int) -> bool:
+        return await self.repository.delete(calendar_id, event_id)
+
+    async def get_by_id(self, calendar_id: str, event_id: int) -> Optional[Event]:
+        return await self.repository.get_by_id(calendar_id, event_id)
+
+    async def get_by_ids(self, calendar_id: str, event_ids: List[int]) -> List[Event]:
+        return await self.repository.get_by_ids(calendar_id, event_ids)
+
+    def iter_row_batches(
+        self,
+        calendar_id: Optional[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Tuple]]:
+        return self.repository.iter_row_batches(calendar_id, start, end, batch_size)
+
+
+def _settle(
+    future: asyncio.Future,
+    result: Optional[Event] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    # The caller may have gone away (client disconnect) while it was queued
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
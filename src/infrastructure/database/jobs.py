@@ -0,0 +1,169 @@
+import uuid
+from typing import List, Optional, Tuple
+
+from psycopg2.extras import Json
+
+from ...domain.entities.job import JobStatus, PlanningJob
+from ...domain.interfaces.repositories import JobRepository
+from ...core.logger import setup_logger
+from .pool import connection
+from .postgres import _query
+
+logger = setup_logger(__name__)
+
+_COLUMNS = """id::text, status, request, client_id, result, error, attempts,
+    created_at, started_at, finished_at"""
+
+
+def _row_to_job(row: Tuple, position: Optional[int] = None) -> PlanningJob:
+    return PlanningJob(
+        id=row[0],
+        status=row[1],
+        request=row[2],
+        client_id=row[3],
+        result=row[4],
+        error=row[5],
+        attempts=row[6],
+        created_at=row[7],
+        started_at=row[8],
+        finished_at=row[9],
+        position=position,
+    )
+
+
+class PostgresJobRepository(JobRepository):
+    """Job queue in the planning_jobs table.
+
+    Workers claim jobs with FOR UPDATE SKIP LOCKED, so any number of them,
+    in any number of processes, can poll the queue without blocking each
+    other or running a job twice. Running jobs hold a lease renewed by
+    heartbeats; a job whose worker died is requeued once the lease expires.
+    """
+
+    async def enqueue(self, request: dict, client_id: str) -> PlanningJob:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("enqueue_job"):
+                cur.execute(
+                    f"""
+                    INSERT INTO planning_jobs (id, request, client_id)
+                    VALUES (%s, %s, %s)
+                    RETURNING {_COLUMNS}
+                    """,
+                    (str(uuid.uuid4()), Json(request), client_id),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        return _row_to_job(row)
+
+    async def get(self, job_id: str) -> Optional[PlanningJob]:
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        with connection() as conn, conn.cursor() as cur:
+            with _query("get_job"):
+                cur.execute(
+                    f"""
+                    SELECT {_COLUMNS},
+                        CASE WHEN j.status = 'queued' THEN (
+                            SELECT count(*) FROM planning_jobs q
+                            WHERE q.status = 'queued' AND q.created_at < j.created_at
+                        ) END
+                    FROM planning_jobs j WHERE id = %s
+                    """,
+                    (job_id,),
+                )
+                row = cur.fetchone()
+        return _row_to_job(row[:-1], row[-1]) if row else None
+
+    async def claim(self) -> Optional[PlanningJob]:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("claim_job"):
+                cur.execute(
+                    f"""
+                    UPDATE planning_jobs
+                    SET status = 'running', attempts = attempts + 1,
+                        started_at = now(), heartbeat_at = now()
+                    WHERE id = (
+                        SELECT id FROM planning_jobs
+                        WHERE status = 'queued'
+                        ORDER BY created_at
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {_COLUMNS}
+                    """
+                )
+                row = cur.fetchone()
+            conn.commit()
+        return _row_to_job(row) if row else None
+
+    async def heartbeat(self, job_ids: List[str]) -> None:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("heartbeat_jobs"):
+                cur.execute(
+                    """
+                    UPDATE planning_jobs SET heartbeat_at = now()
+                    WHERE id = ANY(%s::uuid[]) AND status = 'running'
+                    """,
+                    (job_ids,),
+                )
+            conn.commit()
+
+    async def complete(self, job_id: str, result: dict) -> None:
+        self._finish(job_id, JobStatus.SUCCEEDED, result=Json(result))
+
+    async def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, JobStatus.FAILED, error=error)
+
+    def _finish(self, job_id: str, status: JobStatus, result=None, error=None) -> None:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("finish_job"):
+                cur.execute(
+                    """
+                    UPDATE planning_jobs
+                    SET status = %s, result = %s, error = %s, finished_at = now()
+                    WHERE id = %s AND status = 'running'
+                    """,
+                    (status.value, result, error, job_id),
+                )
+            conn.commit()
+
+    async def release(self, job_id: str) -> None:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("release_job"):
+                # The interrupted run does not count against the job's attempts
+                cur.execute(
+                    """
+                    UPDATE planning_jobs
+                    SET status = 'queued', attempts = attempts - 1,
+                        started_at = NULL, heartbeat_at = NULL
+                    WHERE id = %s AND status = 'running'
+                    """,
+                    (job_id,),
+                )
+            conn.commit()
+
+    async def requeue_stale(self, lease_seconds: float, max_attempts: int) -> int:
+        with connection() as conn, conn.cursor() as cur:
+            with _query("requeue_stale_jobs"):
+                cur.execute(
+                    """
+                    UPDATE planning_jobs
+                    SET status = CASE WHEN attempts < %(max_attempts)s
+                            THEN 'queued' ELSE 'failed' END,
+                        error = CASE WHEN attempts < %(max_attempts)s
+                            THEN NULL ELSE 'worker lost' END,
+                        finished_at = CASE WHEN attempts < %(max_attempts)s
+                            THEN NULL ELSE now() END
+                    WHERE status = 'running'
+                        AND heartbeat_at < now() - make_interval(secs => %(lease)s)
+                    RETURNING id::text, status
+                    """,
+                    {"max_attempts": max_attempts, "lease": lease_seconds},
+                )
+                rows = cur.fetchall()
+            conn.commit()
+        for job_id, status in rows:
+            logger.warning(f"Planning job {job_id} lost its worker, now {status}")
+        return len(rows)
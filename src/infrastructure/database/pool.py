@@ -0,0 +1,345 @@
+"""Connection pools for the primary and any read replicas.
+
+Writes, and reads that must see them, use the primary. Callers that can
+tolerate slightly stale data ask for a read-only connection, which goes to
+a healthy replica unless the current client wrote recently (read-your-writes
+stickiness, keyed by the X-Client-ID of the request). A background thread
+measures replication lag and takes replicas that fall behind, or stop
+answering, out of rotation until they recover.
+
+With SHARD_DSNS set, calendar events are instead spread over several
+databases (or schemas, through ``options=-csearch_path=...`` in the DSN) by
+a hash of the calendar ID; each shard has its own pool and no replicas. The
+primary keeps everything else (jobs, change feed).
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, make_dsn, parse_dsn
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from ...core.config import get_settings
+from ...core.context import client_id_var
+from ...core.logger import setup_logger
+from ...core.metrics import DB_CONNECTIONS, DB_REPLICA_LAG_SECONDS
+
+logger = setup_logger(__name__)
+
+# Seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received (an idle primary writes no new WAL; after a
+# restart the receive position restarts at the segment boundary, behind it)
+_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() <= pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def _on_event_loop() -> bool:
+    """Whether the caller runs on a thread with a running asyncio loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class _WaitingPool(ThreadedConnectionPool):
+    """A ThreadedConnectionPool that waits for a connection to be returned.
+
+    psycopg2 raises PoolError as soon as maxconn connections are out, and
+    export streams hold one for a whole response: threads queue on a
+    semaphore instead, for up to DB_POOL_TIMEOUT seconds. The event loop
+    thread must never block, so it does not wait: one connection is kept
+    back from the semaphore for it, and it holds at most one at a time
+    (no ``with connection()`` block awaits), so it always finds one free.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(max(maxconn - 1, 1))
+        # Connections handed out against a slot, to release it on return
+        self._slotted: Set[int] = set()
+
+    def getconn(self, key=None, timeout: Optional[float] = None):
+        if _on_event_loop():
+            # Fail fast rather than stall every request on this worker
+            return super().getconn(key)
+        if timeout is None:
+            timeout = get_settings().DB_POOL_TIMEOUT
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolError(f"no connection free after {timeout:g}s")
+        try:
+            conn = super().getconn(key)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._slotted.add(id(conn))
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        slotted = id(conn) in self._slotted
+        self._slotted.discard(id(conn))
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            if slotted:
+                self._slots.release()
+
+
+class _Replica:
+    __slots__ = ("name", "pool", "healthy", "lag")
+
+    def __init__(self, name: str, pool: _WaitingPool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+_pool: Optional[_WaitingPool] = None
+_replicas: List[_Replica] = []
+_shards: List[_WaitingPool] = []
+_lock = threading.Lock()
+_next_replica = itertools.count()
+# client_id -> monotonic deadline until which its reads stay on the primary
+_sticky: Dict[str, float] = {}
+_monitor: Optional[threading.Thread] = None
+_monitor_stop = threading.Event()
+
+
+def primary_dsn() -> str:
+    settings = get_settings()
+    return settings.POSTGRES_PRIMARY_DSN or make_dsn(
+        host=settings.POSTGRES_HOST,
+        dbname=settings.POSTGRES_DB,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        port=settings.POSTGRES_PORT,
+    )
+
+
+def _shard_dsns() -> List[str]:
+    return [dsn.strip() for dsn in get_settings().SHARD_DSNS.split(",") if dsn.strip()]
+
+
+def shard_ids() -> List[int]:
+    """Indexes of the event shards; empty when events live on the primary."""
+    return list(range(len(_shard_dsns())))
+
+
+def shard_for(calendar_id: str) -> Optional[int]:
+    """The shard holding a calendar's events, or None without sharding.
+
+    A stable hash, so every process agrees; changing the number of shards
+    moves calendars and needs their rows migrated.
+    """
+    count = len(_shard_dsns())
+    if not count:
+        return None
+    return zlib.crc32(calendar_id.encode()) % count
+
+
+def _replica_name(dsn: str) -> str:
+    params = parse_dsn(dsn)
+    return f"{params.get('host', 'localhost')}:{params.get('port', '5432')}"
+
+
+def _new_pool(dsn: str, connect: bool = True) -> _WaitingPool:
+    settings = get_settings()
+    if "connect_timeout" not in parse_dsn(dsn):
+        # A host that drops packets fails fast instead of blocking the caller
+        # (on the event loop, often) for the whole TCP connect timeout
+        dsn = make_dsn(dsn, connect_timeout=settings.DB_CONNECT_TIMEOUT)
+    if connect:
+        return _WaitingPool(settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE, dsn)
+    # minconn is both the connections opened up front and the idle ones kept:
+    # open none now, but keep as many as usual once they exist
+    pool = _WaitingPool(0, settings.DB_POOL_MAX_SIZE, dsn)
+    pool.minconn = settings.DB_POOL_MIN_SIZE
+    return pool
+
+
+def _pool_stats() -> Dict[tuple, float]:
+    pools = (
+        [("primary", _pool)]
+        + [(r.name, r.pool) for r in _replicas]
+        + [(f"shard{i}", pool) for i, pool in enumerate(_shards)]
+    )
+    stats: Dict[tuple, float] = {}
+    for name, pool in pools:
+        if pool is None or pool.closed:
+            continue
+        stats[(name, "idle")] = len(pool._pool)
+        stats[(name, "in_use")] = len(pool._used)
+    return stats
+
+
+def get_pool() -> _WaitingPool:
+    """Create the process-wide pools on first use, so importing is free."""
+    global _pool, _monitor
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                settings = get_settings()
+                for dsn in filter(None, settings.POSTGRES_REPLICA_DSNS.split(",")):
+                    # Replica pools open no connection up front, so a replica
+                    # that is down at startup just starts out of rotation
+                    dsn = dsn.strip()
+                    _replicas.append(
+                        _Replica(_replica_name(dsn), _new_pool(dsn, connect=False))
+                    )
+                _shards.extend(_new_pool(dsn) for dsn in _shard_dsns())
+                _pool = _new_pool(primary_dsn())
+                DB_CONNECTIONS.set_callback(_pool_stats)
+                if _replicas:
+                    # Replicas join the rotation only once they prove fresh,
+                    # from the monitor thread: reads use the primary until then
+                    DB_REPLICA_LAG_SECONDS.set_callback(
+                        lambda: {
+                            (r.name,): r.lag for r in _replicas if r.lag is not None
+                        }
+                    )
+                    _monitor_stop.clear()
+                    _monitor = threading.Thread(
+                        target=_monitor_replicas, name="replica-monitor", daemon=True
+                    )
+                    _monitor.start()
+    return _pool
+
+
+def _check_replicas() -> None:
+    max_lag = get_settings().DB_REPLICA_MAX_LAG_SECONDS
+    for replica in _replicas:
+        try:
+            conn = replica.pool.getconn(timeout=0)
+        except PoolError:
+            # Every connection is busy serving reads: check it next time
+            continue
+        except psycopg2.Error as e:
+            _set_health(replica, False, None, str(e))
+            continue
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                # A replica too busy to answer is as good as a lagging one
+                cur.execute("SET LOCAL statement_timeout = 1000")
+                cur.execute(_LAG_QUERY)
+                lag = float(cur.fetchone()[0] or 0)
+            conn.rollback()
+            _set_health(replica, lag <= max_lag, lag, f"lagging {lag:.1f}s")
+        except psycopg2.Error as e:
+            broken = True
+            _set_health(replica, False, None, str(e))
+        finally:
+            replica.pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def _set_health(
+    replica: _Replica, healthy: bool, lag: Optional[float], reason: str
+) -> None:
+    if replica.healthy and not healthy:
+        logger.warning(f"Replica {replica.name} out of rotation: {reason.strip()}")
+    elif healthy and not replica.healthy:
+        logger.info(f"Replica {replica.name} in rotation")
+    replica.healthy = healthy
+    replica.lag = lag
+
+
+def _monitor_replicas() -> None:
+    interval = get_settings().DB_REPLICA_CHECK_INTERVAL
+    _check_replicas()
+    while not _monitor_stop.wait(interval):
+        _check_replicas()
+
+
+def _mark_write() -> None:
+    window = get_settings().DB_READ_YOUR_WRITES_SECONDS
+    now = time.monotonic()
+    if len(_sticky) > 10000:
+        for client_id, deadline in list(_sticky.items()):
+            if deadline <= now:
+                _sticky.pop(client_id, None)
+    _sticky[client_id_var.get()] = now + window
+
+
+def _read_replica() -> Optional[_Replica]:
+    if not _replicas:
+        return None
+    if _sticky.get(client_id_var.get(), 0) > time.monotonic():
+        return None
+    healthy = [replica for replica in _replicas if replica.healthy]
+    if not healthy:
+        return None
+    return healthy[next(_next_replica) % len(healthy)]
+
+
+@contextmanager
+def connection(
+    readonly: bool = False, write: bool = False, shard: Optional[int] = None
+) -> Iterator:
+    """Borrow a connection; it is rolled back if the caller left a transaction open.
+
+    With readonly=True the connection may come from a replica: only use it
+    for reads that tolerate DB_REPLICA_MAX_LAG_SECONDS of staleness. With
+    write=True, the current client's readonly reads stay on the primary for
+    DB_READ_YOUR_WRITES_SECONDS afterwards. A shard index (see shard_for)
+    borrows from that shard instead.
+    """
+    pool = get_pool()
+    if shard is not None:
+        pool, readonly, write = _shards[shard], False, False
+    replica = _read_replica() if readonly else None
+    if replica is not None:
+        try:
+            # A replica with no free connection sends the read to the primary
+            conn = replica.pool.getconn(timeout=0)
+            pool = replica.pool
+        except PoolError:
+            replica = None
+            conn = pool.getconn()
+        except psycopg2.Error as e:
+            _set_health(replica, False, None, str(e))
+            replica = None
+            conn = pool.getconn()
+    else:
+        conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        if replica is not None and conn.closed:
+            _set_health(replica, False, None, "connection lost")
+        pool.putconn(conn, close=bool(conn.closed))
+        if write and _replicas:
+            _mark_write()
+
+
+def close_pool() -> None:
+    """Close every pooled connection; used on shutdown."""
+    global _pool, _monitor
+    with _lock:
+        # Let an in-progress health check finish before its pool closes
+        _monitor_stop.set()
+        if _monitor is not None:
+            _monitor.join(timeout=10)
+            _monitor = None
+        for replica in _replicas:
+            replica.pool.closeall()
+        _replicas.clear()
+        for pool in _shards:
+            pool.closeall()
+        _shards.clear()
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
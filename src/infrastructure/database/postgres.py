@@ -1,120 +1,549 @@
-import psycopg2
-from typing import List, Optional
-from ...core.config import get_settings
-from ...domain.entities.event import Event
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from psycopg2.extras import execute_values
+from ...domain.entities.event import Event, EventPatch
+from ...domain.entities.task import Task, TaskCreate
+from ...domain.exceptions import (
+    EventNotFound,
+    EventsPartiallyCreated,
+    EventTimeRangeInvalid,
+    EventVersionConflict,
+)
 from ...domain.interfaces.repositories import EventRepository
 from ...core.logger import setup_logger
+from ...core.metrics import DB_QUERY_SECONDS
+from ...core.tracing import span
+from .pool import connection, shard_for, shard_ids
 
-settings = get_settings()
 logger = setup_logger(__name__)
 
 
+@contextmanager
+def _query(statement: str) -> Iterator[None]:
+    with span(f"sql {statement}"), DB_QUERY_SECONDS.time(statement):
+        yield
+
+
+_COLUMNS = """id, event_name, event_description,
+    event_start_date_time, event_end_date_time, event_location, version,
+    calendar_id"""
+
+# SQL types of the columns PATCH may change, for typed VALUES lists
+_UPDATABLE = {
+    "event_name": "varchar",
+    "event_description": "text",
+    "event_start_date_time": "timestamp",
+    "event_end_date_time": "timestamp",
+    "event_location": "varchar",
+}
+
+
+_RETURNING = ", ".join(f"e.{column.strip()}" for column in _COLUMNS.split(","))
+
+_TASK_COLUMNS = "id, task_name, task_start_date_time, task_end_date_time"
+
+
+def _iso(column: str) -> str:
+    """A timestamp column as text, formatted the way pydantic dumps datetimes.
+
+    row_to_json trims trailing zeros from the fraction (09:00:00.5) where
+    pydantic writes all six digits (09:00:00.500000), and none for whole
+    seconds in both.
+    """
+    return f"""to_char({column}, 'YYYY-MM-DD"T"HH24:MI:SS') || CASE
+        WHEN date_trunc('second', {column}) = {column} THEN ''
+        ELSE to_char({column}, '.US')
+    END AS {column}"""
+
+
+# The JSON fields of an event and of a task, in the order of the model path
+_EVENT_JSON_COLUMNS = f"""id, event_name, event_description,
+    {_iso("event_start_date_time")}, {_iso("event_end_date_time")},
+    event_location, version, calendar_id"""
+_TASK_JSON_COLUMNS = f"""id, task_name,
+    {_iso("task_start_date_time")}, {_iso("task_end_date_time")}"""
+
+# Each event's tasks as a JSON array, for the lateral join of get_all_json
+_TASKS_JSON = f"""
+    LEFT JOIN LATERAL (
+        -- Built like the outer array: json_agg would add line breaks
+        SELECT (
+            '[' || coalesce(
+                string_agg(t.json, ',' ORDER BY t.task_start_date_time, t.id),
+                ''
+            ) || ']'
+        )::json AS tasks
+        FROM (
+            SELECT c.id, c.task_start_date_time, row_to_json(r)::text AS json
+            FROM calendar_tasks c, LATERAL (SELECT {_TASK_JSON_COLUMNS}) r
+            WHERE c.event_id = e.id
+        ) t
+    ) tasks ON true
+"""
+
+
+def _row_to_event(row: Tuple) -> Event:
+    return Event(
+        id=row[0],
+        event_name=row[1],
+        event_description=row[2],
+        event_start_date_time=row[3],
+        event_end_date_time=row[4],
+        event_location=row[5],
+        version=row[6],
+        calendar_id=row[7],
+    )
+
+
+def _row_to_task(row: Tuple) -> Task:
+    return Task(
+        id=row[0],
+        task_name=row[1],
+        task_start_date_time=row[2],
+        task_end_date_time=row[3],
+    )
+
+
+def _range_filter(
+    calendar_id: Optional[str], start: Optional[datetime], end: Optional[datetime]
+) -> Tuple[str, list]:
+    """WHERE clause selecting a calendar's events that overlap [start, end).
+
+    The calendar comes first so it matches the (calendar_id, start) index:
+    a tenant's query only ever reads that tenant's slice of the table.
+    """
+    conditions, params = [], []
+    if calendar_id is not None:
+        conditions.append("calendar_id = %s")
+        params.append(calendar_id)
+    if start is not None:
+        conditions.append("event_end_date_time > %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("event_start_date_time < %s")
+        params.append(end)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
 class PostgresEventRepository(EventRepository):
-    def __init__(self):
-        self.conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            database=settings.POSTGRES_DB,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            port=settings.POSTGRES_PORT,
-        )
+    """Event storage that borrows a pooled connection for each operation.
+
+    Every operation is scoped to one calendar. With sharding, IDs are only
+    unique within a shard, so an event is identified by (calendar_id, id).
+    """
 
     async def create(self, event: Event) -> Event:
-        cur = self.conn.cursor()
-        try:
-            cur.execute(
-                """
-                INSERT INTO calendar_events 
-                (event_name, event_description, event_start_date_time, event_end_date_time, event_location)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    event.event_name,
-                    event.event_description,
-                    event.event_start_date_time,
-                    event.event_end_date_time,
-                    event.event_location,
-                ),
-            )
-            result = cur.fetchone()
-            if result is None:
-                raise ValueError("Failed to create event - no ID returned")
-
-            event_id = result[0]
-            self.conn.commit()
-
-            # Create a new Event instance with the ID
-            return Event(
-                id=event_id,
-                event_name=event.event_name,
-                event_description=event.event_description,
-                event_start_date_time=event.event_start_date_time,
-                event_end_date_time=event.event_end_date_time,
-                event_location=event.event_location,
-            )
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Error creating event: {str(e)}")
-            raise
-        finally:
-            cur.close()
-
-    async def get_all(self) -> List[Event]:
-        cur = self.conn.cursor()
-        try:
-            cur.execute("SELECT * FROM calendar_events")
-            rows = cur.fetchall()
-            return [
-                Event(
-                    id=row[0],
-                    event_name=row[1],
-                    event_description=row[2],
-                    event_start_date_time=row[3],
-                    event_end_date_time=row[4],
-                    event_location=row[5],
-                )
-                for row in rows
-            ]
-        finally:
-            cur.close()
-
-    async def get_by_id(self, event_id: int) -> Optional[Event]:
-        cur = self.conn.cursor()
-        try:
-            cur.execute("SELECT * FROM calendar_events WHERE id = %s", (event_id,))
-            row = cur.fetchone()
-            if row:
+        with connection(
+            write=True, shard=shard_for(event.calendar_id)
+        ) as conn, conn.cursor() as cur:
+            try:
+                with _query("insert_event"):
+                    cur.execute(
+                        """
+                        INSERT INTO calendar_events
+                        (calendar_id, event_name, event_description, event_start_date_time, event_end_date_time, event_location)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        RETURNING id, version
+                        """,
+                        (
+                            event.calendar_id,
+                            event.event_name,
+                            event.event_description,
+                            event.event_start_date_time,
+                            event.event_end_date_time,
+                            event.event_location,
+                        ),
+                    )
+                result = cur.fetchone()
+                if result is None:
+                    raise ValueError("Failed to create event - no ID returned")
+
+                event_id, version = result
+                with _query("commit"):
+                    conn.commit()
+
+                # Create a new Event instance with the ID
                 return Event(
-                    id=row[0],
-                    event_name=row[1],
-                    event_description=row[2],
-                    event_start_date_time=row[3],
-                    event_end_date_time=row[4],
-                    event_location=row[5],
+                    id=event_id,
+                    event_name=event.event_name,
+                    event_description=event.event_description,
+                    event_start_date_time=event.event_start_date_time,
+                    event_end_date_time=event.event_end_date_time,
+                    event_location=event.event_location,
+                    version=version,
+                    calendar_id=event.calendar_id,
+                )
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error creating event: {str(e)}")
+                raise
+
+    async def create_many(self, events: List[Event]) -> List[Event]:
+        by_shard: Dict[Optional[int], List[int]] = {}
+        for position, event in enumerate(events):
+            by_shard.setdefault(shard_for(event.calendar_id), []).append(position)
+        created: List[Optional[Event]] = [None] * len(events)
+        for shard, positions in by_shard.items():
+            batch = [events[position] for position in positions]
+            try:
+                rows = self._insert_rows(shard, batch)
+            except Exception as e:
+                # Earlier shards are committed: callers must not insert them again
+                if any(event is not None for event in created):
+                    raise EventsPartiallyCreated(created, e) from e
+                raise
+            for position, event in zip(positions, rows):
+                created[position] = event
+        return created
+
+    @staticmethod
+    def _insert_rows(shard: Optional[int], events: List[Event]) -> List[Event]:
+        with connection(write=True, shard=shard) as conn, conn.cursor() as cur:
+            try:
+                with _query("insert_events"):
+                    # RETURNING follows the order of the VALUES list
+                    rows = execute_values(
+                        cur,
+                        """
+                        INSERT INTO calendar_events
+                        (calendar_id, event_name, event_description, event_start_date_time, event_end_date_time, event_location)
+                        VALUES %s
+                        RETURNING id, version
+                        """,
+                        [
+                            (
+                                event.calendar_id,
+                                event.event_name,
+                                event.event_description,
+                                event.event_start_date_time,
+                                event.event_end_date_time,
+                                event.event_location,
+                            )
+                            for event in events
+                        ],
+                        page_size=len(events),
+                        fetch=True,
+                    )
+                with _query("commit"):
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error creating {len(events)} events: {str(e)}")
+                raise
+        return [
+            event.model_copy(update={"id": event_id, "version": version})
+            for event, (event_id, version) in zip(events, rows)
+        ]
+
+    async def get_all(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> List[Event]:
+        where, params = _range_filter(calendar_id, start, end)
+        with connection(
+            readonly=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            with _query("select_all_events"):
+                cur.execute(
+                    f"""
+                    SELECT {_COLUMNS} FROM calendar_events {where}
+                    ORDER BY event_start_date_time
+                    """,
+                    params,
                 )
-            else:
+                rows = cur.fetchall()
+            events = [_row_to_event(row) for row in rows]
+            if include_tasks:
+                self._attach_tasks(cur, events)
+            return events
+
+    @staticmethod
+    def _attach_tasks(cur, events: List[Event]) -> None:
+        # One query for the tasks of every event, whatever their number
+        tasks: Dict[int, List[Task]] = {event.id: [] for event in events}
+        if tasks:
+            with _query("select_tasks"):
+                cur.execute(
+                    f"""
+                    SELECT event_id, {_TASK_COLUMNS} FROM calendar_tasks
+                    WHERE event_id = ANY(%s)
+                    ORDER BY task_start_date_time, id
+                    """,
+                    (list(tasks),),
+                )
+                rows = cur.fetchall()
+            for row in rows:
+                tasks[row[0]].append(_row_to_task(row[1:]))
+        for event in events:
+            event.tasks = tasks[event.id]
+
+    async def get_all_json(
+        self,
+        calendar_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_tasks: bool = False,
+    ) -> bytes:
+        where, params = _range_filter(calendar_id, start, end)
+        columns, tasks_join = _EVENT_JSON_COLUMNS, ""
+        if include_tasks:
+            columns, tasks_join = f"{_EVENT_JSON_COLUMNS}, tasks.tasks", _TASKS_JSON
+        with connection(
+            readonly=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            # Postgres renders the whole array as compact text (a json value
+            # would be parsed back by psycopg2), with timestamps formatted
+            # by _iso so the payload matches the model path byte for byte
+            with _query("select_events_json"):
+                cur.execute(
+                    f"""
+                    SELECT '[' || coalesce(
+                        string_agg(j.json, ',' ORDER BY j.event_start_date_time),
+                        ''
+                    ) || ']'
+                    FROM (
+                        SELECT e.event_start_date_time, row_to_json(r)::text AS json
+                        FROM (SELECT * FROM calendar_events {where}) e
+                            {tasks_join}
+                            CROSS JOIN LATERAL (SELECT {columns}) r
+                    ) j
+                    """,
+                    params,
+                )
+                return cur.fetchone()[0].encode()
+
+    async def update_many(
+        self, calendar_id: str, patches: List[EventPatch]
+    ) -> List[Event]:
+        # One UPDATE ... FROM (VALUES ...) per distinct set of changed fields,
+        # so dragging many events costs one statement
+        groups: Dict[Tuple[str, ...], List[EventPatch]] = {}
+        for patch in patches:
+            groups.setdefault(tuple(sorted(patch.changes)), []).append(patch)
+        updated: Dict[int, Event] = {}
+        with connection(
+            write=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            try:
+                for fields, group in groups.items():
+                    assignments = "".join(f"{field} = v.{field}, " for field in fields)
+                    # The patched event must still end after it starts
+                    start, end = (
+                        f"{'v' if field in fields else 'e'}.{field}"
+                        for field in ("event_start_date_time", "event_end_date_time")
+                    )
+                    template = ", ".join(
+                        ["%s::int", "%s::int"]
+                        + [f"%s::{_UPDATABLE[field]}" for field in fields]
+                    )
+                    with _query("update_events"):
+                        rows = execute_values(
+                            cur,
+                            f"""
+                            UPDATE calendar_events AS e
+                            SET {assignments}version = e.version + 1
+                            FROM (VALUES %s) AS v(id, expected_version{"".join(", " + f for f in fields)})
+                            WHERE e.id = v.id
+                                AND e.calendar_id = {_literal(cur, calendar_id)}
+                                AND (v.expected_version IS NULL OR e.version = v.expected_version)
+                                AND {start} < {end}
+                            RETURNING {_RETURNING}
+                            """,
+                            [
+                                (patch.id, patch.expected_version)
+                                + tuple(patch.changes[field] for field in fields)
+                                for patch in group
+                            ],
+                            template=f"({template})",
+                            fetch=True,
+                        )
+                    for row in rows:
+                        updated[row[0]] = _row_to_event(row)
+                missing = [patch for patch in patches if patch.id not in updated]
+                if missing:
+                    self._raise_for_missing(cur, calendar_id, missing)
+                with _query("commit"):
+                    conn.commit()
+            except (EventNotFound, EventTimeRangeInvalid, EventVersionConflict):
+                conn.rollback()
+                raise
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error updating events: {str(e)}")
+                raise
+        return [updated[patch.id] for patch in patches]
+
+    @staticmethod
+    def _raise_for_missing(cur, calendar_id: str, missing: List[EventPatch]) -> None:
+        cur.execute(
+            "SELECT id, version, event_start_date_time, event_end_date_time"
+            " FROM calendar_events WHERE calendar_id = %s AND id = ANY(%s)",
+            (calendar_id, [patch.id for patch in missing]),
+        )
+        current = {row[0]: row[1:] for row in cur.fetchall()}
+        for patch in missing:
+            if patch.id not in current:
+                raise EventNotFound(patch.id)
+            version, start, end = current[patch.id]
+            # As the ::timestamp casts store them: offsets are dropped
+            start = patch.changes.get("event_start_date_time", start)
+            end = patch.changes.get("event_end_date_time", end)
+            start, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+            if patch.expected_version in (None, version) and end <= start:
+                raise EventTimeRangeInvalid(patch.id)
+            raise EventVersionConflict(patch.id, patch.expected_version, version)
+
+    async def get_version(self, calendar_id: str) -> int:
+        # The primary: a client must see the version of its own last write.
+        # Moves only on writes to this calendar's events and tasks
+        with connection(shard=shard_for(calendar_id)) as conn, conn.cursor() as cur:
+            with _query("select_events_version"):
+                cur.execute(
+                    "SELECT version FROM calendar_versions WHERE calendar_id = %s",
+                    (calendar_id,),
+                )
+                row = cur.fetchone()
+                return row[0] if row else 0
+
+    async def get_by_id(self, calendar_id: str, event_id: int) -> Optional[Event]:
+        # The primary: callers read an event in order to change it
+        with connection(shard=shard_for(calendar_id)) as conn, conn.cursor() as cur:
+            try:
+                with _query("select_event_by_id"):
+                    cur.execute(
+                        f"SELECT {_COLUMNS} FROM calendar_events"
+                        " WHERE calendar_id = %s AND id = %s",
+                        (calendar_id, event_id),
+                    )
+                    row = cur.fetchone()
+                return _row_to_event(row) if row else None
+            except Exception as e:
+                logger.error(f"Error fetching event: {str(e)}")
                 return None
-        except Exception as e:
-            logger.error(f"Error fetching event: {str(e)}")
-            return None
-        finally:
-            cur.close()
-
-    async def delete(self, event_id: int) -> bool:
-        cur = self.conn.cursor()
-        try:
-            cur.execute("DELETE FROM calendar_events WHERE id = %s", (event_id,))
-            deleted = cur.rowcount > 0
-            self.conn.commit()
-            return deleted
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Error deleting event: {str(e)}")
-            raise
-        finally:
-            cur.close()
-
-    def __del__(self):
-        if hasattr(self, "conn"):
-            self.conn.close()
+
+    async def get_by_ids(self, calendar_id: str, event_ids: List[int]) -> List[Event]:
+        if not event_ids:
+            return []
+        with connection(shard=shard_for(calendar_id)) as conn, conn.cursor() as cur:
+            with _query("select_events_by_ids"):
+                cur.execute(
+                    f"SELECT {_COLUMNS} FROM calendar_events"
+                    " WHERE calendar_id = %s AND id = ANY(%s)",
+                    (calendar_id, list(event_ids)),
+                )
+                return [_row_to_event(row) for row in cur.fetchall()]
+
+    async def set_tasks(
+        self, calendar_id: str, event_id: int, tasks: List[TaskCreate]
+    ) -> Optional[Event]:
+        with connection(
+            write=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            try:
+                # Locking the parent serialises concurrent splits of one event
+                with _query("lock_event"):
+                    cur.execute(
+                        f"SELECT {_COLUMNS} FROM calendar_events"
+                        " WHERE calendar_id = %s AND id = %s FOR UPDATE",
+                        (calendar_id, event_id),
+                    )
+                    row = cur.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                with _query("delete_tasks"):
+                    cur.execute(
+                        "DELETE FROM calendar_tasks WHERE event_id = %s", (event_id,)
+                    )
+                rows = []
+                if tasks:
+                    with _query("insert_tasks"):
+                        rows = execute_values(
+                            cur,
+                            f"""
+                            INSERT INTO calendar_tasks
+                            (event_id, task_name, task_start_date_time, task_end_date_time)
+                            VALUES %s
+                            RETURNING {_TASK_COLUMNS}
+                            """,
+                            [
+                                (
+                                    event_id,
+                                    task.task_name,
+                                    task.task_start_date_time,
+                                    task.task_end_date_time,
+                                )
+                                for task in tasks
+                            ],
+                            page_size=len(tasks),
+                            fetch=True,
+                        )
+                with _query("commit"):
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error setting tasks of event {event_id}: {str(e)}")
+                raise
+        event = _row_to_event(row)
+        event.tasks = [_row_to_task(task_row) for task_row in rows]
+        return event
+
+    async def delete(self, calendar_id: str, event_id: int) -> bool:
+        with connection(
+            write=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            try:
+                with _query("delete_event"):
+                    cur.execute(
+                        "DELETE FROM calendar_events WHERE calendar_id = %s AND id = %s",
+                        (calendar_id, event_id),
+                    )
+                deleted = cur.rowcount > 0
+                with _query("commit"):
+                    conn.commit()
+                return deleted
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error deleting event: {str(e)}")
+                raise
+
+    def iter_row_batches(
+        self,
+        calendar_id: Optional[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[List[Tuple]]:
+        where, params = _range_filter(calendar_id, start, end)
+        if calendar_id is not None:
+            shards = [shard_for(calendar_id)]
+        else:
+            shards = shard_ids() or [None]
+        for shard in shards:
+            with connection(readonly=True, shard=shard) as conn:
+                # Server-side cursor: rows are pulled batch by batch, not all at once
+                with conn.cursor(name="export_events") as cur:
+                    cur.itersize = batch_size
+                    cur.execute(
+                        f"""
+                        SELECT {_COLUMNS} FROM calendar_events {where}
+                        ORDER BY event_start_date_time
+                        """,
+                        params,
+                    )
+                    while True:
+                        with _query("export_events_batch"):
+                            rows = cur.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield rows
+
+
+def _literal(cur, value) -> str:
+    # execute_values takes a single %s for the VALUES list, so other
+    # parameters are inlined, safely quoted by the driver
+    return cur.mogrify("%s", (value,)).decode()
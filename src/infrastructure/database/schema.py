@@ -0,0 +1,166 @@
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS calendar_events (
+        id SERIAL PRIMARY KEY,
+        event_name VARCHAR(255) NOT NULL,
+        event_description TEXT,
+        event_start_date_time TIMESTAMP NOT NULL,
+        event_end_date_time TIMESTAMP NOT NULL,
+        event_location VARCHAR(255)
+    )
+    """,
+    # Row version for optimistic concurrency on PATCH
+    """
+    ALTER TABLE calendar_events
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1
+    """,
+    # Every query is scoped to one calendar, so the calendar leads the index
+    # and a tenant's range scan never reads other tenants' rows
+    """
+    ALTER TABLE calendar_events
+    ADD COLUMN IF NOT EXISTS calendar_id VARCHAR(64) NOT NULL DEFAULT 'default'
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS calendar_events_calendar_start_idx
+    ON calendar_events (calendar_id, event_start_date_time)
+    """,
+    "DROP INDEX IF EXISTS calendar_events_start_idx",
+    # Sub-tasks of an event, stored alongside it (same shard) and removed
+    # with it; loaded for a whole range in one query keyed by event_id
+    """
+    CREATE TABLE IF NOT EXISTS calendar_tasks (
+        id SERIAL PRIMARY KEY,
+        event_id INTEGER NOT NULL REFERENCES calendar_events (id) ON DELETE CASCADE,
+        task_name VARCHAR(255) NOT NULL,
+        task_start_date_time TIMESTAMP NOT NULL,
+        task_end_date_time TIMESTAMP NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS calendar_tasks_event_idx
+    ON calendar_tasks (event_id, task_start_date_time)
+    """,
+    # Precomputed busyness per calendar and day, refreshed by CalendarService
+    # for the days each write touches; a week is seven rows
+    """
+    CREATE TABLE IF NOT EXISTS week_summary (
+        calendar_id VARCHAR(64) NOT NULL,
+        day DATE NOT NULL,
+        event_count INTEGER NOT NULL,
+        busy_minutes INTEGER NOT NULL,
+        first_start TIMESTAMP,
+        last_end TIMESTAMP,
+        free_blocks JSONB NOT NULL,
+        PRIMARY KEY (calendar_id, day)
+    )
+    """,
+    # Durable queue behind POST /jobs/plan
+    """
+    CREATE TABLE IF NOT EXISTS planning_jobs (
+        id UUID PRIMARY KEY,
+        status VARCHAR(16) NOT NULL DEFAULT 'queued',
+        request JSONB NOT NULL,
+        client_id VARCHAR(255) NOT NULL,
+        result JSONB,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        started_at TIMESTAMP,
+        heartbeat_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    """,
+    # Workers only ever scan the queued and running heads of the table
+    """
+    CREATE INDEX IF NOT EXISTS planning_jobs_queued_idx
+    ON planning_jobs (created_at) WHERE status = 'queued'
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS planning_jobs_running_idx
+    ON planning_jobs (heartbeat_at) WHERE status = 'running'
+    """,
+    # Change counter for client caches, one row per calendar so a tenant's
+    # cached listings survive other tenants' writes. Values come from one
+    # sequence: they never repeat, even across calendars or after a reset
+    "CREATE SEQUENCE IF NOT EXISTS calendar_events_version",
+    """
+    CREATE TABLE IF NOT EXISTS calendar_versions (
+        calendar_id VARCHAR(64) PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION bump_calendar_versions(calendar_ids text[])
+    RETURNS void LANGUAGE sql AS $$
+        INSERT INTO calendar_versions (calendar_id, version)
+        SELECT calendar_id, nextval('calendar_events_version')
+        FROM (SELECT DISTINCT unnest(calendar_ids) AS calendar_id) c
+        ORDER BY calendar_id
+        ON CONFLICT (calendar_id) DO UPDATE SET version = EXCLUDED.version
+    $$
+    """,
+    # Statement triggers: a bulk insert bumps each calendar it touches once.
+    # Tasks find their calendar through their parent event
+    """
+    CREATE OR REPLACE FUNCTION bump_calendar_events_version() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        calendar_ids text[];
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            UPDATE calendar_versions
+            SET version = nextval('calendar_events_version');
+            RETURN NULL;
+        END IF;
+        IF TG_TABLE_NAME = 'calendar_events' THEN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                calendar_ids := ARRAY(SELECT calendar_id FROM new_rows);
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                calendar_ids := calendar_ids
+                    || ARRAY(SELECT calendar_id FROM old_rows);
+            END IF;
+        ELSE
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                calendar_ids := ARRAY(
+                    SELECT e.calendar_id FROM new_rows t
+                    JOIN calendar_events e ON e.id = t.event_id
+                );
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                -- Empty when the tasks go with their event: it bumped already
+                calendar_ids := calendar_ids || ARRAY(
+                    SELECT e.calendar_id FROM old_rows t
+                    JOIN calendar_events e ON e.id = t.event_id
+                );
+            END IF;
+        END IF;
+        PERFORM bump_calendar_versions(calendar_ids);
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS calendar_events_version_trigger ON calendar_events",
+    "DROP TRIGGER IF EXISTS calendar_tasks_version_trigger ON calendar_tasks",
+] + [
+    # Transition tables allow one operation per trigger
+    f"""
+    CREATE OR REPLACE TRIGGER {table}_{operation.lower()}_version_trigger
+    AFTER {operation} ON {table} {transition}
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_calendar_events_version()
+    """
+    for table in ("calendar_events", "calendar_tasks")
+    for operation, transition in (
+        ("INSERT", "REFERENCING NEW TABLE AS new_rows"),
+        ("UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("DELETE", "REFERENCING OLD TABLE AS old_rows"),
+        ("TRUNCATE", ""),
+    )
+]
+
+
+def create_schema(conn) -> None:
+    with conn.cursor() as cur:
+        for statement in SCHEMA_STATEMENTS:
+            cur.execute(statement)
+    conn.commit()
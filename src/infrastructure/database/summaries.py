@@ -0,0 +1,233 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from ...domain.entities.summary import DaySummary, FreeBlock
+from ...domain.interfaces.repositories import WeekSummaryRepository
+from ...core.logger import setup_logger
+from .pool import connection, shard_for
+from .postgres import _query
+
+logger = setup_logger(__name__)
+
+_COLUMNS = "day, event_count, busy_minutes, first_start, last_end, free_blocks"
+
+
+def _row_to_summary(row: Tuple) -> DaySummary:
+    return DaySummary(
+        day=row[0],
+        event_count=row[1],
+        busy_minutes=row[2],
+        first_start=row[3],
+        last_end=row[4],
+        free_blocks=row[5],
+    )
+
+
+def _runs(days: List[date]) -> List[Tuple[date, date]]:
+    """Sorted days as [first, last] runs of consecutive days."""
+    runs: List[Tuple[date, date]] = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def summarise_day(
+    day: date,
+    intervals: List[Tuple[datetime, datetime]],
+    day_start: int,
+    day_end: int,
+    min_free_minutes: int,
+) -> DaySummary:
+    """Summary of one day from the (start, end) of the events overlapping it."""
+    midnight = datetime.combine(day, time())
+    clipped = sorted(
+        (max(start, midnight), min(end, midnight + timedelta(days=1)))
+        for start, end in intervals
+    )
+    if not clipped:
+        merged: List[List[datetime]] = []
+    else:
+        merged = [list(clipped[0])]
+        for start, end in clipped[1:]:
+            if start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+    free_blocks = []
+    cursor = midnight + timedelta(hours=day_start)
+    closing = midnight + timedelta(hours=day_end)
+    for start, end in merged + [[closing, closing]]:
+        gap_end = min(start, closing)
+        if (gap_end - cursor).total_seconds() >= min_free_minutes * 60:
+            free_blocks.append(FreeBlock(start=cursor, end=gap_end))
+        cursor = max(cursor, end)
+        if cursor >= closing:
+            break
+    return DaySummary(
+        day=day,
+        event_count=len(clipped),
+        busy_minutes=int(
+            sum((end - start).total_seconds() for start, end in merged) // 60
+        ),
+        first_start=clipped[0][0] if clipped else None,
+        last_end=max(end for _, end in clipped) if clipped else None,
+        free_blocks=free_blocks,
+    )
+
+
+class PostgresWeekSummaryRepository(WeekSummaryRepository):
+    """Day summaries in the week_summary table, next to the calendar's events.
+
+    A refresh recomputes only the days it is given, from their events, in
+    one transaction. Refreshes of a calendar are serialised by an advisory
+    lock, so the last one to run always saw the last committed write: two
+    concurrent writers cannot leave a day summarised from a stale read.
+    """
+
+    def __init__(self, day_start: int, day_end: int, min_free_minutes: int):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.min_free_minutes = min_free_minutes
+
+    async def refresh(self, calendar_id: str, days: Iterable[date]) -> List[DaySummary]:
+        days = sorted(set(days))
+        if not days:
+            return []
+        with connection(
+            write=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            try:
+                cur.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext('week_summary:' || %s))",
+                    (calendar_id,),
+                )
+                summaries = self._summarise(cur, calendar_id, days)
+                self._store(cur, calendar_id, summaries, overwrite=True)
+                with _query("commit"):
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error refreshing week summary: {str(e)}")
+                raise
+        return summaries
+
+    async def get_days(
+        self, calendar_id: str, start: date, count: int
+    ) -> List[DaySummary]:
+        end = start + timedelta(days=count)
+        with connection(
+            readonly=True, shard=shard_for(calendar_id)
+        ) as conn, conn.cursor() as cur:
+            with _query("select_week_summary"):
+                cur.execute(
+                    f"""
+                    SELECT {_COLUMNS} FROM week_summary
+                    WHERE calendar_id = %s AND day >= %s AND day < %s
+                    """,
+                    (calendar_id, start, end),
+                )
+                stored = {row[0]: _row_to_summary(row) for row in cur.fetchall()}
+        days = [start + timedelta(days=offset) for offset in range(count)]
+        # Days no write has touched since the table was created
+        missing = [day for day in days if day not in stored]
+        if missing:
+            for summary in self._fill(calendar_id, missing):
+                stored[summary.day] = summary
+        return [stored[day] for day in days]
+
+    def _fill(self, calendar_id: str, days: List[date]) -> List[DaySummary]:
+        # On the primary, but not as a write: the reader does not become
+        # sticky to it, and takes no lock. A refresh that commits meanwhile
+        # wins, since rows that exist by now are left alone
+        with connection(shard=shard_for(calendar_id)) as conn, conn.cursor() as cur:
+            try:
+                summaries = self._summarise(cur, calendar_id, days)
+                self._store(cur, calendar_id, summaries, overwrite=False)
+                with _query("commit"):
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error filling week summary: {str(e)}")
+                raise
+        return summaries
+
+    def _summarise(self, cur, calendar_id: str, days: List[date]) -> List[DaySummary]:
+        intervals: Dict[date, List[Tuple[datetime, datetime]]] = {
+            day: [] for day in days
+        }
+        for first, last in _runs(days):
+            with _query("select_summary_events"):
+                cur.execute(
+                    """
+                    SELECT event_start_date_time, event_end_date_time
+                    FROM calendar_events
+                    WHERE calendar_id = %s
+                        AND event_start_date_time < %s
+                        AND event_end_date_time > %s
+                    """,
+                    (calendar_id, last + timedelta(days=1), first),
+                )
+                rows = cur.fetchall()
+            for start, end in rows:
+                # Every day of the run the event overlaps
+                day = max(start.date(), first)
+                while day <= last and datetime.combine(day, time()) < end:
+                    intervals[day].append((start, end))
+                    day += timedelta(days=1)
+        return [
+            summarise_day(
+                day,
+                intervals[day],
+                self.day_start,
+                self.day_end,
+                self.min_free_minutes,
+            )
+            for day in days
+        ]
+
+    @staticmethod
+    def _store(
+        cur, calendar_id: str, summaries: List[DaySummary], overwrite: bool
+    ) -> None:
+        conflict = (
+            """DO UPDATE SET
+                event_count = EXCLUDED.event_count,
+                busy_minutes = EXCLUDED.busy_minutes,
+                first_start = EXCLUDED.first_start,
+                last_end = EXCLUDED.last_end,
+                free_blocks = EXCLUDED.free_blocks"""
+            if overwrite
+            else "DO NOTHING"
+        )
+        with _query("upsert_week_summary"):
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO week_summary (calendar_id, {_COLUMNS})
+                VALUES %s
+                ON CONFLICT (calendar_id, day) {conflict}
+                """,
+                [
+                    (
+                        calendar_id,
+                        summary.day,
+                        summary.event_count,
+                        summary.busy_minutes,
+                        summary.first_start,
+                        summary.last_end,
+                        Json(
+                            [
+                                block.model_dump(mode="json")
+                                for block in summary.free_blocks
+                            ]
+                        ),
+                    )
+                    for summary in summaries
+                ],
+                page_size=len(summaries),
+            )
@@ -0,0 +1,91 @@
+"""Columnar encoders for event exports.
+
+Rows arrive as plain tuples in ``EVENT_COLUMNS`` order, straight from a
+database cursor, and are transposed into Arrow arrays one batch at a time, so
+an export never materialises per-row objects or the whole result set.
+pyarrow is imported on first use to keep it out of the API's import time.
+"""
+
+import io
+from typing import Iterable, Iterator, List, Tuple
+
+EVENT_COLUMNS = (
+    "id",
+    "event_name",
+    "event_description",
+    "event_start_date_time",
+    "event_end_date_time",
+    "event_location",
+    "version",
+    "calendar_id",
+)
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FILE_EXTENSIONS = {"arrow": "arrows", "parquet": "parquet"}
+
+
+def event_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            pa.field("id", pa.int32(), nullable=False),
+            pa.field("event_name", pa.string(), nullable=False),
+            pa.field("event_description", pa.string()),
+            pa.field("event_start_date_time", pa.timestamp("us"), nullable=False),
+            pa.field("event_end_date_time", pa.timestamp("us"), nullable=False),
+            pa.field("event_location", pa.string()),
+            pa.field("version", pa.int32(), nullable=False),
+            pa.field("calendar_id", pa.string(), nullable=False),
+        ]
+    )
+
+
+def to_record_batch(rows: List[Tuple], schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _drain(buffer: io.BytesIO) -> bytes:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def arrow_stream(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """Encode row batches as an Arrow IPC stream, one chunk per batch."""
+    import pyarrow as pa
+
+    schema = event_schema()
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        for rows in batches:
+            writer.write_batch(to_record_batch(rows, schema))
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def parquet_stream(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """Encode row batches as a Parquet file, one row group per batch."""
+    import pyarrow.parquet as pq
+
+    schema = event_schema()
+    buffer = io.BytesIO()
+    with pq.ParquetWriter(buffer, schema, compression="zstd") as writer:
+        for rows in batches:
+            writer.write_batch(to_record_batch(rows, schema))
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+ENCODERS = {"arrow": arrow_stream, "parquet": parquet_stream}
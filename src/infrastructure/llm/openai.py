@@ -1,22 +1,147 @@
-import requests
-from typing import List
+import asyncio
+import httpx
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import List, Optional
 from ...core.config import get_settings
+from ...domain.exceptions import LLMProviderError
 from ...domain.interfaces.repositories import LLMRepository
 from ...core.logger import setup_logger
+from ...core.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+from ...core.tracing import span, trace_headers
+from .profiling import called_tool, record_call
 
-settings = get_settings()
 logger = setup_logger(__name__)
 
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
 class OpenAIRepository(LLMRepository):
-    def __init__(self):
-        self.api_url = settings.LLM_API_URL
-        self.api_key = settings.LLM_API_KEY
-        self.model_id = settings.MODEL_ID
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.api_url = api_url or settings.LLM_API_URL
+        self.api_key = api_key if api_key is not None else settings.LLM_API_KEY
+        self.model_id = model_id or settings.MODEL_ID
+        self.headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            self.headers["Authorization"] = f"Bearer {self.api_key}"
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=timeout or settings.LLM_REQUEST_TIMEOUT,
+        )
+
+    async def _post(self, payload: dict, operation: str) -> dict:
+        with span(f"llm.http {operation}", model=self.model_id) as current:
+            data = await self._send(payload, operation)
+            if current is not None:
+                usage = data.get("usage") or {}
+                current.set("prompt_tokens", usage.get("prompt_tokens"))
+                current.set("completion_tokens", usage.get("completion_tokens"))
+            return data
+
+    async def _send(self, payload: dict, operation: str) -> dict:
+        started = time.perf_counter()
+        request = self.client.build_request(
+            "POST", self.api_url, json=payload, headers=trace_headers()
+        )
+        profile = {
+            "operation": operation,
+            "model": self.model_id,
+            "messages": len(payload["messages"]),
+            "request_bytes": len(request.content),
+            "cache_hit": False,
         }
+        first_byte: Optional[float] = None
+        try:
+            # Streamed only to time the headers: the body is read in full
+            response = await self.client.send(request, stream=True)
+            first_byte = time.perf_counter()
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        except asyncio.CancelledError:
+            # The scheduler's deadline or a hedge that lost the race: among
+            # the slowest calls, and the provider may bill them all the same
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.observe(elapsed, self.model_id, operation, "cancelled")
+            if first_byte is not None:
+                profile["ttfb_ms"] = (first_byte - started) * 1000
+            record_call(**profile, status="cancelled", latency_ms=elapsed * 1000)
+            raise
+        except httpx.TransportError as e:
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.observe(elapsed, self.model_id, operation, "error")
+            record_call(**profile, status="error", latency_ms=elapsed * 1000)
+            raise LLMProviderError(
+                f"LLM provider unreachable: {str(e)}",
+                retryable=isinstance(
+                    e,
+                    (
+                        httpx.TimeoutException,
+                        httpx.NetworkError,
+                        httpx.RemoteProtocolError,
+                    ),
+                ),
+            ) from e
+
+        elapsed = time.perf_counter() - started
+        LLM_REQUEST_SECONDS.observe(
+            elapsed,
+            self.model_id,
+            operation,
+            str(response.status_code),
+        )
+        profile.update(
+            status=str(response.status_code),
+            response_bytes=len(response.content),
+            ttfb_ms=(first_byte - started) * 1000,
+            latency_ms=elapsed * 1000,
+        )
+        if response.status_code >= 400:
+            record_call(**profile)
+            logger.warning(
+                f"LLM provider returned {response.status_code}: {response.text[:200]}"
+            )
+            raise LLMProviderError(
+                f"LLM provider returned {response.status_code}",
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        data = response.json()
+        usage = data.get("usage") or {}
+        LLM_TOKENS.inc(self.model_id, "prompt", amount=usage.get("prompt_tokens", 0))
+        LLM_TOKENS.inc(
+            self.model_id, "completion", amount=usage.get("completion_tokens", 0)
+        )
+        record_call(
+            **profile,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            tool=called_tool(data),
+        )
+        return data
 
     async def chat(self, messages: List[dict], functions: List[dict]) -> dict:
         payload = {
@@ -27,13 +152,7 @@ class OpenAIRepository(LLMRepository):
             "stream": False,
         }
 
-        response = requests.post(
-            self.api_url,
-            headers=self.headers,
-            json=payload,
-            timeout=300,
-        )
-        return response.json()
+        return await self._post(payload, "chat")
 
     async def generate_ics(self, messages: List[dict]) -> str:
         calendar_prompt = {
@@ -48,15 +167,11 @@ class OpenAIRepository(LLMRepository):
             "stream": False,
         }
 
-        response = requests.post(
-            self.api_url,
-            headers=self.headers,
-            json=payload,
-            timeout=300,
-        )
-
-        data = response.json()
+        data = await self._post(payload, "generate_ics")
         if "choices" in data and len(data["choices"]) > 0:
             content = data["choices"][0]["message"]["content"]
             return content.strip()
         return ""
+
+    async def close(self) -> None:
+        await self.client.aclose()
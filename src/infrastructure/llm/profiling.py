@@ -0,0 +1,58 @@
+"""Per-call LLM profile records.
+
+Every provider call, and every call served by coalescing onto an identical
+one already in flight (a cache hit), becomes one JSON line in
+LLM_PROFILE_PATH: endpoint, model, tokens, payload sizes, time to first
+byte, latency and the tool the model chose. Lines are written by a
+background thread, so a call never waits on the disk. Summarise the file
+with ``python -m tools.llm_report``.
+"""
+
+import time
+from typing import Optional
+
+from ...core.config import get_settings
+from ...core.context import client_id_var, endpoint_var
+from ...core.tracing import _Exporter, current_trace_id
+
+_RECORDER: Optional[_Exporter] = None
+
+
+def _recorder() -> _Exporter:
+    global _RECORDER
+    if _RECORDER is None:
+        path = get_settings().LLM_PROFILE_PATH
+        _RECORDER = _Exporter("jsonl" if path else "none", path, "llm-profiler")
+    return _RECORDER
+
+
+def record_call(**fields) -> None:
+    recorder = _recorder()
+    if recorder.kind == "none":
+        return
+    recorder.export(
+        {
+            "ts": time.time(),
+            "endpoint": endpoint_var.get(),
+            "client_id": client_id_var.get(),
+            "trace_id": current_trace_id(),
+            **fields,
+        }
+    )
+
+
+def called_tool(data: dict) -> Optional[str]:
+    """Name of the function the model asked to call, if any."""
+    choices = data.get("choices") or [{}]
+    message = choices[0].get("message") or {}
+    if message.get("function_call"):
+        return message["function_call"].get("name")
+    for tool_call in message.get("tool_calls") or []:
+        return (tool_call.get("function") or {}).get("name")
+    return None
+
+
+def shutdown_llm_profiling() -> None:
+    """Flush records still queued for writing."""
+    if _RECORDER is not None:
+        _RECORDER.shutdown()
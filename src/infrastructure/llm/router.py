@@ -0,0 +1,221 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, TypeVar
+
+from ...core.config import get_settings
+from ...core.logger import setup_logger
+from ...core.tracing import span
+from ...domain.exceptions import LLMError
+from ...domain.interfaces.repositories import LLMRepository
+from .openai import OpenAIRepository
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Backends with fewer samples than this are preferred until they are measured
+MIN_SAMPLES = 5
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class LLMBackend:
+    def __init__(self, name: str, repository: LLMRepository, window: int = 200):
+        self.name = name
+        self.repository = repository
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.in_flight = 0
+
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        if latency is not None:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    @property
+    def p50(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 0.5) if self.latencies else None
+
+    @property
+    def p95(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 0.95) if self.latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self) -> float:
+        if len(self.outcomes) < MIN_SAMPLES or not self.latencies:
+            return 0.0
+        # Tail latency, inflated by how often the backend fails
+        return self.p95 / max(1.0 - self.error_rate, 0.05)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "p50": self.p50,
+            "p95": self.p95,
+            "error_rate": self.error_rate,
+            "samples": len(self.outcomes),
+            "in_flight": self.in_flight,
+        }
+
+
+class LLMRouter(LLMRepository):
+    """Routes each call to the OpenAI-compatible backend with the best recent
+    tail latency and error rate, optionally hedging slow calls on the runner-up.
+
+    ``hedge_after`` is either ``None`` (no hedging), a delay in seconds, or
+    ``"p95"`` to hedge once a call outlives the chosen backend's own p95.
+    """
+
+    def __init__(self, backends: List[LLMBackend], hedge_after=None):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.hedge_after = hedge_after
+        self.hedged_total = 0
+        self.hedge_wins_total = 0
+
+    async def chat(self, messages: List[dict], functions: List[dict]) -> dict:
+        return await self._route(lambda repo: repo.chat(messages, functions))
+
+    async def generate_ics(self, messages: List[dict]) -> str:
+        return await self._route(lambda repo: repo.generate_ics(messages))
+
+    async def close(self) -> None:
+        for backend in self.backends:
+            close = getattr(backend.repository, "close", None)
+            if close is not None:
+                await close()
+
+    def ranked(self) -> List[LLMBackend]:
+        # Break ties on in-flight load so unmeasured backends share the warm-up
+        return sorted(self.backends, key=lambda b: (b.score(), b.in_flight))
+
+    def stats(self) -> dict:
+        return {
+            "hedged_total": self.hedged_total,
+            "hedge_wins_total": self.hedge_wins_total,
+            "backends": [backend.stats() for backend in self.backends],
+        }
+
+    def _hedge_delay(self, backend: LLMBackend) -> Optional[float]:
+        if self.hedge_after is None or len(self.backends) < 2:
+            return None
+        if self.hedge_after == "p95":
+            return backend.p95 if len(backend.latencies) >= MIN_SAMPLES else None
+        return float(self.hedge_after)
+
+    async def _timed(
+        self, backend: LLMBackend, call: Callable[[LLMRepository], Awaitable[T]]
+    ) -> T:
+        backend.in_flight += 1
+        start = time.monotonic()
+        try:
+            with span("llm.backend", backend=backend.name):
+                result = await call(backend.repository)
+        except LLMError:
+            backend.record(None, ok=False)
+            raise
+        except asyncio.CancelledError:
+            # A hedge loser only says it took at least this long; that is news
+            # when it outlives the backend's p95, which then moves up instead
+            # of keeping a slowed-down primary ranked on stale fast samples
+            elapsed = time.monotonic() - start
+            if backend.p95 is not None and elapsed > backend.p95:
+                backend.record(elapsed, ok=True)
+            raise
+        finally:
+            backend.in_flight -= 1
+        backend.record(time.monotonic() - start, ok=True)
+        return result
+
+    async def _route(self, call: Callable[[LLMRepository], Awaitable[T]]) -> T:
+        ranked = self.ranked()
+        primary = ranked[0]
+        first = asyncio.ensure_future(self._timed(primary, call))
+        delay = self._hedge_delay(primary)
+        if delay is None:
+            return await first
+
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done:
+            if not isinstance(first.exception(), LLMError):
+                return first.result()
+            # Failed before the hedge was due: go straight to the runner-up
+            logger.info(
+                f"LLM call failed on {primary.name}, failing over to "
+                f"{ranked[1].name}: {first.exception()}"
+            )
+            return await self._timed(ranked[1], call)
+
+        self.hedged_total += 1
+        logger.info(
+            f"Hedging LLM call from {primary.name} to {ranked[1].name} "
+            f"after {delay:.2f}s"
+        )
+        second = asyncio.ensure_future(self._timed(ranked[1], call))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins_total += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the loser so it stops holding a provider connection
+            for task in pending:
+                task.cancel()
+
+
+def parse_backends(raw: str) -> List[LLMBackend]:
+    """Build backends from the LLM_BACKENDS JSON list.
+
+    Each entry may set ``name``, ``url``, ``model`` and ``api_key``; missing
+    fields fall back to the single-backend LLM_* settings.
+    """
+    settings = get_settings()
+    backends = []
+    for index, entry in enumerate(json.loads(raw)):
+        repository = OpenAIRepository(
+            api_url=entry.get("url"),
+            api_key=entry.get("api_key"),
+            model_id=entry.get("model"),
+        )
+        backends.append(
+            LLMBackend(
+                entry.get("name") or f"backend-{index}",
+                repository,
+                window=settings.LLM_ROUTER_WINDOW,
+            )
+        )
+    return backends
+
+
+def parse_hedge_after(raw: str):
+    raw = raw.strip().lower()
+    if not raw or raw in ("0", "off", "none"):
+        return None
+    if raw == "p95":
+        return "p95"
+    return float(raw) / 1000
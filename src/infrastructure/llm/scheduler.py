@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, TypeVar
+
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from ...core.context import Priority, client_id_var, priority_var
+from ...core.logger import setup_logger
+from ...core.metrics import LLM_QUEUE_WAIT_SECONDS
+from ...core.tracing import span
+from ...domain.exceptions import LLMDeadlineExceeded, LLMProviderError
+from ...domain.interfaces.repositories import LLMRepository
+from .profiling import record_call
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, LLMProviderError) and exc.retryable
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "client_id", "future", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, client_id: str, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.client_id = client_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler(LLMRepository):
+    """Admission, coalescing and retry layer in front of another LLMRepository.
+
+    Calls are admitted under a global and a per-client concurrency limit, in
+    priority order (interactive before batch, FIFO within a priority).
+    Identical calls already in flight share a single provider request.
+    """
+
+    def __init__(
+        self,
+        llm_repository: LLMRepository,
+        max_concurrency: int,
+        max_concurrency_per_client: int,
+        max_retries: int,
+        max_backoff: float,
+        deadline: float,
+    ):
+        self.llm_repository = llm_repository
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_client = max_concurrency_per_client
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._client_in_flight: Dict[str, int] = defaultdict(int)
+        self._pending_calls: Dict[str, asyncio.Future] = {}
+        self._backoff = wait_random_exponential(multiplier=0.5, max=max_backoff)
+
+        self.requests_total = 0
+        self.coalesced_total = 0
+        self.retries_total = 0
+        self.deadline_exceeded_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.admitted_total = 0
+
+    async def chat(self, messages: List[dict], functions: List[dict]) -> dict:
+        key = self._key("chat", messages, functions)
+        return await self._submit(
+            key,
+            lambda: self.llm_repository.chat(messages, functions),
+            {"operation": "chat", "messages": len(messages)},
+        )
+
+    async def generate_ics(self, messages: List[dict]) -> str:
+        key = self._key("generate_ics", messages)
+        return await self._submit(
+            key,
+            lambda: self.llm_repository.generate_ics(messages),
+            # The repository appends its own prompt to the conversation
+            {"operation": "generate_ics", "messages": len(messages) + 1},
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "coalesced_total": self.coalesced_total,
+            "retries_total": self.retries_total,
+            "deadline_exceeded_total": self.deadline_exceeded_total,
+            "wait_seconds_avg": (
+                self.wait_seconds_total / self.admitted_total
+                if self.admitted_total
+                else 0.0
+            ),
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    @staticmethod
+    def _key(operation: str, *parts) -> str:
+        raw = json.dumps([operation, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def _submit(
+        self, key: str, call: Callable[[], Awaitable[T]], profile: dict
+    ) -> T:
+        self.requests_total += 1
+        pending = self._pending_calls.get(key)
+        if pending is not None:
+            self.coalesced_total += 1
+            started = time.perf_counter()
+            status = "error"
+            try:
+                with span("llm.coalesced"):
+                    result = await asyncio.shield(pending)
+                status = "200"
+                return result
+            finally:
+                record_call(
+                    **profile,
+                    cache_hit=True,
+                    status=status,
+                    latency_ms=(time.perf_counter() - started) * 1000,
+                )
+
+        task = asyncio.ensure_future(
+            self._run(call, client_id_var.get(), priority_var.get())
+        )
+        self._pending_calls[key] = task
+        task.add_done_callback(lambda t: self._finish_call(key, t))
+        # Shielded so a disconnecting leader does not cancel coalesced followers
+        return await asyncio.shield(task)
+
+    def _finish_call(self, key: str, task: asyncio.Future) -> None:
+        if self._pending_calls.get(key) is task:
+            del self._pending_calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(
+        self, call: Callable[[], Awaitable[T]], client_id: str, priority: Priority
+    ) -> T:
+        try:
+            return await asyncio.wait_for(
+                self._call_with_slot(call, client_id, priority),
+                timeout=self.deadline,
+            )
+        except asyncio.TimeoutError:
+            self.deadline_exceeded_total += 1
+            raise LLMDeadlineExceeded(
+                f"LLM request exceeded its {self.deadline:g}s deadline"
+            )
+
+    async def _call_with_slot(
+        self, call: Callable[[], Awaitable[T]], client_id: str, priority: Priority
+    ) -> T:
+        with span("llm.queue_wait", priority=Priority(priority).name):
+            await self._acquire(client_id, priority)
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_retries + 1),
+                wait=self._wait,
+                retry=retry_if_exception(_is_retryable),
+                before_sleep=self._before_sleep,
+                reraise=True,
+            ):
+                with attempt, span(
+                    "llm.attempt", attempt=attempt.retry_state.attempt_number
+                ):
+                    return await call()
+        finally:
+            self._release(client_id)
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        if isinstance(exc, LLMProviderError) and exc.retry_after is not None:
+            # Honour the provider's hint, jittered so retries do not stampede
+            return min(exc.retry_after, self.max_backoff) + random.uniform(0, 0.5)
+        return self._backoff(retry_state)
+
+    def _before_sleep(self, retry_state: RetryCallState) -> None:
+        self.retries_total += 1
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        logger.warning(
+            f"Retrying LLM call (attempt {retry_state.attempt_number}) "
+            f"in {retry_state.next_action.sleep:.2f}s: {str(exc)}"
+        )
+
+    async def _acquire(self, client_id: str, priority: Priority) -> None:
+        waiter = _Waiter(
+            int(priority),
+            next(self._seq),
+            client_id,
+            asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just before the cancellation landed
+                self._release(client_id)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self, client_id: str) -> None:
+        self._in_flight -= 1
+        self._client_in_flight[client_id] -= 1
+        if self._client_in_flight[client_id] <= 0:
+            del self._client_in_flight[client_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if not self._waiters:
+            return
+        admitted = set()
+        now = time.monotonic()
+        for waiter in sorted(self._waiters):
+            if self._in_flight >= self.max_concurrency:
+                break
+            if waiter.future.done():
+                admitted.add(id(waiter))
+                continue
+            if (
+                self._client_in_flight.get(waiter.client_id, 0)
+                >= self.max_concurrency_per_client
+            ):
+                continue
+            self._in_flight += 1
+            self._client_in_flight[waiter.client_id] += 1
+            waited = now - waiter.enqueued_at
+            self.admitted_total += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            LLM_QUEUE_WAIT_SECONDS.observe(waited, Priority(waiter.priority).name)
+            waiter.future.set_result(None)
+            admitted.add(id(waiter))
+        if admitted:
+            self._waiters = [w for w in self._waiters if id(w) not in admitted]
+
+    async def close(self) -> None:
+        close = getattr(self.llm_repository, "close", None)
+        if close is not None:
+            await close()
@@ -0,0 +1,244 @@
+"""In-process relevance index over calendar events.
+
+Events are scored with Okapi BM25 over their name, description and location,
+plus a boost for being close in time to the date being planned, so a prompt
+can carry the few events that matter instead of the whole calendar. Each
+calendar has its own corpus, so scores only reflect that tenant's events. The
+index loads the table once and then follows the change feed, so writes are
+indexed incrementally and searches never touch the database.
+"""
+
+import asyncio
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ...core.logger import setup_logger
+from ...domain.entities.event import Event
+from ...domain.interfaces.repositories import ChangeFeed, EventIndex, EventRepository
+from ..export.arrow import EVENT_COLUMNS
+
+logger = setup_logger(__name__)
+
+_TOKEN = re.compile(r"\w\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class _Corpus:
+    """Postings lists and a start-time ordering of the indexed events."""
+
+    def __init__(self, k1: float, b: float):
+        self.k1 = k1
+        self.b = b
+        self.events: Dict[int, Event] = {}
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self.by_start: List[Tuple[datetime, int]] = []
+
+    def add(self, event: Event, ordered: bool = True) -> None:
+        current = self.events.get(event.id)
+        if current is not None:
+            # Deltas may arrive after a reload that already has a newer row
+            if (current.version or 0) > (event.version or 0):
+                return
+            self.remove(event.id)
+        terms = Counter(
+            tokenize(event.event_name)
+            + tokenize(event.event_description)
+            + tokenize(event.event_location)
+        )
+        for term, count in terms.items():
+            self.postings[term][event.id] = count
+        length = sum(terms.values())
+        self.lengths[event.id] = length
+        self.total_length += length
+        self.events[event.id] = event
+        if ordered:
+            bisect.insort(self.by_start, (event.event_start_date_time, event.id))
+        else:
+            self.by_start.append((event.event_start_date_time, event.id))
+
+    def remove(self, event_id: int) -> None:
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        for term in set(
+            tokenize(event.event_name)
+            + tokenize(event.event_description)
+            + tokenize(event.event_location)
+        ):
+            postings = self.postings[term]
+            postings.pop(event_id, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(event_id)
+        position = bisect.bisect_left(
+            self.by_start, (event.event_start_date_time, event_id)
+        )
+        del self.by_start[position]
+
+    def text_scores(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        count = len(self.events)
+        if not count:
+            return scores
+        average_length = self.total_length / count or 1.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for event_id, frequency in postings.items():
+                norm = 1 - self.b + self.b * self.lengths[event_id] / average_length
+                scores[event_id] += (
+                    idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                )
+        return scores
+
+    def near(self, around: datetime, radius: timedelta) -> Iterable[int]:
+        low = bisect.bisect_left(self.by_start, (around - radius,))
+        high = bisect.bisect_right(self.by_start, (around + radius,))
+        return (event_id for _, event_id in self.by_start[low:high])
+
+
+class BM25EventIndex(EventIndex):
+    def __init__(
+        self,
+        event_repository: EventRepository,
+        change_feed: ChangeFeed,
+        time_weight: float = 1.0,
+        time_scale_days: float = 7.0,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.event_repository = event_repository
+        self.change_feed = change_feed
+        self.time_weight = time_weight
+        self.time_scale_days = time_scale_days
+        self.k1 = k1
+        self.b = b
+        self._corpora: Dict[str, _Corpus] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def size(self) -> int:
+        return sum(len(corpus.events) for corpus in self._corpora.values())
+
+    async def start(self) -> None:
+        # Subscribed before loading: deltas committed during the load are
+        # replayed on top of it rather than lost. The load runs in the
+        # background so it does not delay startup; until it is done,
+        # searches simply find nothing.
+        queue = self.change_feed.subscribe()
+        self._task = asyncio.create_task(self._follow(queue), name="event-index")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def search(
+        self,
+        calendar_id: str,
+        query: str,
+        around: Optional[datetime] = None,
+        k: int = 10,
+    ) -> List[Event]:
+        corpus = self._corpora.get(calendar_id)
+        if corpus is None:
+            return []
+        scores = corpus.text_scores(query)
+        if around is not None and self.time_weight:
+            scale = self.time_scale_days * 86400
+            # Events within three time scales of the anchor compete on proximity
+            # alone, so "what is on Tuesday" finds Tuesday without matching words
+            radius = timedelta(days=3 * self.time_scale_days)
+            for event_id in corpus.near(around, radius):
+                scores.setdefault(event_id, 0.0)
+            for event_id in scores:
+                distance = abs(
+                    (corpus.events[event_id].event_start_date_time - around)
+                ).total_seconds()
+                scores[event_id] += self.time_weight * math.exp(-distance / scale)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return sorted(
+            (corpus.events[event_id] for event_id, _ in best),
+            key=lambda event: event.event_start_date_time,
+        )
+
+    async def _reload(self, calendar_id: Optional[str] = None) -> None:
+        # Raw rows through the export cursor, built off the event loop
+        def build() -> Dict[str, _Corpus]:
+            corpora: Dict[str, _Corpus] = {}
+            for rows in self.event_repository.iter_row_batches(calendar_id):
+                for row in rows:
+                    event = Event(**dict(zip(EVENT_COLUMNS, row)))
+                    corpus = corpora.get(event.calendar_id)
+                    if corpus is None:
+                        corpus = corpora[event.calendar_id] = _Corpus(self.k1, self.b)
+                    corpus.add(event, ordered=False)
+            for corpus in corpora.values():
+                corpus.by_start.sort()
+            return corpora
+
+        corpora = await asyncio.to_thread(build)
+        if calendar_id is None:
+            self._corpora = corpora
+            logger.info(f"Event index loaded {self.size} events")
+        elif calendar_id in corpora:
+            self._corpora[calendar_id] = corpora[calendar_id]
+        else:
+            self._corpora.pop(calendar_id, None)
+
+    async def _follow(self, queue: "asyncio.Queue[dict]") -> None:
+        try:
+            # Calendars to reload; None stands for all of them, which is
+            # also the initial load
+            stale: Set[Optional[str]] = {None}
+            delay = 1.0
+            while True:
+                if stale:
+                    # A database that is down delays the index instead of
+                    # ending this task
+                    calendar_id = None if None in stale else next(iter(stale))
+                    try:
+                        await self._reload(calendar_id)
+                        if calendar_id is None:
+                            stale.clear()
+                        else:
+                            stale.discard(calendar_id)
+                        delay = 1.0
+                    except Exception as e:
+                        logger.error(
+                            f"Event index failed to load, retrying in {delay:g}s: "
+                            f"{str(e)}"
+                        )
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, 60.0)
+                    continue
+                change = await queue.get()
+                try:
+                    if change.get("type") == "resync":
+                        stale.add(change.get("calendar_id"))
+                        continue
+                    calendar_id = change.get("calendar_id", "default")
+                    corpus = self._corpora.get(calendar_id)
+                    if corpus is None:
+                        corpus = self._corpora[calendar_id] = _Corpus(self.k1, self.b)
+                    for event_id in change.get("deleted", []):
+                        corpus.remove(event_id)
+                    for payload in change.get("upserted", []):
+                        corpus.add(Event.model_validate(payload))
+                except Exception as e:
+                    logger.error(f"Event index failed to apply a change: {str(e)}")
+        finally:
+            self.change_feed.unsubscribe(queue)
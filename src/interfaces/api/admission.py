@@ -0,0 +1,261 @@
+"""Admission control for the HTTP API.
+
+Requests are admitted, or shed early with a Retry-After hint, before they
+reach a route:
+
+- each client address has a token bucket (not X-Client-ID, which a client
+  can change at will); an empty bucket answers 429;
+- the server holds at most ``max_in_flight`` requests, of which
+  ``reserved_reads`` slots only reads (GET /events..., /weeks...) may use, so
+  cheap reads keep working while slow requests pile up; beyond that, 503;
+- LLM-backed requests (/chat, /export-ics) are capped separately, with a
+  short FIFO queue. One that would wait longer than the queue target, or
+  finds the queue full, is shed at once with 503 instead of holding a
+  connection until the provider catches up.
+
+Long-lived streams (server-sent events) are rate limited but never hold a
+slot, and /metrics is always admitted. Other streamed responses, such as
+/events/export, hold theirs until the last byte is sent.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from ...core.metrics import HTTP_QUEUE_WAIT_SECONDS, HTTP_REJECTED
+
+LLM_PATHS = ("/chat", "/export-ics")
+READ_PREFIXES = ("/events", "/weeks")
+
+
+def classify(method: str, path: str) -> str:
+    """Admission class of a request: exempt, stream, llm, read or other."""
+    if path == "/metrics":
+        return "exempt"
+    if path == "/events/changes" or (
+        path.startswith("/jobs/") and path.endswith("/events")
+    ):
+        return "stream"
+    if path in LLM_PATHS:
+        return "llm"
+    if method == "GET" and path.startswith(READ_PREFIXES):
+        return "read"
+    return "other"
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimiter:
+    """Token bucket per client: ``rate`` requests per second, bursts of ``burst``.
+
+    At most ``max_clients`` buckets are kept; beyond that the least recently
+    used goes, even if not yet full, so memory stays bounded.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client_id -> (tokens, monotonic time they were counted), least
+        # recently used first: take() moves a client to the end
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, client_id: str) -> Optional[float]:
+        """Spend a token; returns None, or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        if tokens < 1:
+            self._buckets[client_id] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[client_id] = (tokens - 1, now)
+        return None
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled since it was last touched is the same
+        # as no bucket at all; the oldest goes anyway if none has
+        full_after = self.burst / self.rate
+        for client_id, (_, updated) in list(self._buckets.items()):
+            if now - updated < full_after:
+                break
+            del self._buckets[client_id]
+        if len(self._buckets) >= self.max_clients:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class ConcurrencyGate:
+    """At most ``limit`` holders, with a bounded FIFO queue of waiters.
+
+    The expected wait of a newcomer is estimated from the moving average of
+    how long holders keep their slot; it is used both to shed early and as
+    the Retry-After of a rejection.
+    """
+
+    def __init__(self, limit: int, queue_size: int, target: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.target = target
+        self.in_flight = 0
+        self.hold_seconds = 1.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        return (len(self._waiters) + 1) * self.hold_seconds / self.limit
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        wait = self.estimated_wait()
+        if len(self._waiters) >= self.queue_size or wait > self.target:
+            raise Rejected(503, "overloaded", wait)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        started = time.monotonic()
+        try:
+            await asyncio.wait((future,), timeout=self.target)
+        except asyncio.CancelledError:
+            # The client went away while queued; pass on a slot it was given
+            if future.done():
+                self.release()
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+            raise
+        HTTP_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started)
+        if not future.done():
+            future.cancel()
+            self._waiters.remove(future)
+            raise Rejected(503, "queue_timeout", self.estimated_wait())
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self.hold_seconds += 0.2 * (held - self.hold_seconds)
+        # The slot passes straight to the oldest waiter
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """Applies the limits above; a limit of 0 disables it."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_in_flight: int,
+        reserved_reads: int,
+        llm_max_in_flight: int,
+        llm_queue_size: int,
+        llm_queue_target: float,
+    ):
+        self.rate_limiter = RateLimiter(rate, burst) if rate > 0 else None
+        self.max_in_flight = max_in_flight
+        self.reserved_reads = min(reserved_reads, max_in_flight)
+        self.llm_gate = (
+            ConcurrencyGate(llm_max_in_flight, llm_queue_size, llm_queue_target)
+            if llm_max_in_flight > 0
+            else None
+        )
+        self.in_flight: Dict[str, int] = {"read": 0, "llm": 0, "other": 0}
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    @asynccontextmanager
+    async def admit(self, method: str, path: str, client_id: str) -> AsyncIterator:
+        """Hold the request's slots for the body of the block, or raise Rejected."""
+        kind = classify(method, path)
+        try:
+            if kind != "exempt" and self.rate_limiter is not None:
+                wait = self.rate_limiter.take(client_id)
+                if wait is not None:
+                    raise Rejected(429, "rate_limited", wait)
+            if kind in ("exempt", "stream"):
+                yield
+                return
+            if self.max_in_flight > 0:
+                limit = self.max_in_flight
+                if kind != "read":
+                    limit -= self.reserved_reads
+                if self.total_in_flight >= limit:
+                    raise Rejected(503, "capacity", 1.0)
+        except Rejected as e:
+            HTTP_REJECTED.inc(kind, e.reason)
+            raise
+        self.in_flight[kind] += 1
+        try:
+            gate = self.llm_gate if kind == "llm" else None
+            if gate is not None:
+                try:
+                    await gate.acquire()
+                except Rejected as e:
+                    HTTP_REJECTED.inc(kind, e.reason)
+                    raise
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                if gate is not None:
+                    gate.release(time.monotonic() - started)
+        finally:
+            self.in_flight[kind] -= 1
+
+
+class AdmissionMiddleware:
+    """Runs every HTTP request through an AdmissionController.
+
+    Plain ASGI rather than BaseHTTPMiddleware: there, call_next returns once
+    the response headers are out, so a streamed body would give its slot
+    back before sending anything. Here the slot is held until the app has
+    sent the last chunk. The rate limit is keyed on the peer address.
+    """
+
+    def __init__(self, app, controller: Callable[[], AdmissionController]):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        address = client[0] if client else "anonymous"
+        try:
+            async with self.controller().admit(
+                scope["method"], scope["path"], address
+            ):
+                await self.app(scope, receive, send)
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": f"Request rejected: {e.reason}"},
+                status_code=e.status_code,
+                headers={"Retry-After": e.retry_after_header},
+            )
+            await response(scope, receive, send)
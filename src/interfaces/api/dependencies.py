@@ -1,12 +1,196 @@
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+from fastapi import Header, HTTPException, Query
 from ...application.services.calendar_service import CalendarService
 from ...application.services.chat_service import ChatService
+from ...application.services.planning_service import PlanningService
+from ...core.config import get_settings
+from ...core.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_QUEUE_DEPTH,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_DEPTH,
+    PLANNING_JOBS_RUNNING,
+)
+from ...domain.interfaces.repositories import (
+    ChangeFeed,
+    EventIndex,
+    EventRepository,
+    LLMRepository,
+    WeekSummaryRepository,
+)
+from ...infrastructure.database.batching import BatchingEventRepository
+from ...infrastructure.database.jobs import PostgresJobRepository
 from ...infrastructure.database.postgres import PostgresEventRepository
-from ...infrastructure.llm.openai import OpenAIRepository
+from ...infrastructure.database.summaries import PostgresWeekSummaryRepository
+from .admission import AdmissionController
+
+if TYPE_CHECKING:
+    from ...infrastructure.llm.scheduler import LLMScheduler
+
+_CALENDAR_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+# The LLM stack (httpx, tenacity) is imported on first use: it is a large
+# share of import time and processes that never call the LLM skip it
+
+
+def build_llm_backend() -> LLMRepository:
+    settings = get_settings()
+    if not settings.LLM_BACKENDS:
+        from ...infrastructure.llm.openai import OpenAIRepository
+
+        return OpenAIRepository()
+    from ...infrastructure.llm.router import (
+        LLMRouter,
+        parse_backends,
+        parse_hedge_after,
+    )
+
+    return LLMRouter(
+        parse_backends(settings.LLM_BACKENDS),
+        hedge_after=parse_hedge_after(settings.LLM_HEDGE_AFTER_MS),
+    )
+
+
+@lru_cache()
+def get_llm_scheduler() -> "LLMScheduler":
+    from ...infrastructure.llm.scheduler import LLMScheduler
+
+    settings = get_settings()
+    scheduler = LLMScheduler(
+        build_llm_backend(),
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        max_concurrency_per_client=settings.LLM_MAX_CONCURRENCY_PER_CLIENT,
+        max_retries=settings.LLM_MAX_RETRIES,
+        max_backoff=settings.LLM_MAX_BACKOFF,
+        deadline=settings.LLM_REQUEST_DEADLINE,
+    )
+    LLM_QUEUE_DEPTH.set_callback(lambda: {(): scheduler.queue_depth})
+    LLM_IN_FLIGHT.set_callback(lambda: {(): scheduler.in_flight})
+    return scheduler
+
+
+async def close_llm_scheduler() -> None:
+    """Close the scheduler's HTTP clients, if it was ever created."""
+    if get_llm_scheduler.cache_info().currsize:
+        await get_llm_scheduler().close()
+        get_llm_scheduler.cache_clear()
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    controller = AdmissionController(
+        rate=settings.RATE_LIMIT_PER_SECOND,
+        burst=settings.RATE_LIMIT_BURST,
+        max_in_flight=settings.HTTP_MAX_IN_FLIGHT,
+        reserved_reads=settings.HTTP_RESERVED_READS,
+        llm_max_in_flight=settings.CHAT_MAX_IN_FLIGHT,
+        llm_queue_size=settings.CHAT_QUEUE_SIZE,
+        llm_queue_target=settings.CHAT_QUEUE_TARGET_MS / 1000,
+    )
+    HTTP_IN_FLIGHT.set_callback(
+        lambda: {(kind,): count for kind, count in controller.in_flight.items()}
+    )
+    if controller.llm_gate is not None:
+        HTTP_QUEUE_DEPTH.set_callback(lambda: {(): controller.llm_gate.queue_depth})
+    return controller
+
+
+@lru_cache()
+def get_change_feed() -> ChangeFeed:
+    if get_settings().CHANGE_FEED == "memory":
+        from ...infrastructure.change_feed.memory import InMemoryChangeFeed
+
+        return InMemoryChangeFeed()
+    from ...infrastructure.change_feed.postgres import PostgresChangeFeed
+
+    return PostgresChangeFeed()
+
+
+@lru_cache()
+def get_event_index() -> EventIndex:
+    from ...infrastructure.retrieval.bm25 import BM25EventIndex
+
+    settings = get_settings()
+    return BM25EventIndex(
+        PostgresEventRepository(),
+        get_change_feed(),
+        time_weight=settings.RETRIEVAL_TIME_WEIGHT,
+        time_scale_days=settings.RETRIEVAL_TIME_SCALE_DAYS,
+    )
+
+
+@lru_cache()
+def get_planning_service() -> PlanningService:
+    settings = get_settings()
+    service = PlanningService(
+        PostgresJobRepository(),
+        get_chat_service,
+        workers=settings.JOB_WORKERS,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    PLANNING_JOBS_RUNNING.set_callback(lambda: {(): service.running})
+    return service
+
+
+def get_llm_repository() -> LLMRepository:
+    return get_llm_scheduler()
+
+
+@lru_cache()
+def get_event_repository() -> EventRepository:
+    # One instance per process: the batching layer's queue must be shared
+    settings = get_settings()
+    if not settings.EVENT_INSERT_BATCHING:
+        return PostgresEventRepository()
+    return BatchingEventRepository(
+        PostgresEventRepository(),
+        window=settings.EVENT_INSERT_BATCH_WINDOW_MS / 1000,
+        max_size=settings.EVENT_INSERT_BATCH_MAX_SIZE,
+    )
+
+
+@lru_cache()
+def get_week_summary_repository() -> WeekSummaryRepository:
+    settings = get_settings()
+    return PostgresWeekSummaryRepository(
+        day_start=settings.WEEK_SUMMARY_DAY_START_HOUR,
+        day_end=settings.WEEK_SUMMARY_DAY_END_HOUR,
+        min_free_minutes=settings.WEEK_SUMMARY_MIN_FREE_MINUTES,
+    )
 
 
 def get_calendar_service() -> CalendarService:
-    return CalendarService(PostgresEventRepository())
+    return CalendarService(
+        get_event_repository(),
+        get_change_feed(),
+        get_event_index(),
+        get_week_summary_repository(),
+    )
 
 
 def get_chat_service() -> ChatService:
-    return ChatService(OpenAIRepository())
+    return ChatService(
+        get_llm_repository(), get_event_index(), get_settings().RETRIEVAL_TOP_K
+    )
+
+
+def get_calendar_id(
+    x_calendar_id: Optional[str] = Header(None),
+    calendar_id: Optional[str] = Query(None),
+) -> str:
+    """The calendar a request works on: X-Calendar-ID, else ?calendar_id=.
+
+    Clients that send neither share the "default" calendar.
+    """
+    value = x_calendar_id or calendar_id or "default"
+    if not _CALENDAR_ID.fullmatch(value):
+        raise HTTPException(
+            status_code=400,
+            detail="calendar ID must be 1-64 letters, digits, '_', '.' or '-'",
+        )
+    return value
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException
 from ..schemas.models import ChatRequest
 from ....application.services.chat_service import ChatService
-from ..dependencies import get_chat_service
+from ....domain.exceptions import LLMDeadlineExceeded, LLMError, LLMProviderError
+from ..dependencies import get_calendar_id, get_chat_service, get_llm_scheduler
 from ....core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -9,16 +11,52 @@ logger = setup_logger(__name__)
 router = APIRouter()
 
 
+def llm_http_error(error: LLMError) -> HTTPException:
+    if isinstance(error, LLMDeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(error))
+    if isinstance(error, LLMProviderError) and error.status_code == 429:
+        headers = (
+            {"Retry-After": str(int(error.retry_after) + 1)}
+            if error.retry_after is not None
+            else None
+        )
+        return HTTPException(status_code=429, detail=str(error), headers=headers)
+    return HTTPException(status_code=502, detail=str(error))
+
+
 @router.post("/chat")
 async def chat(
-    request: ChatRequest, chat_service: ChatService = Depends(get_chat_service)
+    request: ChatRequest,
+    calendar_id: str = Depends(get_calendar_id),
+    chat_service: ChatService = Depends(get_chat_service),
 ) -> dict:
     functions = request.functions if request.functions is not None else []
-    return await chat_service.process_chat(request.messages, functions)
+    try:
+        return await chat_service.process_chat(
+            request.messages, functions, request.selected_date, calendar_id
+        )
+    except LLMError as e:
+        logger.error(f"Chat request failed: {str(e)}")
+        raise llm_http_error(e)
 
 
 @router.post("/export-ics")
 async def export_to_ics(
-    messages: list, chat_service: ChatService = Depends(get_chat_service)
+    messages: List[dict] = Body(...),
+    chat_service: ChatService = Depends(get_chat_service),
 ) -> str:
-    return await chat_service.generate_calendar_ics(messages)
+    try:
+        return await chat_service.generate_calendar_ics(messages)
+    except LLMError as e:
+        logger.error(f"ICS export failed: {str(e)}")
+        raise llm_http_error(e)
+
+
+@router.get("/llm/stats")
+async def llm_stats() -> dict:
+    scheduler = get_llm_scheduler()
+    stats = scheduler.stats()
+    router_stats = getattr(scheduler.llm_repository, "stats", None)
+    if router_stats is not None:
+        stats["router"] = router_stats()
+    return stats
@@ -1,9 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+import asyncio
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import List, Literal, Optional
 from ....application.services.calendar_service import CalendarService
-from ....domain.entities.event import Event
-from ..schemas.models import EventCreate, EventResponse, EventSplitRequest
-from ..dependencies import get_calendar_service
+from ....core.config import get_settings
+from ....domain.entities.event import Event, EventPatch
+from ....domain.exceptions import (
+    EventNotFound,
+    EventTimeRangeInvalid,
+    EventVersionConflict,
+)
+from ..schemas.models import (
+    EventBatchUpdate,
+    EventCreate,
+    EventResponse,
+    EventSplitRequest,
+    EventUpdate,
+)
+from ..dependencies import get_calendar_id, get_calendar_service, get_change_feed
+from ....infrastructure.export.arrow import ENCODERS, FILE_EXTENSIONS, MEDIA_TYPES
 
 # Add a prefix to the router
 router = APIRouter(prefix="/events")
@@ -11,22 +28,169 @@ router = APIRouter(prefix="/events")
 @router.post("/", response_model=EventResponse)
 async def create_event(
     event: EventCreate,
+    calendar_id: str = Depends(get_calendar_id),
     calendar_service: CalendarService = Depends(get_calendar_service),
 ) -> Event:
-    return await calendar_service.create_event(Event(**event.dict()))
+    return await calendar_service.create_event(
+        Event(**event.dict(), calendar_id=calendar_id)
+    )
+
+async def _apply_patches(
+    calendar_service: CalendarService, calendar_id: str, patches: List[EventPatch]
+) -> List[Event]:
+    try:
+        return await calendar_service.update_events(calendar_id, patches)
+    except EventNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except EventTimeRangeInvalid as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except EventVersionConflict as e:
+        # The client reloads the event and retries on top of current_version
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": str(e),
+                "id": e.event_id,
+                "current_version": e.current_version,
+            },
+        )
+
+def _to_patch(event_id: int, update: EventUpdate) -> EventPatch:
+    return EventPatch(
+        id=event_id,
+        changes=update.model_dump(exclude_unset=True, exclude={"id", "version"}),
+        expected_version=update.version,
+    )
+
+@router.patch("/", response_model=List[EventResponse])
+async def update_events(
+    batch: EventBatchUpdate,
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+) -> List[Event]:
+    """Apply several partial updates in one transaction: all or none"""
+    patches = [_to_patch(update.id, update) for update in batch.updates]
+    return await _apply_patches(calendar_service, calendar_id, patches)
 
 @router.get("/", response_model=List[EventResponse])
 async def get_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_tasks: bool = False,
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+):
+    """List the calendar's events overlapping [start, end), both bounds optional
+
+    With include_tasks, each event carries its sub-tasks (one more query)"""
+    rendering = get_settings().EVENT_LIST_RENDERING
+    # Returning a Response skips response_model validation and encoding
+    if rendering == "database":
+        return Response(
+            await calendar_service.get_events_json(
+                calendar_id, start, end, include_tasks
+            ),
+            media_type="application/json",
+        )
+    events = await calendar_service.get_all_events(
+        calendar_id, start, end, include_tasks
+    )
+    if rendering == "orjson":
+        exclude = None if include_tasks else {"tasks"}
+        return ORJSONResponse([event.model_dump(exclude=exclude) for event in events])
+    return events
+
+@router.get("/search", response_model=List[EventResponse])
+async def search_events(
+    q: str = "",
+    around: Optional[datetime] = None,
+    k: int = Query(10, ge=1, le=100),
+    calendar_id: str = Depends(get_calendar_id),
     calendar_service: CalendarService = Depends(get_calendar_service),
 ) -> List[Event]:
-    return await calendar_service.get_all_events()
+    """The k events most relevant to q (BM25), favouring those near around"""
+    return await calendar_service.search_events(calendar_id, q, around, k)
+
+@router.get("/version")
+async def get_events_version(
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+) -> dict:
+    """Changes on every write, so clients can cache listings until it moves"""
+    return {"version": await calendar_service.get_events_version(calendar_id)}
+
+@router.get("/changes")
+async def stream_changes(
+    calendar_id: str = Depends(get_calendar_id),
+) -> StreamingResponse:
+    """Server-sent events: one JSON delta per create, update, delete or split"""
+    change_feed = get_change_feed()
+    queue = change_feed.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies and client read timeouts happy
+                    yield ": keepalive\n\n"
+                    continue
+                # Resyncs without a calendar go to every subscriber
+                if change.get("calendar_id", calendar_id) != calendar_id:
+                    continue
+                yield f"data: {json.dumps(change)}\n\n"
+        finally:
+            change_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/export")
+async def export_events(
+    format: Literal["arrow", "parquet"] = Query("arrow"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+) -> StreamingResponse:
+    """Stream events overlapping [start, end) as Arrow IPC or Parquet"""
+    # A sync iterator: Starlette pulls it from a worker thread, batch by batch
+    chunks = ENCODERS[format](calendar_service.export_event_rows(calendar_id, start, end))
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="events.{FILE_EXTENSIONS[format]}"'
+            )
+        },
+    )
+
+@router.patch("/{event_id}", response_model=EventResponse)
+async def update_event(
+    event_id: int,
+    update: EventUpdate,
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+) -> Event:
+    """Change only the fields sent; with version set, 409 if it is stale"""
+    updated = await _apply_patches(
+        calendar_service, calendar_id, [_to_patch(event_id, update)]
+    )
+    return updated[0]
 
 @router.delete("/{event_id}")
 async def delete_event(
     event_id: int,
+    calendar_id: str = Depends(get_calendar_id),
     calendar_service: CalendarService = Depends(get_calendar_service),
 ) -> dict:
-    success = await calendar_service.delete_event(event_id)
+    success = await calendar_service.delete_event(calendar_id, event_id)
     if not success:
         raise HTTPException(status_code=404, detail="Event not found")
     return {"status": "success", "message": "Event deleted successfully"}
@@ -34,9 +198,12 @@ async def delete_event(
 @router.post("/split")
 async def split_event(
     request: EventSplitRequest,
+    calendar_id: str = Depends(get_calendar_id),
     calendar_service: CalendarService = Depends(get_calendar_service),
 ) -> dict:
-    success = await calendar_service.split_event(request.event_id, request.tasks)
+    success = await calendar_service.split_event(
+        calendar_id, request.event_id, request.tasks
+    )
     if not success:
         raise HTTPException(status_code=404, detail="Event not found")
     return {"status": "success", "message": "Event split successfully"}
@@ -0,0 +1,73 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from ..schemas.models import ChatRequest, JobResponse
+from ..dependencies import get_calendar_id, get_planning_service
+from ....application.services.planning_service import PlanningService
+from ....core.context import client_id_var
+from ....domain.entities.job import PlanningJob
+
+router = APIRouter(prefix="/jobs")
+
+
+async def _get_job(planning_service: PlanningService, job_id: str) -> PlanningJob:
+    job = await planning_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/plan", status_code=202, response_model=JobResponse)
+async def submit_plan(
+    request: ChatRequest,
+    response: Response,
+    calendar_id: str = Depends(get_calendar_id),
+    planning_service: PlanningService = Depends(get_planning_service),
+) -> PlanningJob:
+    """Queue a chat/planning request; poll GET /jobs/{id} for its result"""
+    job = await planning_service.submit(
+        {**request.model_dump(), "calendar_id": calendar_id}, client_id_var.get()
+    )
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    planning_service: PlanningService = Depends(get_planning_service),
+) -> PlanningJob:
+    return await _get_job(planning_service, job_id)
+
+
+@router.get("/{job_id}/events")
+async def stream_job(
+    job_id: str,
+    planning_service: PlanningService = Depends(get_planning_service),
+) -> StreamingResponse:
+    """Server-sent events: the job each time its status changes, until it ends"""
+    job = await _get_job(planning_service, job_id)
+
+    async def stream():
+        nonlocal job
+        last = None
+        while True:
+            current = (job.status, job.position, job.attempts)
+            if current != last:
+                last = current
+                payload = JobResponse(**job.model_dump()).model_dump_json()
+                yield f"data: {payload}\n\n"
+            if job.status.finished:
+                return
+            await asyncio.sleep(planning_service.poll_interval)
+            job = await planning_service.get_job(job_id)
+            if job is None:
+                # Deleted meanwhile: a named event, so it is not read as a job
+                yield 'event: gone\ndata: {"detail": "Job not found"}\n\n'
+                return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
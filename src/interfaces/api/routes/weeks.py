@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ....application.services.calendar_service import CalendarService
+from ....domain.entities.summary import WeekSummary
+from ..dependencies import get_calendar_id, get_calendar_service
+
+router = APIRouter(prefix="/weeks")
+
+
+@router.get("/{iso_week}/summary", response_model=WeekSummary)
+async def get_week_summary(
+    iso_week: str,
+    calendar_id: str = Depends(get_calendar_id),
+    calendar_service: CalendarService = Depends(get_calendar_service),
+) -> WeekSummary:
+    """Busy minutes, first and last event and free blocks of each day of the week"""
+    try:
+        return await calendar_service.get_week_summary(calendar_id, iso_week)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
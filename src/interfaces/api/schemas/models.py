@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Optional, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_serializer, model_validator
 
+from ....domain.entities.job import JobStatus
 from ....domain.entities.task import TaskCreate
 
 
@@ -19,6 +20,25 @@ class ChatRequest(BaseModel):
     functions: Optional[List[Dict]] = None
 
 
+class JobResponse(BaseModel):
+    id: str
+    status: JobStatus
+    attempts: int
+    position: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class TaskResponse(BaseModel):
+    id: int
+    task_name: str
+    task_start_date_time: datetime
+    task_end_date_time: datetime
+
+
 class EventResponse(BaseModel):
     id: int
     event_name: str
@@ -26,6 +46,63 @@ class EventResponse(BaseModel):
     event_start_date_time: datetime
     event_end_date_time: datetime
     event_location: Optional[str]
+    version: int
+    calendar_id: str
+    # Set with include_tasks=true
+    tasks: Optional[List[TaskResponse]] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_unloaded_tasks(self, handler):
+        # Left out rather than null, like the orjson and database renderings
+        data = handler(self)
+        if data.get("tasks") is None:
+            data.pop("tasks", None)
+        return data
+
+
+class EventUpdate(BaseModel):
+    """Fields to change; version, if given, must match the stored one"""
+
+    event_name: Optional[str] = None
+    event_description: Optional[str] = None
+    event_start_date_time: Optional[datetime] = None
+    event_end_date_time: Optional[datetime] = None
+    event_location: Optional[str] = None
+    version: Optional[int] = None
+
+    @field_validator("event_name", "event_start_date_time", "event_end_date_time")
+    @classmethod
+    def not_null(cls, value):
+        # Defaults are not validated, so this only rejects an explicit null
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+    @model_validator(mode="after")
+    def ends_after_start(self):
+        # With only one bound given, the repository checks the stored other one
+        start, end = self.event_start_date_time, self.event_end_date_time
+        if start is None or end is None:
+            return self
+        # Offsets are dropped on storage (timestamp columns), so compare as stored
+        if end.replace(tzinfo=None) <= start.replace(tzinfo=None):
+            raise ValueError("event_end_date_time must be after event_start_date_time")
+        return self
+
+
+class EventBatchUpdateItem(EventUpdate):
+    id: int
+
+
+class EventBatchUpdate(BaseModel):
+    updates: List[EventBatchUpdateItem]
+
+    @field_validator("updates")
+    @classmethod
+    def unique_ids(cls, updates: List[EventBatchUpdateItem]):
+        if len({update.id for update in updates}) != len(updates):
+            raise ValueError("each event may appear only once per batch")
+        return updates
 
 
 class EventSplitRequest(BaseModel):
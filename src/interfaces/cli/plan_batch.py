@@ -0,0 +1,513 @@
+"""Plan many weeks offline, without going through the UI.
+
+Each line of the input is one planning request::
+
+    {"id": "alice-2024-W07", "calendar_id": "alice", "week": "2024-W07",
+     "prompt": "Plan my week: 3 focus blocks, gym on Tuesday and Thursday"}
+
+``calendar_id`` defaults to "default" and ``id`` to the line number. The
+requests run concurrently through ChatService, each with its week's summary
+in the system message; the planned events are written with bulk inserts
+through CalendarService, many requests per statement::
+
+    python -m src.interfaces.cli.plan_batch requests.jsonl --concurrency 16
+    python -m src.interfaces.cli.plan_batch requests.jsonl --resume
+
+A request is checkpointed (one JSON line in ``<input>.checkpoint``) once its
+events are committed; ``--resume`` skips the requests already done and
+retries the failed ones. A crash between a commit and its checkpoint line
+plans those requests again, so their events may be inserted twice. Requests
+for the same calendar and week are planned independently of each other.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from ...application.services.calendar_service import CalendarService, week_start
+from ...application.services.chat_service import ChatService
+from ...core.config import get_settings
+from ...core.context import client_id_var, endpoint_var
+from ...core.logger import setup_logger
+from ...core.tracing import shutdown_tracing, start_trace
+from ...domain.entities.event import Event
+from ...domain.entities.summary import DaySummary
+from ...infrastructure.database.pool import (
+    close_pool,
+    connection,
+    shard_for,
+    shard_ids,
+)
+from ...infrastructure.database.schema import create_schema
+from ...infrastructure.llm.profiling import shutdown_llm_profiling
+from ...infrastructure.llm.scheduler import LLMScheduler
+from ..api.dependencies import (
+    _CALENDAR_ID,
+    build_llm_backend,
+    get_change_feed,
+    get_event_repository,
+    get_week_summary_repository,
+)
+
+logger = setup_logger(__name__)
+
+MAX_NAME_LENGTH = 255
+
+PLAN_EVENTS_FUNCTION = {
+    "name": "plan_events",
+    "description": "Add all the events of the planned week to the calendar",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "events": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "event_name": {"type": "string"},
+                        "event_description": {"type": "string"},
+                        "event_start_date_time": {
+                            "type": "string",
+                            "format": "date-time",
+                        },
+                        "event_end_date_time": {
+                            "type": "string",
+                            "format": "date-time",
+                        },
+                        "event_location": {"type": "string"},
+                    },
+                    "required": [
+                        "event_name",
+                        "event_start_date_time",
+                        "event_end_date_time",
+                    ],
+                },
+            }
+        },
+        "required": ["events"],
+    },
+}
+
+
+class BatchRequest(BaseModel):
+    id: str
+    prompt: str
+    week: str
+    calendar_id: str = "default"
+
+    @field_validator("week")
+    @classmethod
+    def iso_week(cls, value: str) -> str:
+        week_start(value)
+        return value
+
+    @field_validator("calendar_id")
+    @classmethod
+    def calendar(cls, value: str) -> str:
+        if not _CALENDAR_ID.fullmatch(value):
+            raise ValueError("must be 1-64 letters, digits, '_', '.' or '-'")
+        return value
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.events = 0
+        self.discarded = 0
+        self.flushes = 0
+        self.plan_seconds: List[float] = []
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        ordered = sorted(self.plan_seconds)
+
+        def percentile(q: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+        return (
+            f"{self.done} requests planned, {self.failed} failed, "
+            f"{self.skipped} skipped (already done) in {elapsed:.1f}s\n"
+            f"throughput: {self.done / elapsed:.2f} requests/s, "
+            f"{self.events / elapsed:.1f} events/s\n"
+            f"planning latency: p50 {percentile(0.5):.2f}s, "
+            f"p95 {percentile(0.95):.2f}s\n"
+            f"{self.events} events inserted in {self.flushes} bulk inserts, "
+            f"{self.discarded} invalid events discarded"
+        )
+
+
+def read_requests(path: str) -> List[BatchRequest]:
+    requests = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                fields = json.loads(line)
+                fields["id"] = str(fields.get("id", number))
+                requests.append(BatchRequest(**fields))
+            except (ValueError, TypeError, ValidationError) as e:
+                sys.exit(f"{path}:{number}: invalid request: {e}")
+    return requests
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """IDs of the requests a previous run completed."""
+    done: Set[str] = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry["status"] == "done":
+                        done.add(entry["id"])
+    return done
+
+
+def _describe_day(day: DaySummary) -> str:
+    label = f"{day.day:%a %Y-%m-%d}"
+    if day.event_count:
+        label += (
+            f": {day.event_count} events, {day.busy_minutes // 60}h"
+            f"{day.busy_minutes % 60:02d} busy"
+        )
+    else:
+        label += ": no events"
+    free = ", ".join(
+        f"{block.start:%H:%M}-{block.end:%H:%M}" for block in day.free_blocks
+    )
+    return f"{label}; free blocks {free}" if free else f"{label}; no free block"
+
+
+def system_message(monday: datetime, days: List[DaySummary]) -> dict:
+    friday = monday + timedelta(days=4)
+    load = "\n".join(f"- {_describe_day(day)}" for day in days[:5])
+    return {
+        "role": "system",
+        "content": f"""You are a calendar planning assistant planning a work week
+from {monday:%Y-%m-%d} (Monday) to {friday:%Y-%m-%d} (Friday).
+Add every event of the plan in a single plan_events call. Only schedule within
+this week, in the free blocks below; format dates as ISO 8601 (YYYY-MM-DDTHH:MM).
+Current load of the week:
+{load}""",
+    }
+
+
+def _fits_columns(event: Event) -> bool:
+    # VARCHAR(255) columns of calendar_events: a longer value would fail the
+    # whole bulk insert it is part of
+    return (
+        len(event.event_name) <= MAX_NAME_LENGTH
+        and len(event.event_location or "") <= MAX_NAME_LENGTH
+    )
+
+
+def planned_events(
+    result: dict, request: BatchRequest, monday: datetime
+) -> Tuple[List[Event], int]:
+    """Events of the model's plan_events call, and how many were discarded."""
+    message = (result.get("choices") or [{}])[0].get("message") or {}
+    call = message.get("function_call")
+    if not call or call.get("name") != "plan_events":
+        return [], 0
+    try:
+        items = json.loads(call.get("arguments") or "{}").get("events") or []
+    except (ValueError, AttributeError):
+        return [], 0
+    events, discarded = [], 0
+    week_end = monday + timedelta(days=7)
+    for item in items:
+        try:
+            event = Event(**item, calendar_id=request.calendar_id)
+        except (TypeError, ValidationError):
+            discarded += 1
+            continue
+        start, end = event.event_start_date_time, event.event_end_date_time
+        start, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+        if not monday <= start < end <= week_end or not _fits_columns(event):
+            discarded += 1
+            continue
+        events.append(
+            event.model_copy(
+                update={"event_start_date_time": start, "event_end_date_time": end}
+            )
+        )
+    return events, discarded
+
+
+class BatchPlanner:
+    """Plans requests with a pool of workers and bulk-inserts their events.
+
+    Workers hand finished plans to a single writer, which inserts them once
+    ``insert_batch`` events are buffered or the oldest has waited
+    ``insert_interval`` seconds, and only then checkpoints their requests.
+    A bulk insert that fails is retried one request at a time, so only the
+    requests whose events cannot be inserted are checkpointed as failed.
+    """
+
+    def __init__(
+        self,
+        chat_service: ChatService,
+        calendar_service: CalendarService,
+        checkpoint_path: str,
+        concurrency: int,
+        insert_batch: int,
+        insert_interval: float,
+    ):
+        self.chat_service = chat_service
+        self.calendar_service = calendar_service
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+        self.insert_batch = insert_batch
+        self.insert_interval = insert_interval
+        self.stats = Stats()
+        self._plans: "asyncio.Queue[Optional[Tuple[str, List[Event]]]]" = (
+            asyncio.Queue()
+        )
+
+    async def run(self, requests: List[BatchRequest]) -> Stats:
+        pending: "asyncio.Queue[BatchRequest]" = asyncio.Queue()
+        for request in requests:
+            pending.put_nowait(request)
+        writer = asyncio.create_task(self._write(), name="plan-batch-writer")
+        workers = [
+            asyncio.create_task(self._work(pending), name=f"plan-batch-{i}")
+            for i in range(min(self.concurrency, len(requests)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._plans.put_nowait(None)
+            await writer
+        return self.stats
+
+    async def _work(self, pending: "asyncio.Queue[BatchRequest]") -> None:
+        endpoint_var.set("plan_batch")
+        while not pending.empty():
+            request = pending.get_nowait()
+            client_id_var.set(request.calendar_id)
+            started = time.perf_counter()
+            try:
+                with start_trace("plan_batch") as root:
+                    root.set("request_id", request.id)
+                    events = await self._plan(request)
+            except Exception as e:
+                logger.error(f"Planning request {request.id} failed: {str(e)}")
+                self._checkpoint([(request.id, "failed", str(e) or type(e).__name__)])
+                self.stats.failed += 1
+                continue
+            self.stats.plan_seconds.append(time.perf_counter() - started)
+            await self._plans.put((request.id, events))
+
+    async def _plan(self, request: BatchRequest) -> List[Event]:
+        summary = await self.calendar_service.get_week_summary(
+            request.calendar_id, request.week
+        )
+        monday = datetime.combine(week_start(request.week), datetime.min.time())
+        result = await self.chat_service.process_chat(
+            [
+                system_message(monday, summary.days),
+                {"role": "user", "content": request.prompt},
+            ],
+            [PLAN_EVENTS_FUNCTION],
+            monday.isoformat(),
+            request.calendar_id,
+        )
+        events, discarded = planned_events(result, request, monday)
+        self.stats.discarded += discarded
+        return events
+
+    async def _write(self) -> None:
+        buffered: List[Tuple[str, List[Event]]] = []
+        rows = 0
+        deadline = None
+        finished = False
+        while not finished:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            try:
+                plan = await asyncio.wait_for(self._plans.get(), timeout)
+            except asyncio.TimeoutError:
+                plan = False
+            if plan is None:
+                finished = True
+            elif plan:
+                buffered.append(plan)
+                rows += len(plan[1])
+                if deadline is None:
+                    deadline = time.monotonic() + self.insert_interval
+            # Insert when the batch is full, or its oldest plan has waited long enough
+            if buffered and (
+                finished or rows >= self.insert_batch or time.monotonic() >= deadline
+            ):
+                await self._flush(buffered)
+                buffered, rows, deadline = [], 0, None
+
+    async def _flush(self, plans: List[Tuple[str, List[Event]]]) -> None:
+        # One insert per shard: each commits on its own, so a failure leaves
+        # no rows of the same insert committed elsewhere
+        by_shard: Dict[Optional[int], List[Tuple[str, List[Event]]]] = {}
+        for plan in plans:
+            if plan[1]:
+                calendar_id = plan[1][0].calendar_id
+                by_shard.setdefault(shard_for(calendar_id), []).append(plan)
+            else:
+                self._record_done([plan])
+        for group in by_shard.values():
+            error = await self._insert(group)
+            if error is None:
+                self._record_done(group)
+                continue
+            if len(group) > 1:
+                # Request by request, so a bad row only fails its own request
+                # and the plans already paid for are kept
+                logger.warning(
+                    f"Inserting the events of {len(group)} requests failed, "
+                    f"retrying one request at a time: {error}"
+                )
+                for plan in group:
+                    plan_error = await self._insert([plan])
+                    if plan_error is None:
+                        self._record_done([plan])
+                    else:
+                        self._record_failed(plan[0], plan_error)
+            else:
+                self._record_failed(group[0][0], error)
+
+    async def _insert(self, plans: List[Tuple[str, List[Event]]]) -> Optional[str]:
+        """Insert the plans' events in one statement; the error if it failed."""
+        events = [event for _, plan in plans for event in plan]
+        try:
+            await self.calendar_service.create_events(events)
+        except Exception as e:
+            return str(e) or type(e).__name__
+        self.stats.flushes += 1
+        return None
+
+    def _record_done(self, plans: List[Tuple[str, List[Event]]]) -> None:
+        self._checkpoint(
+            [(request_id, "done", len(plan)) for request_id, plan in plans]
+        )
+        self.stats.done += len(plans)
+        self.stats.events += sum(len(plan) for _, plan in plans)
+        if self.stats.done // 100 != (self.stats.done - len(plans)) // 100:
+            logger.info(
+                f"{self.stats.done} requests planned, {self.stats.events} events"
+            )
+
+    def _record_failed(self, request_id: str, error: str) -> None:
+        logger.error(f"Inserting the events of request {request_id} failed: {error}")
+        self._checkpoint([(request_id, "failed", error)])
+        self.stats.failed += 1
+
+    def _checkpoint(self, entries: List[Tuple[str, str, object]]) -> None:
+        with open(self.checkpoint_path, "a") as f:
+            for request_id, status, detail in entries:
+                key = "events" if status == "done" else "error"
+                f.write(
+                    json.dumps({"id": request_id, "status": status, key: detail}) + "\n"
+                )
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def create_schemas() -> None:
+    with connection() as conn:
+        create_schema(conn)
+    for shard in shard_ids():
+        with connection(shard=shard) as conn:
+            create_schema(conn)
+
+
+async def plan(args: argparse.Namespace) -> Stats:
+    settings = get_settings()
+    requests = read_requests(args.path)
+    checkpoint = args.checkpoint or f"{args.path}.checkpoint"
+    if os.path.exists(checkpoint) and not args.resume:
+        sys.exit(f"{checkpoint} exists: pass --resume to continue that run")
+    done = read_checkpoint(checkpoint)
+    todo = [request for request in requests if request.id not in done]
+
+    create_schemas()
+    # The batch has the scheduler to itself: every request may be in flight,
+    # whichever calendar it belongs to
+    scheduler = LLMScheduler(
+        build_llm_backend(),
+        max_concurrency=args.concurrency,
+        max_concurrency_per_client=args.concurrency,
+        max_retries=settings.LLM_MAX_RETRIES,
+        max_backoff=settings.LLM_MAX_BACKOFF,
+        deadline=settings.LLM_REQUEST_DEADLINE,
+    )
+    planner = BatchPlanner(
+        ChatService(scheduler),
+        CalendarService(
+            get_event_repository(),
+            get_change_feed(),
+            week_summaries=get_week_summary_repository(),
+        ),
+        checkpoint,
+        concurrency=args.concurrency,
+        insert_batch=args.insert_batch,
+        insert_interval=args.insert_interval,
+    )
+    planner.stats.skipped = len(requests) - len(todo)
+    try:
+        return await planner.run(todo)
+    finally:
+        await scheduler.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="JSONL file of planning requests")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=get_settings().LLM_MAX_CONCURRENCY,
+        help="requests planned at the same time",
+    )
+    parser.add_argument(
+        "--insert-batch",
+        type=int,
+        default=500,
+        help="events buffered before a bulk insert",
+    )
+    parser.add_argument(
+        "--insert-interval",
+        type=float,
+        default=1.0,
+        help="longest a planned event waits for its bulk insert, in seconds",
+    )
+    parser.add_argument("--checkpoint", help="default: <path>.checkpoint")
+    parser.add_argument(
+        "--resume", action="store_true", help="skip requests already done"
+    )
+    args = parser.parse_args()
+    try:
+        stats = asyncio.run(plan(args))
+    finally:
+        shutdown_llm_profiling()
+        shutdown_tracing()
+        close_pool()
+    print(stats.report())
+    if stats.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import json
 from datetime import datetime, timedelta
+import threading
 import time
+from typing import Dict, List, Optional, Tuple
+import uuid
 
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from streamlit_calendar import calendar
 import streamlit.components.v1 as components
@@ -14,6 +18,201 @@ logger = setup_logger(__name__)
 BACKEND_URL = "http://localhost:8000"
 
 
+def api_headers() -> dict:
+    # One identity per browser session so backend limits apply per user
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    # Every call of one script run belongs to the same trace, each as its own span
+    if "trace_id" not in st.session_state:
+        st.session_state.trace_id = uuid.uuid4().hex
+    return {
+        "X-Client-ID": st.session_state.client_id,
+        "X-Calendar-ID": current_calendar(),
+        "traceparent": f"00-{st.session_state.trace_id}-{uuid.uuid4().hex[:16]}-00",
+    }
+
+
+def current_calendar() -> str:
+    return st.session_state.get("calendar_id") or "default"
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    # One keep-alive connection pool shared by every rerun and browser session
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Arguments starting with "_" are not part of Streamlit's cache key, so the
+# per-call trace headers do not defeat the cache
+@st.cache_data(ttl=2, show_spinner=False)
+def fetch_events_version(calendar_id: str, _headers: dict) -> Optional[int]:
+    response = http_session().get(
+        f"{BACKEND_URL}/events/version", headers=_headers, timeout=5
+    )
+    return response.json()["version"] if response.status_code == 200 else None
+
+
+class LiveEvents:
+    """Process-wide copy of the events of one calendar the UI has displayed.
+
+    Each range is fetched once; afterwards a background thread follows
+    /events/changes and applies the deltas in place, so reruns read from
+    memory. While the stream is down, the store falls back to comparing the
+    backend's version and reloading when it moves.
+    """
+
+    def __init__(self, calendar_id: str):
+        self.calendar_id = calendar_id
+        self.lock = threading.Lock()
+        self.events: Dict[int, dict] = {}
+        self.ranges: List[Tuple[str, str]] = []
+        self.seq = 0
+        self.version: Optional[int] = None
+        self.connected = False
+        threading.Thread(target=self._follow, name="event-changes", daemon=True).start()
+
+    def reset(self, version: Optional[int] = None) -> None:
+        with self.lock:
+            self.events.clear()
+            self.ranges.clear()
+            self.seq += 1
+            self.version = version
+
+    def check_version(self, version: int) -> None:
+        if version != self.version:
+            self.reset(version)
+
+    def apply(self, change: dict) -> None:
+        if change.get("type") == "resync":
+            self.reset()
+            return
+        with self.lock:
+            self.seq += 1
+            for event_id in change.get("deleted", []):
+                self.events.pop(event_id, None)
+            for event in change.get("upserted", []):
+                # Updates carry no tasks: keep those already loaded
+                previous = self.events.get(event["id"])
+                if "tasks" not in event and previous is not None:
+                    event["tasks"] = previous.get("tasks")
+                self.events[event["id"]] = event
+
+    def events_in(self, start: str, end: str, headers: dict) -> list:
+        with self.lock:
+            covered = any(s <= start and end <= e for s, e in self.ranges)
+        for _ in range(3):
+            if covered:
+                break
+            seq = self.seq
+            response = http_session().get(
+                f"{BACKEND_URL}/events",
+                params={"start": start, "end": end, "include_tasks": "true"},
+                headers=headers,
+                timeout=30,
+            )
+            response.raise_for_status()
+            with self.lock:
+                # A delta that landed during the fetch may be newer than the
+                # response; fetch again rather than merge stale rows
+                if self.seq == seq:
+                    for event in response.json():
+                        self.events[event["id"]] = event
+                    self.ranges.append((start, end))
+                    covered = True
+        with self.lock:
+            # ISO 8601 strings of the same shape compare chronologically
+            return sorted(
+                (
+                    event
+                    for event in self.events.values()
+                    if event["event_end_date_time"] > start
+                    and event["event_start_date_time"] < end
+                ),
+                key=lambda event: event["event_start_date_time"],
+            )
+
+    def _follow(self) -> None:
+        session = requests.Session()
+        while True:
+            try:
+                with session.get(
+                    f"{BACKEND_URL}/events/changes",
+                    headers={"X-Calendar-ID": self.calendar_id},
+                    stream=True,
+                    timeout=(5, 60),
+                ) as response:
+                    response.raise_for_status()
+                    # Anything loaded before (re)connecting may have missed deltas
+                    self.reset()
+                    self.connected = True
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            self.apply(json.loads(line[5:]))
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Event change stream interrupted: {str(e)}")
+            self.connected = False
+            time.sleep(3)
+
+
+@st.cache_resource
+def live_events(calendar_id: str) -> LiveEvents:
+    return LiveEvents(calendar_id)
+
+
+def invalidate_events() -> None:
+    """Make the next rerun ask the backend for its version right away."""
+    fetch_events_version.clear()
+    fetch_week_summary.clear()
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def fetch_week_summary(calendar_id: str, iso_week: str, _headers: dict) -> Optional[dict]:
+    try:
+        response = http_session().get(
+            f"{BACKEND_URL}/weeks/{iso_week}/summary", headers=_headers, timeout=5
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Week summary unavailable: {str(e)}")
+        return None
+    return response.json() if response.status_code == 200 else None
+
+
+def iso_week(day: datetime) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _duration(minutes: int) -> str:
+    return f"{minutes // 60}h{minutes % 60:02d}"
+
+
+def describe_week(summary: dict, start: datetime, end: datetime) -> str:
+    """One compact line per day of [start, end] for the system message."""
+    lines = []
+    for day in summary["days"]:
+        if not start.date().isoformat() <= day["day"] <= end.date().isoformat():
+            continue
+        label = datetime.fromisoformat(day["day"]).strftime("%a %Y-%m-%d")
+        if day["event_count"]:
+            line = (
+                f"{label}: {day['event_count']} events, "
+                f"{_duration(day['busy_minutes'])} busy "
+                f"({day['first_start'][11:16]}-{day['last_end'][11:16]})"
+            )
+        else:
+            line = f"{label}: no events"
+        free = ", ".join(
+            f"{block['start'][11:16]}-{block['end'][11:16]}"
+            for block in day["free_blocks"]
+        )
+        lines.append(f"{line}; free blocks {free}" if free else f"{line}; no free block")
+    return "\n".join(f"        - {line}" for line in lines)
+
+
 def get_system_message(selected_date: datetime) -> dict:
     weekday = selected_date.strftime("%A")
     days_until_friday = 4 - selected_date.weekday()
@@ -31,6 +230,19 @@ def get_system_message(selected_date: datetime) -> dict:
         else ""
     )
 
+    # Precomputed day summaries instead of the raw events: a few lines of
+    # context tell the model how busy each day already is
+    summary = fetch_week_summary(
+        current_calendar(), iso_week(selected_date), api_headers()
+    )
+    week_load = (
+        f"""
+        Current load of these days (schedule into the free blocks):
+{describe_week(summary, selected_date, end_date)}"""
+        if summary
+        else ""
+    )
+
     return {
         "role": "system",
         "content": f"""You are a helpful calendar planning assistant.
@@ -43,7 +255,7 @@ def get_system_message(selected_date: datetime) -> dict:
         - Don't generate any events beyond this Friday
         - Format all dates and times in ISO format (YYYY-MM-DD HH:mm)
         - Only schedule within this specific work week period
-        {split_instruction}""",
+        {split_instruction}{week_load}""",
     }
 
 
@@ -62,23 +274,54 @@ document.addEventListener('keypress', function(event) {
 </script>
 """
 
+def run_planning_job(payload: dict) -> requests.Response:
+    """Queue a chat request as a job and poll until it finishes.
+
+    The backend answers the submission at once, so no request stays open for
+    the length of the LLM run. Returns the final GET /jobs/{id} response.
+    """
+    response = http_session().post(
+        f"{BACKEND_URL}/jobs/plan", json=payload, headers=api_headers(), timeout=10
+    )
+    if response.status_code != 202:
+        return response
+    job_url = f"{BACKEND_URL}{response.headers['Location']}"
+    with st.spinner("Planning..."):
+        while True:
+            response = http_session().get(job_url, headers=api_headers(), timeout=10)
+            if response.status_code in (429, 503):
+                # Shed by admission control: the job keeps running meanwhile
+                time.sleep(float(response.headers.get("Retry-After", 1)))
+                continue
+            if response.status_code != 200 or response.json()["status"] in (
+                "succeeded",
+                "failed",
+            ):
+                return response
+            time.sleep(0.5)
+
+
 def chat_input_handler(prompt: str) -> None:
     if prompt:
         st.session_state.messages.append({"role": "user", "content": prompt})
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/chat",
-                json={
+            response = run_planning_job(
+                {
                     "messages": st.session_state.messages,
                     "selected_date": st.session_state.selected_date.isoformat(),
                     "functions": get_llm_functions(),
-                },
+                }
             )
 
-            logger.debug(f"API Response: {response.text}")
+            logger.debug(
+                f"API Response: {response.status_code} ({len(response.content)} bytes)"
+            )
 
-            if response.status_code == 200:
-                handle_chat_response(response.json())
+            job = response.json() if response.status_code == 200 else None
+            if job is not None and job["status"] == "succeeded":
+                handle_chat_response(job["result"])
+            elif job is not None:
+                st.session_state.query_status = f"Error: {job['error']}"
             else:
                 st.session_state.query_status = f"Error: {response.text}"
         except Exception as e:
@@ -87,7 +330,8 @@ def chat_input_handler(prompt: str) -> None:
 
 
 def handle_chat_response(data: dict) -> None:
-    logger.debug(f"Assistant Response: {data}")
+    # Lazy formatting: the payload is only rendered when DEBUG is enabled
+    logger.debug("Assistant Response: %s", data)
     if "choices" in data and len(data["choices"]) > 0:
         choice = data["choices"][0]
         message = choice.get("message", {})
@@ -130,8 +374,13 @@ def handle_insert_event(arguments: dict) -> None:
     # If event splitting is enabled and event is longer than 2 hours
     if st.session_state.get("enable_event_splitting", False) and duration > 120:
         # Create initial event to get its ID
-        response = requests.post(f"{BACKEND_URL}/events", json=arguments)
+        response = http_session().post(
+            f"{BACKEND_URL}/events",
+            json=arguments,
+            headers=api_headers(),
+        )
         if response.status_code == 200:
+            invalidate_events()
             event = response.json()
             # Ask LLM to split the event
             split_prompt = f"""Please split this event into smaller tasks:
@@ -144,7 +393,7 @@ def handle_insert_event(arguments: dict) -> None:
                 {"role": "system", "content": split_prompt}
             )
 
-            split_response = requests.post(
+            split_response = http_session().post(
                 f"{BACKEND_URL}/chat",
                 json={
                     "messages": st.session_state.messages,
@@ -153,6 +402,7 @@ def handle_insert_event(arguments: dict) -> None:
                         f for f in get_llm_functions() if f["name"] == "split_event"
                     ],
                 },
+                headers=api_headers(),
             )
 
             if split_response.status_code == 200:
@@ -161,8 +411,13 @@ def handle_insert_event(arguments: dict) -> None:
                 st.error("Failed to split event")
     else:
         # Handle normal event creation
-        response = requests.post(f"{BACKEND_URL}/events", json=arguments)
+        response = http_session().post(
+            f"{BACKEND_URL}/events",
+            json=arguments,
+            headers=api_headers(),
+        )
         if response.status_code == 200:
+            invalidate_events()
             st.success("Event added successfully!")
             st.toast(f"I've added the event '{arguments.get('event_name')}' to your calendar.")
             time.sleep(1)
@@ -172,8 +427,12 @@ def handle_insert_event(arguments: dict) -> None:
 
 def handle_delete_event(arguments: dict) -> None:
     event_id = arguments.get("event_id")
-    response = requests.delete(f"{BACKEND_URL}/events/{event_id}")
+    response = http_session().delete(
+        f"{BACKEND_URL}/events/{event_id}",
+        headers=api_headers(),
+    )
     if response.status_code == 200:
+        invalidate_events()
         st.success("Event deleted successfully!")
         st.session_state.messages.append(
             {
@@ -186,11 +445,29 @@ def handle_delete_event(arguments: dict) -> None:
 
 
 def handle_get_events() -> None:
-    response = requests.get(f"{BACKEND_URL}/events")
+    # Only the events relevant to the request: this text stays in the
+    # conversation and is resent on every later turn
+    query = next(
+        (
+            message["content"]
+            for message in reversed(st.session_state.messages)
+            if message["role"] == "user"
+        ),
+        "",
+    )
+    response = http_session().get(
+        f"{BACKEND_URL}/events/search",
+        params={
+            "q": query,
+            "around": st.session_state.selected_date.isoformat(),
+            "k": 20,
+        },
+        headers=api_headers(),
+    )
     if response.status_code == 200:
         events = response.json()
         if events:
-            events_text = "Here are your current events:\n"
+            events_text = "Here are your relevant events:\n"
             for event in events:
                 events_text += f"\n- {event['event_name']} from {event['event_start_date_time']} to {event['event_end_date_time']}"
             st.session_state.messages.append(
@@ -211,8 +488,13 @@ def handle_get_events() -> None:
 
 
 def handle_split_event(arguments: dict) -> None:
-    response = requests.post(f"{BACKEND_URL}/events/split", json=arguments)
+    response = http_session().post(
+        f"{BACKEND_URL}/events/split",
+        json=arguments,
+        headers=api_headers(),
+    )
     if response.status_code == 200:
+        invalidate_events()
         st.success("Event split successfully!")
         st.session_state.messages.append(
             {
@@ -364,44 +646,140 @@ def set_custom_style():
     )
 
 
-def display_events() -> None:
-    response = requests.get(f"{BACKEND_URL}/events")
-    if response.status_code == 200:
-        events = response.json()
-        if events:
-            # Map events to the format expected by st_fullcalendar
-            calendar_events = [
-                {
-                    "title": event["event_name"],
-                    "start": event["event_start_date_time"],
-                    "end": event["event_end_date_time"],
-                    # Include additional fields if necessary
-                }
-                for event in events
-            ]
-
-            # Define calendar options with initialDate
-            calendar_options = {
-                "initialView": "timeGridWeek",
-                "initialDate": st.session_state.selected_date.strftime("%Y-%m-%d"),
-                "editable": True,
-                "selectable": True,
-                "headerToolbar": {
-                    "left": "prev,next today",
-                    "center": "title",
-                    "right": "dayGridMonth,timeGridWeek,timeGridDay",
-                },
-                "slotMinTime": "06:00:00",
-                "slotMaxTime": "22:00:00",
-                # Include any other FullCalendar options you need
-            }
+def _naive(value: str) -> datetime:
+    # FullCalendar reports local time with an offset; events are stored naive
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
 
-            # Render the calendar using st_fullcalendar
-            calendar(calendar_events, calendar_options)
-        else:
-            st.info("No events to display.")
+
+def save_event_change(event_change: dict) -> None:
+    """Persist a drag or resize, with any related events, in one PATCH."""
+    moved = [event_change["event"]] + event_change.get("relatedEvents", [])
+    updates = []
+    for event in moved:
+        update = {
+            "id": int(event["id"]),
+            "event_start_date_time": _naive(event["start"]).isoformat(),
+            "version": event.get("extendedProps", {}).get("version"),
+        }
+        # FullCalendar omits end when it equals the default duration
+        if event.get("end"):
+            update["event_end_date_time"] = _naive(event["end"]).isoformat()
+        updates.append(update)
+    response = http_session().patch(
+        f"{BACKEND_URL}/events/",
+        json={"updates": updates},
+        headers=api_headers(),
+        timeout=10,
+    )
+    if response.status_code == 200:
+        live_events(current_calendar()).apply({"type": "updated", "upserted": response.json()})
+        invalidate_events()
+    elif response.status_code == 409:
+        st.warning("This event was changed elsewhere; the calendar was reloaded.")
+        live_events(current_calendar()).reset()
     else:
+        st.error(f"Failed to save the change: {response.text}")
+    st.rerun()
+
+
+def visible_range() -> Tuple[str, str]:
+    """Range FullCalendar last reported, or a guess around the selected date."""
+    anchor = st.session_state.selected_date
+    reported = st.session_state.get("calendar_range")
+    if reported and reported["anchor"] == anchor:
+        return reported["start"], reported["end"]
+    # Until datesSet reports, cover the selected week with a week either side
+    start = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+    return (
+        (start - timedelta(days=7)).isoformat(),
+        (start + timedelta(days=14)).isoformat(),
+    )
+
+
+def display_events() -> None:
+    store = live_events(current_calendar())
+    if not store.connected:
+        version = fetch_events_version(store.calendar_id, api_headers())
+        if version is None:
+            st.error("Failed to fetch events")
+            return
+        store.check_version(version)
+    start, end = visible_range()
+    try:
+        events = store.events_in(start, end, api_headers())
+    except requests.RequestException:
         st.error("Failed to fetch events")
+        return
+
+    # Map events to the format expected by st_fullcalendar
+    calendar_events = []
+    for event in events:
+        tasks = event.get("tasks") or []
+        calendar_events.append(
+            {
+                "title": event["event_name"],
+                "start": event["event_start_date_time"],
+                "end": event["event_end_date_time"],
+                # Echoed back by eventChange so a drag can be saved with a PATCH
+                "id": str(event["id"]),
+                "extendedProps": {"version": event["version"]},
+                # A split event stays behind its tasks
+                **({"display": "background"} if tasks else {}),
+            }
+        )
+        calendar_events.extend(
+            {
+                "title": f"{event['event_name']} › {task['task_name']}",
+                "start": task["task_start_date_time"],
+                "end": task["task_end_date_time"],
+                "id": f"task-{task['id']}",
+                "editable": False,
+            }
+            for task in tasks
+        )
+
+    # Define calendar options with initialDate
+    calendar_options = {
+        "initialView": "timeGridWeek",
+        "initialDate": st.session_state.selected_date.strftime("%Y-%m-%d"),
+        "editable": True,
+        "selectable": True,
+        "headerToolbar": {
+            "left": "prev,next today",
+            "center": "title",
+            "right": "dayGridMonth,timeGridWeek,timeGridDay",
+        },
+        "slotMinTime": "06:00:00",
+        "slotMaxTime": "22:00:00",
+        # Include any other FullCalendar options you need
+    }
+
+    # Render the calendar even when the range is empty so it stays navigable
+    state = calendar(
+        events=calendar_events,
+        options=calendar_options,
+        callbacks=["datesSet", "eventChange"],
+        key="calendar",
+    )
+    event_change = (state or {}).get("eventChange")
+    if event_change and event_change != st.session_state.get("last_event_change"):
+        st.session_state.last_event_change = event_change
+        save_event_change(event_change)
+    dates_set = (state or {}).get("datesSet")
+    if dates_set and dates_set != st.session_state.get("last_dates_set"):
+        # The user navigated: fetch the newly visible window
+        st.session_state.last_dates_set = dates_set
+        shown = (
+            _naive(dates_set["start"]).isoformat(),
+            _naive(dates_set["end"]).isoformat(),
+        )
+        st.session_state.calendar_range = {
+            "anchor": st.session_state.selected_date,
+            "start": shown[0],
+            "end": shown[1],
+        }
+        if shown != (start, end):
+            st.rerun()
 
 
 def get_llm_functions() -> list:
@@ -517,6 +895,10 @@ def main():
 
     components.html(on_keypress(), height=0, width=0)
 
+    # One trace per interaction; the ID can be looked up with tools/trace_view.py
+    st.session_state.trace_id = uuid.uuid4().hex
+    logger.debug(f"Trace ID: {st.session_state.trace_id}")
+
     # Initialize session state variables
     if "enable_event_splitting" not in st.session_state:
         st.session_state.enable_event_splitting = False
@@ -541,8 +923,10 @@ def main():
         # Export button
         if st.button("📤 Export Calendar", use_container_width=True):
             with st.spinner("Preparing calendar export..."):
-                response = requests.post(
-                    f"{BACKEND_URL}/export-ics", json=st.session_state.messages
+                response = http_session().post(
+                    f"{BACKEND_URL}/export-ics",
+                    json=st.session_state.messages,
+                    headers=api_headers(),
                 )
                 if response.status_code == 200:
                     st.download_button(
@@ -558,6 +942,12 @@ def main():
     # Sidebar
     with st.sidebar:
         st.markdown("### ⚙️ Settings")
+        st.text_input(
+            "Calendar",
+            value="default",
+            key="calendar_id",
+            help="Events, chat and planning jobs all work on this calendar",
+        )
         selected_week = st.date_input(
             "Week Starting From:", datetime.now().date(), key="date_picker"
         )
@@ -585,6 +975,23 @@ def main():
             help="Allow the assistant to split events into multiple smaller tasks",
         )
 
+        summary = fetch_week_summary(
+            current_calendar(), iso_week(selected_datetime), api_headers()
+        )
+        if summary:
+            st.markdown(f"### 📊 Week {summary['iso_week']}")
+            events_col, busy_col, free_col = st.columns(3)
+            events_col.metric("Events", summary["event_count"])
+            busy_col.metric("Busy", _duration(summary["busy_minutes"]))
+            free_col.metric("Free", _duration(summary["free_minutes"]))
+            st.caption(
+                " · ".join(
+                    f"{datetime.fromisoformat(day['day']):%a} "
+                    f"{_duration(day['busy_minutes'])}"
+                    for day in summary["days"]
+                )
+            )
+
         st.divider()
         # Chat Section
         st.markdown("### 💬 Chat")
@@ -1,41 +1,118 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 # Fix relative imports
-from .interfaces.api.routes import events, chat
-from .infrastructure.database.postgres import PostgresEventRepository
-from .core.logger import setup_logger
+from .interfaces.api.routes import events, chat, jobs, metrics, weeks
+from .interfaces.api.dependencies import (
+    close_llm_scheduler,
+    get_admission_controller,
+    get_change_feed,
+    get_event_index,
+    get_planning_service,
+)
+from .interfaces.api.admission import AdmissionMiddleware
+from .infrastructure.llm.profiling import shutdown_llm_profiling
+from .infrastructure.database.pool import close_pool, connection, shard_ids
+from .infrastructure.database.schema import create_schema
+from .core.context import client_id_var, endpoint_var
+from .core.metrics import HTTP_REQUEST_SECONDS
+from .core.tracing import shutdown_tracing, start_trace
+from .core.logger import setup_logger, shutdown_logging
 
 logger = setup_logger(__name__)
 
-app = FastAPI(title="Calendar Planning Assistant")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables on startup; drain pools and exporters on shutdown"""
+    try:
+        with connection() as conn:
+            create_schema(conn)
+        for shard in shard_ids():
+            with connection(shard=shard) as conn:
+                create_schema(conn)
+        logger.info("Database initialized successfully")
+    except Exception as e:
+        logger.error(f"Error initializing database: {str(e)}")
+        raise
+    await get_change_feed().start()
+    await get_event_index().start()
+    await get_planning_service().start()
+    yield
+    # Stop planning workers first: their jobs are released back to the queue
+    await get_planning_service().close()
+    await get_event_index().close()
+    await get_change_feed().close()
+    await close_llm_scheduler()
+    shutdown_llm_profiling()
+    close_pool()
+    logger.info("Connection pools closed")
+    shutdown_tracing()
+    shutdown_logging()
+
+
+app = FastAPI(title="Calendar Planning Assistant", lifespan=lifespan)
 
 # Include routers
 app.include_router(events.router)
 app.include_router(chat.router)
+app.include_router(jobs.router)
+app.include_router(weeks.router)
+app.include_router(metrics.router)
+
+
+# Shed load before it queues up: registered first, so it runs after the
+# client is identified and rejections still show up in latency metrics
+app.add_middleware(AdmissionMiddleware, controller=get_admission_controller)
 
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and create tables on startup"""
+@app.middleware("http")
+async def bind_client_id(request: Request, call_next):
+    """Identify the caller so the LLM scheduler can apply per-client limits,
+    and the endpoint so LLM call profiles can be grouped by it"""
+    client_id = request.headers.get("X-Client-ID") or (
+        request.client.host if request.client else "anonymous"
+    )
+    token = client_id_var.set(client_id)
+    endpoint_token = endpoint_var.set(f"{request.method} {request.url.path}")
     try:
-        # Initialize database connection and create tables
-        repo = PostgresEventRepository()
-        # Create table
-        with repo.conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS calendar_events (
-                    id SERIAL PRIMARY KEY,
-                    event_name VARCHAR(255) NOT NULL,
-                    event_description TEXT,
-                    event_start_date_time TIMESTAMP NOT NULL,
-                    event_end_date_time TIMESTAMP NOT NULL,
-                    event_location VARCHAR(255)
-                )
-                """
-            )
-            repo.conn.commit()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
-        raise
+        return await call_next(request)
+    finally:
+        endpoint_var.reset(endpoint_token)
+        client_id_var.reset(token)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            request.method,
+            route.path if route is not None else "unmatched",
+            status,
+        )
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Open the root span; registered last so it wraps the other middlewares"""
+    with start_trace(
+        f"{request.method} {request.url.path}", request.headers.get("traceparent")
+    ) as root:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            root.name = f"{request.method} {route.path}"
+        root.set("http.status", response.status_code)
+        if "X-Client-ID" in request.headers:
+            root.set("client_id", request.headers["X-Client-ID"])
+        response.headers["X-Trace-ID"] = root.trace_id
+        return response
@@ -0,0 +1,187 @@
+"""Summarise the LLM call profile: where latency and tokens go.
+
+Run the API with ``LLM_PROFILE_PATH=llm_calls.jsonl``, then aggregate the
+calls by endpoint, hour of day, conversation length (messages sent), tool
+or model, optionally over a time window::
+
+    python -m tools.llm_report llm_calls.jsonl
+    python -m tools.llm_report llm_calls.jsonl --by endpoint,messages --since 24h
+    python -m tools.llm_report llm_calls.jsonl --worst 10
+
+Cache hits are calls answered by an identical call already in flight; they
+cost no tokens and are left out of the latency and token columns. Cancelled
+calls (deadline reached, or a hedged call that lost) count in the latency
+columns up to the moment they were abandoned.
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds of the conversation length buckets, in messages
+MESSAGE_BUCKETS = (2, 5, 10, 20, 50)
+
+UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def load_calls(path: str, since: Optional[float] = None) -> List[dict]:
+    calls = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                call = json.loads(line)
+                if since is None or call["ts"] >= since:
+                    calls.append(call)
+    return calls
+
+
+def messages_bucket(call: dict) -> str:
+    count = call.get("messages")
+    if count is None:
+        return "?"
+    low = 1
+    for high in MESSAGE_BUCKETS:
+        if count <= high:
+            return f"{low}-{high}"
+        low = high + 1
+    return f"{low}+"
+
+
+GROUPS: Dict[str, Callable[[dict], str]] = {
+    "endpoint": lambda call: call.get("endpoint") or "-",
+    "hour": lambda call: datetime.fromtimestamp(call["ts"]).strftime("%Y-%m-%d %H:00"),
+    "messages": messages_bucket,
+    "tool": lambda call: call.get("tool") or "-",
+    "model": lambda call: call.get("model") or "-",
+    "operation": lambda call: call.get("operation") or "-",
+}
+
+
+def _bucket_start(bucket: str) -> float:
+    start = bucket.split("-")[0].rstrip("+")
+    return int(start) if start.isdigit() else float("inf")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarise(calls: List[dict]) -> dict:
+    provider = [call for call in calls if not call.get("cache_hit")]
+    ok = [call for call in provider if call.get("status") == "200"]
+    # Cut short by a deadline or a faster hedge: their latency is a lower
+    # bound, but leaving them out would hide the slowest calls
+    cancelled = [call for call in provider if call.get("status") == "cancelled"]
+    latencies = [call["latency_ms"] for call in ok + cancelled]
+    prompt = sum(call.get("prompt_tokens") or 0 for call in ok)
+    completion = sum(call.get("completion_tokens") or 0 for call in ok)
+    return {
+        "calls": len(calls),
+        "cache_hits": len(calls) - len(provider),
+        "errors": len(provider) - len(ok) - len(cancelled),
+        "cancelled": len(cancelled),
+        "ttfb_p50": _percentile([call["ttfb_ms"] for call in ok], 0.5),
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "total_s": sum(latencies) / 1000,
+        "prompt_avg": prompt / len(ok) if ok else 0.0,
+        "completion_avg": completion / len(ok) if ok else 0.0,
+        "tokens": prompt + completion,
+        "kb_sent": sum(call.get("request_bytes") or 0 for call in provider) / 1024,
+    }
+
+
+def print_table(calls: List[dict], by: str) -> None:
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for call in calls:
+        groups[GROUPS[by](call)].append(call)
+    rows = [(key, summarise(group)) for key, group in groups.items()]
+    if by == "hour":
+        rows.sort()
+    elif by == "messages":
+        # By lower bound, unknown lengths last
+        rows.sort(key=lambda row: _bucket_start(row[0]))
+    else:
+        # Biggest consumers of provider time first
+        rows.sort(key=lambda row: -row[1]["total_s"])
+    print(
+        f"{by:<28}{'calls':>7}{'hits':>6}{'errs':>6}{'cancl':>6}{'ttfb p50':>10}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}{'prompt':>8}{'compl':>7}"
+        f"{'tokens':>9}{'KB sent':>9}"
+    )
+    for key, s in rows:
+        print(
+            f"{key[:27]:<28}{s['calls']:>7}{s['cache_hits']:>6}{s['errors']:>6}"
+            f"{s['cancelled']:>6}{s['ttfb_p50']:>10.0f}{s['p50']:>9.0f}{s['p95']:>9.0f}"
+            f"{s['total_s']:>9.1f}{s['prompt_avg']:>8.0f}{s['completion_avg']:>7.0f}"
+            f"{s['tokens']:>9}{s['kb_sent']:>9.1f}"
+        )
+    print()
+
+
+def print_worst(calls: List[dict], count: int) -> None:
+    provider = [call for call in calls if not call.get("cache_hit")]
+    provider.sort(key=lambda call: -(call.get("latency_ms") or 0))
+    print(
+        f"{'time':<20}{'latency':>9}{'ttfb':>7}{'msgs':>6}{'prompt':>8}"
+        f"{'status':>10}  endpoint / tool / trace"
+    )
+    for call in provider[:count]:
+        print(
+            f"{datetime.fromtimestamp(call['ts']):%Y-%m-%d %H:%M:%S} "
+            f"{call.get('latency_ms') or 0:>10.0f}{call.get('ttfb_ms') or 0:>7.0f}"
+            f"{call.get('messages') or 0:>6}{call.get('prompt_tokens') or 0:>8}"
+            f"{call.get('status', '-'):>10}  {call.get('endpoint') or '-'}"
+            f" / {call.get('tool') or '-'} / {call.get('trace_id') or '-'}"
+        )
+
+
+def parse_since(value: str) -> float:
+    """``30m``, ``6h`` or ``7d`` ago, as a timestamp."""
+    unit = UNITS.get(value[-1:])
+    if unit is None:
+        raise argparse.ArgumentTypeError("use a number followed by m, h or d")
+    return time.time() - float(value[:-1]) * unit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="llm_calls.jsonl")
+    parser.add_argument(
+        "--by",
+        default="endpoint,hour,messages",
+        help=f"comma-separated groupings among: {', '.join(GROUPS)}",
+    )
+    parser.add_argument("--since", type=parse_since, help="e.g. 30m, 6h, 7d")
+    parser.add_argument(
+        "--worst", type=int, default=0, help="also list the N slowest calls"
+    )
+    args = parser.parse_args()
+
+    calls = load_calls(args.path, args.since)
+    if not calls:
+        raise SystemExit("no LLM calls recorded in this window")
+    total = summarise(calls)
+    print(
+        f"{total['calls']} calls, {total['cache_hits']} cache hits, "
+        f"{total['errors']} errors, {total['cancelled']} cancelled, "
+        f"{total['tokens']} tokens, "
+        f"{total['total_s']:.1f}s of provider time\n"
+    )
+    for by in args.by.split(","):
+        if by not in GROUPS:
+            raise SystemExit(f"unknown grouping {by!r}")
+        print_table(calls, by)
+    if args.worst:
+        print_worst(calls, args.worst)
+
+
+if __name__ == "__main__":
+    main()
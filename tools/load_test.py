@@ -0,0 +1,266 @@
+"""Open-loop load generator for the calendar API.
+
+Requests are fired at a target rate regardless of how fast the server
+answers, so queueing shows up as latency instead of silently lowering the
+offered load::
+
+    python -m tools.load_test --rps 50 --duration 60 \\
+        --mix chat=1,list=6,create=2,split=1,export=0.2 --json report.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+INSERT_EVENT_FUNCTION = {
+    "name": "insert_event",
+    "description": "Insert a new calendar event",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "event_name": {"type": "string"},
+            "event_start_date_time": {"type": "string", "format": "date-time"},
+            "event_end_date_time": {"type": "string", "format": "date-time"},
+        },
+        "required": ["event_name", "event_start_date_time", "event_end_date_time"],
+    },
+}
+
+PROMPTS = [
+    "Plan my work week",
+    "Add a meeting tomorrow at 2pm",
+    "Show me my events",
+    "Block two hours of focus time every morning",
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def random_event(index: int) -> dict:
+    day = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    start = day + timedelta(days=random.randint(0, 27), hours=random.randint(0, 9))
+    return {
+        "event_name": f"Load test event {index}",
+        "event_description": "Generated by tools.load_test",
+        "event_start_date_time": start.isoformat(),
+        "event_end_date_time": (start + timedelta(hours=3)).isoformat(),
+        "event_location": "Office",
+    }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, clients: int):
+        self.client = client
+        self.clients = clients
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.split_candidates: List[int] = []
+        self.counter = 0
+
+    def headers(self) -> dict:
+        return {"X-Client-ID": f"load-{random.randrange(self.clients)}"}
+
+    async def seed(self, count: int) -> None:
+        for _ in range(count):
+            response = await self.client.post(
+                "/events/", json=random_event(self.counter), headers=self.headers()
+            )
+            self.counter += 1
+            if response.status_code == 200:
+                self.split_candidates.append(response.json()["id"])
+
+    async def request(self, scenario: str) -> None:
+        start = time.perf_counter()
+        try:
+            response = await getattr(self, f"scenario_{scenario}")()
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        elapsed = time.perf_counter() - start
+        self.latencies[scenario].append(elapsed)
+        self.statuses[scenario][status] += 1
+        if not 200 <= status < 300:
+            self.errors[scenario] += 1
+
+    async def scenario_chat(self) -> httpx.Response:
+        return await self.client.post(
+            "/chat",
+            json={
+                "messages": [
+                    {"role": "system", "content": "You are a calendar assistant."},
+                    {"role": "user", "content": random.choice(PROMPTS)},
+                ],
+                "selected_date": datetime.now().isoformat(),
+                "functions": [INSERT_EVENT_FUNCTION],
+            },
+            headers=self.headers(),
+        )
+
+    async def scenario_list(self) -> httpx.Response:
+        return await self.client.get("/events/", headers=self.headers())
+
+    async def scenario_create(self) -> httpx.Response:
+        self.counter += 1
+        return await self.client.post(
+            "/events/", json=random_event(self.counter), headers=self.headers()
+        )
+
+    async def scenario_split(self) -> httpx.Response:
+        if not self.split_candidates:
+            await self.seed(1)
+        event_id = self.split_candidates.pop() if self.split_candidates else 0
+        start = datetime.now().replace(minute=0, second=0, microsecond=0)
+        tasks = [
+            {
+                "task_name": f"Part {i + 1}",
+                "task_start_date_time": (start + timedelta(hours=i)).isoformat(),
+                "task_end_date_time": (start + timedelta(hours=i + 1)).isoformat(),
+            }
+            for i in range(3)
+        ]
+        return await self.client.post(
+            "/events/split",
+            json={"event_id": event_id, "tasks": tasks},
+            headers=self.headers(),
+        )
+
+    async def scenario_export(self) -> httpx.Response:
+        return await self.client.post(
+            "/export-ics",
+            json=[{"role": "user", "content": random.choice(PROMPTS)}],
+            headers=self.headers(),
+        )
+
+    def report(self, wall_time: float, dropped: int) -> dict:
+        scenarios = {}
+        for scenario, latencies in sorted(self.latencies.items()):
+            scenarios[scenario] = {
+                "requests": len(latencies),
+                "errors": self.errors[scenario],
+                "error_rate": self.errors[scenario] / len(latencies),
+                "throughput_rps": len(latencies) / wall_time,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "statuses": dict(self.statuses[scenario]),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "wall_time_s": wall_time,
+            "requests": total,
+            "dropped": dropped,
+            "throughput_rps": total / wall_time if wall_time else 0.0,
+            "error_rate": sum(self.errors.values()) / total if total else 0.0,
+            "scenarios": scenarios,
+        }
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def run(args: argparse.Namespace) -> dict:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout, limits=limits
+    ) as client:
+        test = LoadTest(client, args.clients)
+        expected_splits = int(
+            args.rps * args.duration * mix.get("split", 0) / sum(weights)
+        )
+        await test.seed(min(expected_splits, args.max_seed))
+
+        in_flight = set()
+        dropped = 0
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < args.duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= args.max_in_flight:
+                dropped += 1
+            else:
+                task = asyncio.ensure_future(
+                    test.request(random.choices(names, weights)[0])
+                )
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            gap = (
+                random.expovariate(args.rps)
+                if args.arrivals == "poisson"
+                else 1 / args.rps
+            )
+            next_at += gap
+        if in_flight:
+            await asyncio.wait(in_flight)
+        return test.report(time.perf_counter() - started, dropped)
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['requests']} requests in {report['wall_time_s']:.1f}s "
+        f"({report['throughput_rps']:.1f} req/s, "
+        f"{report['error_rate'] * 100:.2f}% errors, {report['dropped']} dropped)"
+    )
+    print(
+        f"{'scenario':<10}{'reqs':>8}{'rps':>9}{'err%':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for name, s in report["scenarios"].items():
+        print(
+            f"{name:<10}{s['requests']:>8}{s['throughput_rps']:>9.1f}"
+            f"{s['error_rate'] * 100:>8.2f}{s['p50_ms']:>10.1f}"
+            f"{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--mix",
+        default="chat=1,list=4,create=2,split=1,export=0.2",
+        help="weighted scenarios among chat, list, create, split and export",
+    )
+    parser.add_argument(
+        "--arrivals", choices=["constant", "poisson"], default="poisson"
+    )
+    parser.add_argument("--clients", type=int, default=20, help="distinct X-Client-IDs")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--max-seed", type=int, default=10000)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Fake OpenAI-compatible chat completions server for offline testing.
+
+Run several with different latency profiles to exercise the LLM router::
+
+    python -m tools.mock_llm_server --port 9001 --latency lognormal:0.8,0.5
+    python -m tools.mock_llm_server --port 9002 --latency uniform:0.2,3
+
+When the request offers ``functions`` the server answers with a
+``function_call`` (at ``--function-call-rate``) whose arguments are generated
+from the function's JSON schema, so the whole UI/API flow can run without a
+real provider. ``stream: true`` requests get server-sent event chunks, and
+``--error-rate`` injects provider errors with an optional ``Retry-After``.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ICS_TEMPLATE = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//mock-llm//EN
+BEGIN:VEVENT
+UID:{uid}
+DTSTART:{start}
+DTEND:{end}
+SUMMARY:Mock event
+END:VEVENT
+END:VCALENDAR"""
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse ``kind:arg1,arg2`` into a sampler returning seconds.
+
+    Supported kinds: ``fixed:s``, ``uniform:low,high``, ``normal:mean,stddev``,
+    ``lognormal:median,sigma`` and ``exponential:mean``.
+    """
+    kind, _, raw_args = spec.partition(":")
+    args = [float(a) for a in raw_args.split(",") if a]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda: max(random.gauss(args[0], args[1]), 0.0)
+    if kind == "lognormal":
+        mu = math.log(args[0])
+        return lambda: random.lognormvariate(mu, args[1])
+    if kind == "exponential":
+        return lambda: random.expovariate(1 / args[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def fake_value(name: str, schema: dict, base: datetime):
+    kind = schema.get("type")
+    if kind == "integer":
+        return random.randint(1, 1000)
+    if kind == "number":
+        return round(random.uniform(0, 100), 2)
+    if kind == "boolean":
+        return random.random() < 0.5
+    if kind == "array":
+        return [fake_value(name, schema.get("items", {}), base) for _ in range(2)]
+    if kind == "object":
+        return fake_arguments(schema, base)
+    if schema.get("format") == "date-time":
+        # Pair *_start_* / *_end_* fields into a plausible one-hour slot
+        offset = timedelta(hours=1) if "end" in name else timedelta()
+        return (base + offset).strftime("%Y-%m-%dT%H:%M:%S")
+    return f"Mock {name.replace('_', ' ')}"
+
+
+def fake_arguments(schema: dict, base: Optional[datetime] = None) -> dict:
+    if base is None:
+        day = datetime.now().replace(minute=0, second=0, microsecond=0)
+        base = day.replace(hour=random.randint(8, 17)) + timedelta(
+            days=random.randint(0, 4)
+        )
+    properties = schema.get("properties", {})
+    return {name: fake_value(name, prop, base) for name, prop in properties.items()}
+
+
+def estimate_tokens(messages: List[dict]) -> int:
+    # Roughly four characters per token, like the OpenAI rule of thumb
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4 + 1
+
+
+def build_message(payload: dict, function_call_rate: float) -> dict:
+    functions = payload.get("functions") or []
+    messages = payload.get("messages") or []
+    if functions and random.random() < function_call_rate:
+        function = random.choice(functions)
+        return {
+            "role": "assistant",
+            "content": None,
+            "function_call": {
+                "name": function["name"],
+                "arguments": json.dumps(fake_arguments(function.get("parameters", {}))),
+            },
+        }
+    last = str(messages[-1].get("content") or "") if messages else ""
+    if "ICS" in last:
+        start = datetime.now().replace(minute=0, second=0, microsecond=0)
+        content = ICS_TEMPLATE.format(
+            uid=uuid.uuid4().hex,
+            start=start.strftime("%Y%m%dT%H%M%S"),
+            end=(start + timedelta(hours=1)).strftime("%Y%m%dT%H%M%S"),
+        )
+    else:
+        content = f"Mock reply to: {last[:80]}"
+    return {"role": "assistant", "content": content}
+
+
+def create_app(
+    latency: Callable[[], float],
+    name: str = "mock",
+    token_latency: float = 0.0,
+    function_call_rate: float = 0.8,
+    error_rate: float = 0.0,
+    error_statuses: Optional[List[int]] = None,
+    retry_after: Optional[float] = None,
+) -> FastAPI:
+    app = FastAPI(title=f"Mock LLM ({name})")
+    error_statuses = error_statuses or [500]
+
+    async def stream_chunks(completion_id: str, model: str, message: dict):
+        def chunk(delta: dict, finish_reason=None) -> str:
+            body = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            return f"data: {json.dumps(body)}\n\n"
+
+        yield chunk({"role": "assistant"})
+        if message.get("function_call"):
+            call = message["function_call"]
+            yield chunk({"function_call": {"name": call["name"], "arguments": ""}})
+            pieces = [
+                call["arguments"][i : i + 16]
+                for i in range(0, len(call["arguments"]), 16)
+            ]
+            finish_reason = "function_call"
+            deltas = [{"function_call": {"arguments": piece}} for piece in pieces]
+        else:
+            deltas = [{"content": word + " "} for word in message["content"].split(" ")]
+            finish_reason = "stop"
+        for delta in deltas:
+            if token_latency:
+                await asyncio.sleep(token_latency)
+            yield chunk(delta)
+        yield chunk({}, finish_reason)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        await asyncio.sleep(latency())
+
+        if error_rate and random.random() < error_rate:
+            status = random.choice(error_statuses)
+            headers = {"Retry-After": f"{retry_after:g}"} if retry_after else None
+            return JSONResponse(
+                {"error": {"message": f"Injected {status} from {name}"}},
+                status_code=status,
+                headers=headers,
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = payload.get("model", "mock")
+        message = build_message(payload, function_call_rate)
+        if payload.get("stream"):
+            return StreamingResponse(
+                stream_chunks(completion_id, model, message),
+                media_type="text/event-stream",
+            )
+
+        prompt_tokens = estimate_tokens(payload.get("messages", []))
+        completion_tokens = estimate_tokens([message]) + (
+            len(message["function_call"]["arguments"]) // 4
+            if message.get("function_call")
+            else 0
+        )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": (
+                        "function_call" if message.get("function_call") else "stop"
+                    ),
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--name", default="mock")
+    parser.add_argument(
+        "--latency",
+        default="fixed:0.2",
+        help="time to first byte, e.g. fixed:0.2, uniform:0.1,2, lognormal:0.8,0.5",
+    )
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.0,
+        help="delay between streamed chunks, in seconds",
+    )
+    parser.add_argument("--function-call-rate", type=float, default=0.8)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--error-status",
+        default="500",
+        help="comma-separated statuses to inject, e.g. 429,500,503",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=None,
+        help="Retry-After seconds sent with injected errors",
+    )
+    args = parser.parse_args()
+
+    app = create_app(
+        parse_latency(args.latency),
+        name=args.name,
+        token_latency=args.token_latency,
+        function_call_rate=args.function_call_rate,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_status.split(",") if s],
+        retry_after=args.retry_after,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
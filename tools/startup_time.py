@@ -0,0 +1,111 @@
+"""Measure API cold start.
+
+Each run uses a fresh interpreter and records two numbers: how long
+``import src.main`` takes, and how long a server process takes from spawn
+until it answers ``/metrics`` (imports plus the lifespan hook)::
+
+    python -m tools.startup_time --runs 5
+    python -m tools.startup_time --imports 15   # slowest imports, one run
+
+``--json`` writes the medians so cold start can be tracked like the other
+benchmarks.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time() -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET], text=True, env=os.environ
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def ready_time(timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"server exited with status {process.returncode}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1.0)
+                return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise SystemExit(f"server not ready after {timeout:g}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def slowest_imports(count: int) -> List[Tuple[int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        capture_output=True,
+        text=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.split("|")]
+        timings.append((int(cumulative_us), name.split(":")[-1].strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--imports", type=int, help="list the N slowest imports")
+    parser.add_argument("--json", help="write the medians to this file")
+    args = parser.parse_args()
+
+    if args.imports:
+        for cumulative_us, name in slowest_imports(args.imports):
+            print(f"{cumulative_us / 1000:>9.1f} ms  {name}")
+        return
+
+    imports = [import_time() for _ in range(args.runs)]
+    ready = [ready_time(args.timeout) for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_ms": statistics.median(imports) * 1000,
+        "ready_ms": statistics.median(ready) * 1000,
+    }
+    print(f"import src.main   {report['import_ms']:>8.1f} ms (median)")
+    print(f"ready on /metrics {report['ready_ms']:>8.1f} ms (median)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
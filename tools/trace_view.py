@@ -0,0 +1,146 @@
+"""Rebuild traces from the span export and show their critical path.
+
+Run the API with ``TRACE_EXPORTER=jsonl``, then list the slowest traces or
+expand one of them (a prefix of the trace ID is enough)::
+
+    python -m tools.trace_view traces.jsonl --slowest 10
+    python -m tools.trace_view traces.jsonl --trace 4bf92f35
+
+Spans on the critical path are marked with ``*``; the summary below the tree
+splits the critical path's time between SQL, LLM, service code and the rest.
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+# Tolerance for clock jitter between a child's end and its parent's end
+EPSILON = 0.0005
+
+
+def load_traces(path: str) -> Dict[str, List[dict]]:
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                span = json.loads(line)
+                span["end"] = span["start"] + span["duration_ms"] / 1000
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def build_tree(spans: List[dict]) -> dict:
+    """Attach spans to their parents under a virtual root covering the trace.
+
+    A trace may hold several top-level requests (one Streamlit interaction
+    fires a few), and their parent is the client's span, which is not
+    exported; those become children of the virtual root.
+    """
+    by_id = {span["span_id"]: span for span in spans}
+    root = {
+        "name": "trace",
+        "start": min(span["start"] for span in spans),
+        "end": max(span["end"] for span in spans),
+        "attributes": {},
+        "children": [],
+    }
+    root["duration_ms"] = (root["end"] - root["start"]) * 1000
+    for span in spans:
+        span.setdefault("children", [])
+    for span in sorted(spans, key=lambda s: s["start"]):
+        parent = by_id.get(span["parent_id"], root)
+        parent["children"].append(span)
+    return root
+
+
+def mark_critical_path(span: dict) -> None:
+    """Walk back from the span's end, always taking the child that finished last."""
+    span["critical"] = True
+    cursor = span["end"]
+    for child in sorted(span["children"], key=lambda s: s["end"], reverse=True):
+        if child["end"] <= cursor + EPSILON:
+            mark_critical_path(child)
+            cursor = child["start"]
+
+
+def category(name: str) -> str:
+    if name.startswith("sql "):
+        return "sql"
+    if name.startswith("llm."):
+        return "llm"
+    if "_service." in name:
+        return "service"
+    return "other"
+
+
+def critical_breakdown(span: dict, totals: Dict[str, float]) -> None:
+    critical_children = [c for c in span["children"] if c.get("critical")]
+    own = span["duration_ms"] - sum(c["duration_ms"] for c in critical_children)
+    totals[category(span["name"])] += max(own, 0.0)
+    for child in critical_children:
+        critical_breakdown(child, totals)
+
+
+def print_tree(span: dict, origin: float, depth: int = 0) -> None:
+    attributes = " ".join(f"{k}={v}" for k, v in span["attributes"].items())
+    status = " ERROR " + span["error"] if span.get("status") == "error" else ""
+    print(
+        f"{'*' if span.get('critical') else ' '} "
+        f"{(span['start'] - origin) * 1000:>9.1f} {span['duration_ms']:>9.1f}  "
+        f"{'  ' * depth}{span['name']} {attributes}{status}".rstrip()
+    )
+    for child in span["children"]:
+        print_tree(child, origin, depth + 1)
+
+
+def show_trace(spans: List[dict]) -> None:
+    root = build_tree(spans)
+    mark_critical_path(root)
+    print(f"trace {spans[0]['trace_id']}  {root['duration_ms']:.1f} ms")
+    print(f"  {'start ms':>9} {'dur ms':>9}  span")
+    for child in root["children"]:
+        print_tree(child, root["start"])
+
+    totals: Dict[str, float] = defaultdict(float)
+    critical_breakdown(root, totals)
+    print("\ncritical path")
+    for name, value in sorted(totals.items(), key=lambda item: -item[1]):
+        share = value / root["duration_ms"] * 100 if root["duration_ms"] else 0.0
+        print(f"  {name:<8}{value:>10.1f} ms {share:>6.1f}%")
+
+
+def list_slowest(traces: Dict[str, List[dict]], count: int) -> None:
+    summaries = []
+    for trace_id, spans in traces.items():
+        start = min(span["start"] for span in spans)
+        end = max(span["end"] for span in spans)
+        ids = {span["span_id"] for span in spans}
+        tops = [span for span in spans if span["parent_id"] not in ids]
+        summaries.append((end - start, trace_id, len(spans), tops[0]["name"]))
+    summaries.sort(reverse=True)
+    print(f"{'trace':<34}{'ms':>10}{'spans':>7}  first request")
+    for duration, trace_id, span_count, name in summaries[:count]:
+        print(f"{trace_id:<34}{duration * 1000:>10.1f}{span_count:>7}  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="traces.jsonl")
+    parser.add_argument("--trace", help="trace ID (or unique prefix) to expand")
+    parser.add_argument("--slowest", type=int, default=10)
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    if not args.trace:
+        list_slowest(traces, args.slowest)
+        return
+    matches = [trace_id for trace_id in traces if trace_id.startswith(args.trace)]
+    if len(matches) != 1:
+        raise SystemExit(f"{len(matches)} traces match {args.trace!r}")
+    show_trace(traces[matches[0]])
+
+
+if __name__ == "__main__":
+    main()